@@ -0,0 +1,68 @@
+"""Measures the password audit: lookups in a breach hash file and auditing stores through the worker pool
+
+The hash file is generated in the format of Have I Been Pwned, entries are unlocked by a decrypter
+that hands the passwords over without a device, so that only the scoring is measured.
+Run as `python -m benchmarks.bench_audit [DIRECTORY]` with trezorpass installed, the hash file is written
+to a temporary directory within DIRECTORY.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from trezorpass.audit import BreachIndex, PasswordAuditor
+from trezorpass.store import DecryptedEntry, EncryptedEntry
+
+HASHES = 10_000_000
+LOOKUPS = 10_000
+SIZES = [1_000, 10_000, 50_000]
+
+
+class PlaintextDecrypter:
+    """Decrypter of entries whose ciphertext is the password itself"""
+    @staticmethod
+    def decrypt_many(entries):
+        for entry in entries:
+            yield DecryptedEntry(url=entry.url, title=entry.title, username=entry.username, nonce=entry.nonce,
+                                 password=entry.ciphertext.decode("utf8"), safe_note="")
+
+
+def write_hash_file(path: str, count: int, rng: random.Random) -> None:
+    hashes = sorted(rng.randbytes(20).hex().upper() for _ in range(count))
+    with open(path, "w", newline="") as file:
+        for chunk_start in range(0, count, 100_000):
+            file.write("".join(f"{hash_hex}:{rng.randrange(1, 10_000)}\r\n"
+                               for hash_hex in hashes[chunk_start:chunk_start + 100_000]))
+
+
+def generate_entries(count: int, rng: random.Random) -> list[EncryptedEntry]:
+    passwords = [rng.randbytes(rng.randrange(4, 16)).hex() for _ in range(count // 2)]
+    return [EncryptedEntry(url=f"https://service{i}.example.com", title=f"Service {i}", username="user",
+                           nonce="00", ciphertext=rng.choice(passwords).encode("utf8"), password_size=0)
+            for i in range(count)]
+
+
+def main():
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory(dir=sys.argv[1] if len(sys.argv) > 1 else None) as directory:
+        path = os.path.join(directory, "breaches.txt")
+        write_hash_file(path, HASHES, rng)
+        print(f"hash file {os.path.getsize(path) / 2 ** 20:.0f} MB")
+        with BreachIndex(path) as index:
+            queries = [rng.randbytes(20).hex().upper().encode("ascii") for _ in range(LOOKUPS)]
+            start = time.perf_counter()
+            for query in queries:
+                index.lookup(query)
+            print(f"lookup {(time.perf_counter() - start) / LOOKUPS * 1e6:.1f} us")
+        print(f"{'entries':>8} {'workers':>8} {'seconds':>8}")
+        for size in SIZES:
+            entries = generate_entries(size, rng)
+            for workers in (1, os.cpu_count()):
+                start = time.perf_counter()
+                PasswordAuditor(PlaintextDecrypter(), path, workers).audit(entries)
+                print(f"{size:>8} {workers:>8} {time.perf_counter() - start:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
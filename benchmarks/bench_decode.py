@@ -0,0 +1,53 @@
+"""Compares the incremental StoreDecoder with decoding the whole store by json.loads
+
+Run as `python -m benchmarks.bench_decode` with trezorpass installed.
+"""
+import json
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from trezorpass.store import StoreDecoder, EntryDecoder, TagDecoder, Store
+
+from .synthetic import generate_encoded_store
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def decode_whole(decoder: StoreDecoder, encoded_store: bytes) -> Store:
+    store_dict = json.loads(encoded_store)
+    return Store(
+        name=decoder.keychain.store_name,
+        entries=[decoder.entry_decoder.decode(entry) for entry in store_dict["entries"].values()],
+        tags=[decoder.tag_decoder.decode(tag) for tag in store_dict["tags"].values()]
+    )
+
+
+def decode_incrementally(decoder: StoreDecoder, encoded_store: bytes) -> Store:
+    return decoder.decode(encoded_store)
+
+
+def measure(decode, decoder: StoreDecoder, encoded_store: bytes) -> tuple[float, int]:
+    start = time.perf_counter()
+    decode(decoder, encoded_store)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()  # Tracing slows the allocations down, the peak is measured by a separate run
+    decode(decoder, encoded_store)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    decoder = StoreDecoder(SimpleNamespace(store_name="benchmark.pswd"), EntryDecoder(), TagDecoder())
+    print(f"{'entries':>8} {'store MB':>9} {'method':>14} {'seconds':>8} {'peak MB':>8}")
+    for size in SIZES:
+        encoded_store = generate_encoded_store(size)
+        for decode in (decode_whole, decode_incrementally):
+            elapsed, peak = measure(decode, decoder, encoded_store)
+            print(f"{size:>8} {len(encoded_store) / 2 ** 20:>9.1f} {decode.__name__.removeprefix('decode_'):>14} "
+                  f"{elapsed:>8.3f} {peak / 2 ** 20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compares decrypting the whole store at once with streaming decryption of its chunks
+
+Each method runs in a separate process, so that the peak resident memory isn't shared.
+Stores are generated by separate processes too, as the peak is inherited by the processes started afterwards.
+Run as `python -m benchmarks.bench_decrypt` with trezorpass installed.
+"""
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from trezorpass.crypto import decrypt, decrypt_stream, CIPHER_IVSIZE, AUTH_SIZE
+from trezorpass.store.sources import CHUNK_SIZE
+
+SIZES_MB = [1, 16, 64]
+KEY = bytes(range(32))
+
+
+def encrypt(data: bytes) -> bytes:
+    """Encrypts the data in the layout of Trezor Password Manager, iv + authtag + ciphertext"""
+    iv = os.urandom(CIPHER_IVSIZE)
+    ciphertext = AESGCM(KEY).encrypt(iv, data, None)
+    return iv + ciphertext[-AUTH_SIZE:] + ciphertext[:-AUTH_SIZE]
+
+
+def decrypt_whole(encrypted: bytes) -> None:
+    decrypt(KEY, encrypted)
+
+
+def decrypt_streamed(encrypted: bytes) -> None:
+    async def chunks():
+        with memoryview(encrypted) as view:
+            for offset in range(0, len(view), CHUNK_SIZE):
+                yield view[offset:offset + CHUNK_SIZE]
+
+    asyncio.run(decrypt_stream(KEY, chunks(), len(encrypted)))
+
+
+METHODS = {"whole": decrypt_whole, "stream": decrypt_streamed}
+
+
+def generate(filename: str, size_mb: int) -> None:
+    with open(filename, "wb") as file:
+        file.write(encrypt(os.urandom(size_mb * 2 ** 20)))
+
+
+def run(method: str, filename: str) -> None:
+    with open(filename, "rb") as file:
+        encrypted = file.read()
+    size_mb = len(encrypted) / 2 ** 20
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    METHODS[method](encrypted)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline  # KiB on Linux
+    print(f"{size_mb:>8.0f} {method:>8} {elapsed:>8.3f} {size_mb / elapsed:>8.0f} {peak / 2 ** 10:>10.1f}")
+
+
+def main():
+    print(f"{'store MB':>8} {'method':>8} {'seconds':>8} {'MB/s':>8} {'+peak MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size_mb in SIZES_MB:
+            filename = os.path.join(directory, f"{size_mb}.pswd")
+            subprocess.run([sys.executable, "-m", __spec__.name, "generate", filename, str(size_mb)], check=True)
+            for method in METHODS:
+                subprocess.run([sys.executable, "-m", __spec__.name, method, filename], check=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["generate"]:
+        generate(sys.argv[2], int(sys.argv[3]))
+    elif len(sys.argv) == 3:
+        run(sys.argv[1], sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,56 @@
+"""Measures memory held by decoded entries, comparing the slotted entries with the original dataclass layout
+
+Run as `python -m benchmarks.bench_entry_memory` with trezorpass installed.
+"""
+import tracemalloc
+from dataclasses import dataclass
+
+from trezorpass.store import EntryDecoder, Tag
+
+from .synthetic import generate_store_dict
+
+ENTRIES_COUNT = 50_000
+
+
+@dataclass(kw_only=True)
+class DictEncryptedEntry:
+    url: str
+    title: str
+    username: str
+    nonce: str
+    tags: list[Tag]
+    encrypted_password: bytes
+    encrypted_safe_note: bytes
+
+
+def decode_dict_entry(entry_dict: dict) -> DictEncryptedEntry:
+    return DictEncryptedEntry(
+        url=entry_dict["title"],
+        title=entry_dict["note"],
+        username=entry_dict["username"],
+        nonce=entry_dict["nonce"],
+        encrypted_password=bytes(entry_dict["password"]["data"]),
+        encrypted_safe_note=bytes(entry_dict["safe_note"]["data"]),
+        tags=[]
+    )
+
+
+def measure(decode, entry_dicts: list[dict]) -> int:
+    tracemalloc.start()
+    entries = [decode(entry_dict) for entry_dict in entry_dicts]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return size
+
+
+def main():
+    entry_dicts = list(generate_store_dict(ENTRIES_COUNT)["entries"].values())
+    # Strings are shared with the source dictionaries, so only the entry objects themselves are measured
+    for name, decode in (("dataclass", decode_dict_entry), ("slotted", EntryDecoder().decode)):
+        size = measure(decode, entry_dicts)
+        print(f"{name:>10}: {size / ENTRIES_COUNT:>6.1f} B/entry, {size / 2 ** 20:>6.1f} MB total")
+
+
+if __name__ == "__main__":
+    main()
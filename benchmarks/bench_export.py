@@ -0,0 +1,56 @@
+"""Compares exporting a store entry by entry with the export pipeline, over a fake device of varying latency
+
+Run as `python -m benchmarks.bench_export` with trezorpass installed.
+"""
+import asyncio
+import io
+import tempfile
+import time
+
+from trezorpass.export import StoreExporter, JsonLinesWriter
+from trezorpass.store import Keychain, EntryKeyCache, EntryDecrypter, get_default_store_manager
+from trezorpass.store.sources import FileSource
+
+from .fake_client import FakeTrezorClient
+from .synthetic import write_encrypted_store
+
+ENTRIES = 2_000
+LATENCIES = [0.0, 0.001, 0.005]
+
+
+async def load_store(keychain: Keychain, path: str):
+    async with get_default_store_manager(keychain, FileSource(path)) as store:
+        return store
+
+
+def export_serially(keychain: Keychain, entries) -> None:
+    writer = JsonLinesWriter(io.BytesIO())
+    for entry in EntryDecrypter(keychain).decrypt_many(entries):
+        writer.write(entry)
+    writer.close()
+
+
+def export_pipelined(keychain: Keychain, entries) -> None:
+    writer = JsonLinesWriter(io.BytesIO())
+    StoreExporter(keychain).export(entries, writer)
+    writer.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        client = FakeTrezorClient()
+        store = asyncio.run(load_store(Keychain(client), write_encrypted_store(directory, client, ENTRIES)))
+        print(f"{'latency':>8} {'serial':>8} {'pipeline':>8}")
+        for latency in LATENCIES:
+            client.latency = latency
+            durations = []
+            for export in (export_serially, export_pipelined):
+                keychain = Keychain(client, EntryKeyCache(max_size=0))  # Every key is unlocked by the device
+                start = time.perf_counter()
+                export(keychain, store.entries)
+                durations.append(time.perf_counter() - start)
+            print(f"{latency:>8.3f} {durations[0]:>8.3f} {durations[1]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measures loading and decrypting stores from local files, with a cold and a warm page cache
+
+Compares reading the whole file, as FileSource used to, with its memory-mapped load_store and iter_store,
+and with load_store_if_changed of an unchanged file. The page cache is dropped by posix_fadvise, Linux only.
+Run as `python -m benchmarks.bench_file_source [DIRECTORY]` with trezorpass installed, the stores are written
+to a temporary directory within DIRECTORY, which should not be on tmpfs for the cold loads to hit the disk.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from trezorpass.crypto import decrypt_stream
+from trezorpass.store.sources import FileSource
+
+from .bench_decrypt import encrypt, KEY
+
+SIZES_MB = [4, 32, 128]
+REPEATS = 5
+
+
+async def read_whole(filename: str) -> None:
+    with open(filename, "rb") as file:
+        data = file.read()
+    await decrypt_stream(KEY, _single(data), len(data))
+
+
+async def map_whole(filename: str) -> None:
+    source = FileSource(filename)
+    data = await source.load_store(None)
+    await decrypt_stream(KEY, _single(data), len(data))
+
+
+async def map_chunks(filename: str) -> None:
+    source = FileSource(filename)
+    await decrypt_stream(KEY, source.iter_store(None), os.path.getsize(filename))
+
+
+async def reload_unchanged(filename: str, source: FileSource, version: str) -> None:
+    data, _ = await source.load_store_if_changed(None, version)
+    assert data is None
+
+
+async def _single(data):
+    yield data
+
+
+def drop_cache(filename: str) -> None:
+    with open(filename, "rb") as file:
+        os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+async def measure(load, filename: str, cold: bool, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        if cold:
+            drop_cache(filename)
+        start = time.perf_counter()
+        await load(filename, *args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main():
+    print(f"{'store MB':>8} {'method':>17} {'cold s':>8} {'warm s':>8}")
+    with tempfile.TemporaryDirectory(dir=sys.argv[1] if len(sys.argv) > 1 else None) as directory:
+        for size_mb in SIZES_MB:
+            filename = os.path.join(directory, f"{size_mb}.pswd")
+            with open(filename, "wb") as file:
+                file.write(encrypt(os.urandom(size_mb * 2 ** 20)))
+            for load in (read_whole, map_whole, map_chunks):
+                cold = await measure(load, filename, True)
+                warm = await measure(load, filename, False)
+                print(f"{size_mb:>8} {load.__name__:>17} {cold:>8.3f} {warm:>8.3f}")
+            source = FileSource(filename)
+            version = (await source.stat(None)).version
+            await source.load_store(None)
+            cold = await measure(reload_unchanged, filename, True, source, version)
+            warm = await measure(reload_unchanged, filename, False, source, version)
+            print(f"{size_mb:>8} {reload_unchanged.__name__:>17} {cold:>8.3f} {warm:>8.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
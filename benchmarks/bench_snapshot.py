@@ -0,0 +1,54 @@
+"""Compares loading the store from its encrypted JSON with loading its encrypted snapshot
+
+Run as `python -m benchmarks.bench_snapshot` with trezorpass installed.
+"""
+import tempfile
+import time
+from types import SimpleNamespace
+
+from trezorpass.crypto import encrypt, wipe
+from trezorpass.store import StoreDecrypter, StoreDecoder, EntryDecoder, TagDecoder, StoreSnapshots, Store
+
+from .synthetic import generate_encoded_store
+
+SIZES = [1_000, 10_000, 50_000]
+REPEATS = 3
+VERSION = "benchmark"
+
+
+def load_json(keychain, encrypted_store: bytes, snapshots: StoreSnapshots) -> Store:
+    decrypted_store = StoreDecrypter(keychain).decrypt(encrypted_store)
+    try:
+        return StoreDecoder(keychain, EntryDecoder(), TagDecoder()).decode(decrypted_store)
+    finally:
+        wipe(decrypted_store)
+
+
+def load_snapshot(keychain, encrypted_store: bytes, snapshots: StoreSnapshots) -> Store:
+    return snapshots.load(keychain, VERSION)
+
+
+def measure(load, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        load(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    keychain = SimpleNamespace(store_name="benchmark.pswd", store_key=bytes(range(32)).hex())
+    print(f"{'entries':>8} {'method':>9} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        snapshots = StoreSnapshots(directory)
+        for size in SIZES:
+            encrypted_store = encrypt(keychain.store_key, generate_encoded_store(size))
+            snapshots.save(keychain, load_json(keychain, encrypted_store, snapshots), VERSION)
+            for load in (load_json, load_snapshot):
+                elapsed = measure(load, keychain, encrypted_store, snapshots)
+                print(f"{size:>8} {load.__name__.removeprefix('load_'):>9} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import hashlib
+import hmac
+import time
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from trezorlib import messages
+
+
+class FakeTrezorClient:
+    """Stands in for TrezorClient in the calls made by Keychain, without any device.
+
+    CipherKeyValue is answered like the device does, by AES-CBC with a key derived from the device secret,
+    the key string and the confirmation flags. Results are deterministic and decryption reverses encryption.
+
+    Args:
+        latency: Number of seconds each call takes, emulating the round trip and the user confirmation
+        secret: Secret of the emulated device, clients with the same secret derive the same keys
+    """
+    def __init__(self, latency: float = 0.0, secret: bytes = b"benchmark"):
+        self.latency = latency
+        self.secret = secret
+        self.calls = 0
+
+    def call(self, msg):
+        if not isinstance(msg, messages.CipherKeyValue):
+            raise NotImplementedError(f"{type(msg).__name__} is not emulated")
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return messages.CipheredKeyValue(value=self.cipher_keyvalue(msg))
+
+    def cipher_keyvalue(self, msg: messages.CipherKeyValue) -> bytes:
+        if len(msg.value) % 16:
+            raise ValueError("Value length must be a multiple of 16")
+        flags = f"{'E' if msg.ask_on_encrypt else ''}{'D' if msg.ask_on_decrypt else ''}"
+        key = hmac.new(self.secret, f"{msg.key}{flags}".encode(), hashlib.sha256).digest()
+        iv = msg.iv if msg.iv else bytes(16)
+        cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
+        context = cipher.encryptor() if msg.encrypt else cipher.decryptor()
+        return context.update(msg.value) + context.finalize()
+
+    def cancel(self) -> None:
+        pass
@@ -0,0 +1,151 @@
+"""Runs the benchmark suite over synthetic encrypted stores and a fake device
+
+Results are printed as a table and can be written as JSON, to be compared with the results of another run.
+Run as `python -m benchmarks.run --help` with trezorpass installed.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from trezorpass.crypto import wipe
+from trezorpass.interfaces import entry_choices
+from trezorpass.store import Keychain, EntryKeyCache, StoreDecrypter, StoreDecoder, EntryDecoder, TagDecoder, \
+    EntryDecrypter, SearchIndex
+from trezorpass.store.sources import FileSource
+from trezorpass.utils import prepare_graphics
+
+from .fake_client import FakeTrezorClient
+from .synthetic import write_encrypted_store
+
+SIZES = [1_000, 10_000]
+REPEATS = 5
+UNLOCKED_ENTRIES = 100
+QUERIES = ["service1", "service 12", "example", "user5", "login", "nothing matches this"]
+GRAPHICS = "\n".join(["#" * 52] + [f"#  {'#' * (i % 17)}{' ' * (17 - i % 17)}  Trezor Password Manager CLI  #"
+                                   for i in range(16)] + ["#" * 52])
+
+
+def best_of(repeats: int, fn: Callable[[], None], operations: int = 1) -> float:
+    """Measures the fastest of the repeated runs
+
+    Returns:
+        Number of seconds per operation
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / operations
+
+
+def run_store_benchmarks(entries_count: int, latency: float, repeats: int) -> dict[str, float]:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_encrypted_store(directory, FakeTrezorClient(), entries_count)
+        client = FakeTrezorClient(latency)
+        keychain = Keychain(client, EntryKeyCache(max_size=0))
+        source = FileSource(path)
+        decrypter = StoreDecrypter(keychain)
+        decoder = StoreDecoder(keychain, EntryDecoder(), TagDecoder())
+
+        encrypted_store = asyncio.run(source.load_store(None))
+        results["load"] = best_of(repeats, lambda: asyncio.run(FileSource(path).load_store(None)))
+        results["reload_unchanged"] = best_of(repeats, lambda: asyncio.run(source.load_store(None)))
+        results["decrypt"] = best_of(repeats, lambda: wipe(decrypter.decrypt(encrypted_store)))
+        decrypted_store = decrypter.decrypt(encrypted_store)
+        try:
+            results["decode"] = best_of(repeats, lambda: decoder.decode(decrypted_store))
+            store = decoder.decode(decrypted_store)
+        finally:
+            wipe(decrypted_store)
+        results["index"] = best_of(repeats, lambda: SearchIndex(store.entries))
+        index = SearchIndex(store.entries)
+        results["search"] = best_of(repeats, lambda: [index.search(query, limit=20) for query in QUERIES], len(QUERIES))
+        results["choices"] = best_of(repeats, lambda: entry_choices(store.entries))
+
+        entries = store.entries[:UNLOCKED_ENTRIES]
+        entry_decrypter = EntryDecrypter(keychain)
+        unlock_repeats = 1 if latency else repeats  # Each unlock waits for the device when there's a latency
+        results["unlock"] = best_of(unlock_repeats, lambda: [entry_decrypter.decrypt(entry) for entry in entries],
+                                    len(entries))
+        results["unlock_batch"] = best_of(unlock_repeats, lambda: list(entry_decrypter.decrypt_many(entries)),
+                                          len(entries))
+        cached_decrypter = EntryDecrypter(Keychain(client, EntryKeyCache(max_size=len(entries))))
+        list(cached_decrypter.decrypt_many(entries))
+        results["unlock_cached"] = best_of(repeats, lambda: [cached_decrypter.decrypt(entry) for entry in entries],
+                                           len(entries))
+    return results
+
+
+def run(sizes: list[int], latency: float, repeats: int) -> list[dict]:
+    results = [{"benchmark": "graphics", "entries": None,
+                "seconds": best_of(repeats, lambda: prepare_graphics(GRAPHICS))}]
+    for entries_count in sizes:
+        for benchmark, seconds in run_store_benchmarks(entries_count, latency, repeats).items():
+            results.append({"benchmark": benchmark, "entries": entries_count, "seconds": seconds})
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+    """Finds results slower than their baseline by more than the tolerance"""
+    baseline_seconds = {(result["benchmark"], result["entries"]): result["seconds"] for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_seconds.get((result["benchmark"], result["entries"]))
+        result["baseline_seconds"] = previous
+        if previous and result["seconds"] > previous * (1 + tolerance):
+            regressions.append(result)
+    return regressions
+
+
+def print_results(results: list[dict]) -> None:
+    print(f"{'benchmark':>17} {'entries':>8} {'seconds/op':>12} {'baseline':>12}")
+    for result in results:
+        baseline = result.get("baseline_seconds")
+        print(f"{result['benchmark']:>17} {result['entries'] or '-':>8} {result['seconds']:>12.6f} "
+              f"{f'{baseline:.6f}' if baseline else '-':>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the trezorpass benchmark suite.")
+    parser.add_argument("--entries", type=int, nargs="+", default=SIZES, help="sizes of the generated stores")
+    parser.add_argument("--latency", type=float, default=0.0, metavar="SECONDS",
+                        help="duration of each device call, unlocks are measured once if it's set")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="number of runs, the fastest one is reported")
+    parser.add_argument("--output", type=str, metavar="FILE", help="writes the results as JSON")
+    parser.add_argument("--baseline", type=str, metavar="FILE", help="compares the results with a previous output")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative slowdown against the baseline that is reported as a regression")
+    args = parser.parse_args()
+
+    results = run(args.entries, args.latency, args.repeats)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        if baseline["latency"] != args.latency:
+            print(f"The baseline has been measured with {baseline['latency']} s latency, unlocks aren't comparable")
+        regressions = compare(results, baseline["results"], args.tolerance)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "latency": args.latency,
+                "repeats": args.repeats,
+                "results": results
+            }, file, indent=2)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(result['benchmark'] for result in regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import os
+import random
+
+from trezorpass.crypto import encrypt
+from trezorpass.store import Keychain, Entry
+
+TAGS = ["All", "Social", "Bitcoin", "Work", "Finance", "Shopping"]
+
+
+def generate_store_dict(entries_count: int, seed: int = 0) -> dict:
+    """Generates a decrypted store in the format of Trezor Password Manager.
+    Ciphertexts are random bytes of realistic length, they are not decryptable.
+
+    Args:
+        entries_count: Number of entries in the store
+        seed: Seed of the random generator
+    """
+    rng = random.Random(seed)
+    tags = {str(i): {"title": title, "icon": "tag"} for i, title in enumerate(TAGS)}
+    entries = {}
+    for i in range(entries_count):
+        domain = f"service{i}.example.com"
+        entries[str(i)] = {
+            "title": f"https://{domain}/login",
+            "username": f"user{rng.randrange(10 ** 6)}@example.com",
+            "nonce": rng.randbytes(32).hex(),
+            "note": f"Service {i}",
+            "password": {"type": "Buffer", "data": list(rng.randbytes(12 + 16 + rng.randrange(10, 40)))},
+            "safe_note": {"type": "Buffer", "data": list(rng.randbytes(12 + 16 + rng.randrange(2, 200)))},
+            "tags": rng.sample(range(1, len(TAGS)), rng.randrange(0, 3)),
+            "success": True,
+            "export": False
+        }
+    return {"version": "0.0.1", "extVersion": "0.6.0", "config": {"orderType": "date"}, "tags": tags, "entries": entries}
+
+
+def generate_encoded_store(entries_count: int, seed: int = 0) -> bytes:
+    """Generates a decrypted and JSON encoded store, see generate_store_dict"""
+    return json.dumps(generate_store_dict(entries_count, seed)).encode("utf8")
+
+
+def generate_encrypted_store(client, entries_count: int, seed: int = 0) -> tuple[str, bytes]:
+    """Generates a store encrypted the way Trezor Password Manager does it, see generate_store_dict.
+    Unlike there, entry secrets are encrypted by the entry keys and are decryptable.
+
+    Args:
+        client: Client whose keychain encrypts the store, e.g. FakeTrezorClient
+        entries_count: Number of entries in the store
+        seed: Seed of the random generator
+
+    Returns:
+        Name of the store and the encrypted store
+    """
+    rng = random.Random(seed)
+    keychain = Keychain(client)
+    store_dict = generate_store_dict(entries_count, seed)
+    for entry_dict in store_dict["entries"].values():
+        key = keychain.entry_key(Entry(
+            url=entry_dict["title"],
+            title=entry_dict["note"],
+            username=entry_dict["username"],
+            nonce=entry_dict["nonce"]
+        ))
+        password = rng.randbytes(rng.randrange(8, 24)).hex()
+        safe_note = " ".join(rng.choice(["note", "pin", "backup", "code"]) for _ in range(rng.randrange(0, 20)))
+        entry_dict["password"]["data"] = list(encrypt(key, json.dumps(password).encode("utf8")))
+        entry_dict["safe_note"]["data"] = list(encrypt(key, json.dumps(safe_note).encode("utf8")))
+    keychain.close()
+    return keychain.store_name, encrypt(keychain.store_key, json.dumps(store_dict).encode("utf8"))
+
+
+def write_encrypted_store(directory: str, client, entries_count: int, seed: int = 0) -> str:
+    """Writes a store generated by generate_encrypted_store into the directory
+
+    Returns:
+        Path of the store file
+    """
+    store_name, encrypted_store = generate_encrypted_store(client, entries_count, seed)
+    path = os.path.join(directory, store_name)
+    with open(path, "wb") as file:
+        file.write(encrypted_store)
+    return path
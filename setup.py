@@ -25,6 +25,10 @@ setup(
     packages=find_packages(where="src"),
     python_requires=">=3.10, <4",
     install_requires=["trezor", "cryptography", "inquirerpy", "dropbox", "appdirs", "pyperclip", "prompt-toolkit"],
+    extras_require={
+        "udev": ["pyudev"],
+        "s3": ["boto3"],
+    },
     entry_points={
         "console_scripts": [
             "trezor-pass=trezorpass.cli:run",
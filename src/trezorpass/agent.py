@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable
+
+from trezorlib.exceptions import Cancelled
+
+from trezorpass.appdata import APP_DIR
+from trezorpass.store import AsyncKeychain, Store, AsyncEntryDecrypter, entry_to_dict
+
+AGENT_SOCKET = os.environ.get("TREZOR_PASS_AGENT_SOCKET", os.path.join(APP_DIR, 'agent.sock'))
+IDLE_TIMEOUT = 15 * 60
+PING_TIMEOUT = 5
+
+
+class AgentError(Exception):
+    pass
+
+
+class Agent:
+    """Keeps the device session and the decoded store in memory, serving requests over a Unix socket.
+
+    Requests and responses are JSON objects, one per line. Supported commands:
+        ping: Checks the agent is running
+        search: Finds entries by "query", optionally filtered by "tags" and "limit"-ed
+        unlock: Decrypts the entry identified by "nonce", the device may ask for a confirmation
+        lock: Wipes the unlocked keys and shuts the agent down
+
+    Args:
+        keychain: Keychain of the connected device
+        store: Decoded store
+        idle_timeout: Number of seconds without a request after which the agent shuts down
+    """
+    def __init__(self, keychain: AsyncKeychain, store: Store, idle_timeout: float = IDLE_TIMEOUT):
+        self.keychain = keychain
+        self.store = store
+        self.decrypter = AsyncEntryDecrypter(keychain)
+        self.idle_timeout = idle_timeout
+        self._last_activity = time.monotonic()
+        self._locked = asyncio.Event()
+
+    async def serve(self, path: str = AGENT_SOCKET, listening: Callable[[str], None] | None = None) -> None:
+        """Serves requests until the agent is locked or idle for too long
+
+        Args:
+            path: Path of the socket
+            listening: Called with the path once the agent accepts requests
+
+        Raises:
+            AgentError: Another agent is serving on the path
+        """
+        if await AgentClient(path).ping():
+            raise AgentError(f"Another agent is running on {path}")
+        if os.path.exists(path):
+            os.unlink(path)  # Left by an agent that hasn't shut down cleanly
+        umask = os.umask(0o077)  # The socket is never accessible to others, even for a moment
+        try:
+            server = await asyncio.start_unix_server(self._handle_connection, path)
+        finally:
+            os.umask(umask)
+        if listening:
+            listening(path)
+        try:
+            while not self._locked.is_set():
+                idle = time.monotonic() - self._last_activity
+                if idle >= self.idle_timeout:
+                    logging.info("Agent has been idle for %d s, shutting down", idle)
+                    break
+                try:
+                    await asyncio.wait_for(self._locked.wait(), self.idle_timeout - idle)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            server.close()
+            await server.wait_closed()
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def lock(self) -> None:
+        self.keychain.close()
+        self._locked.set()
+
+    async def handle(self, request: dict) -> dict:
+        self._last_activity = time.monotonic()
+        command = request.get("command")
+        if command == "ping":
+            return {}
+        elif command == "search":
+            matches = self.store.search(request.get("query", ""), request.get("tags", ()), request.get("limit"))
+            return {"entries": [entry_to_dict(entry, self.store.label(entry)) for entry in matches]}
+        elif command == "unlock":
+            entry = next((entry for entry in self.store.entries if entry.nonce == request.get("nonce")), None)
+            if not entry:
+                raise AgentError("Entry not found")
+            decrypted = await self.decrypter.decrypt(entry)
+            return {"entry": entry_to_dict(decrypted, self.store.label(entry))}
+        elif command == "lock":
+            self.lock()
+            return {}
+        raise AgentError(f"Unknown command {command}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.handle(json.loads(line))
+                except (AgentError, Cancelled, ValueError) as e:
+                    response = {"error": str(e) or type(e).__name__}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception:
+            logging.exception("Agent connection has failed")
+        finally:
+            writer.close()
+
+
+class AgentClient:
+    """Sends requests to a running agent
+
+    Args:
+        path: Path of the agent socket
+    """
+    def __init__(self, path: str = AGENT_SOCKET):
+        self.path = path
+
+    def available(self) -> bool:
+        """Whether the agent socket exists, it may be left by an agent that is gone though, see ping"""
+        return os.path.exists(self.path)
+
+    async def ping(self) -> bool:
+        """Whether an agent answers on the socket, an agent that doesn't answer in time is considered running"""
+        try:
+            await asyncio.wait_for(self.request("ping"), PING_TIMEOUT)
+        except asyncio.TimeoutError:
+            return True
+        except (OSError, AgentError):
+            return False
+        return True
+
+    async def request(self, command: str, **kwargs) -> dict:
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        try:
+            writer.write(json.dumps({"command": command, **kwargs}).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+        finally:
+            writer.close()
+        if not line:
+            raise AgentError("Agent has closed the connection")
+        try:
+            response = json.loads(line)
+        except ValueError as e:
+            raise AgentError("Invalid response of the agent") from e
+        if "error" in response:
+            raise AgentError(response["error"])
+        return response
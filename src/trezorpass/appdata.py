@@ -1,6 +1,10 @@
 import logging
+import os
 import shutil
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Iterator
 
 import appdirs
 
@@ -8,6 +12,7 @@ APP_DIR = appdirs.user_data_dir('trezor-pass')
 
 
 def init_data():
+    """Creates the application data directory, called on the start of a session rather than on import"""
     try:
         Path(APP_DIR).mkdir(parents=True, exist_ok=True)
     except:
@@ -19,4 +24,23 @@ def clear_data():
     shutil.rmtree(APP_DIR, ignore_errors=True)
 
 
-init_data()
+@contextmanager
+def atomic_file(path: str | os.PathLike) -> Iterator[BinaryIO]:
+    """Opens a new file readable by the owner only, which replaces the file at the path once it's written and synced
+    to the disk. A failed write leaves the file at the path as it was, so it's never left half written."""
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_atomic(path: str | os.PathLike, data: bytes) -> None:
+    """Replaces the file at the path with the data, see atomic_file"""
+    with atomic_file(path) as file:
+        file.write(data)
@@ -0,0 +1,187 @@
+import hmac
+import math
+import mmap
+import os
+import secrets
+import string
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from hashlib import sha1, sha256
+from multiprocessing import get_context
+from typing import TYPE_CHECKING, Callable, Iterable
+
+if TYPE_CHECKING:  # Kept out of the imports of the worker processes
+    from trezorpass.store import EncryptedEntry, EntryDecrypter
+
+WEAK_BITS = 50
+CHUNK_SIZE = 256
+_HASH_LENGTH = 40  # Hex encoded SHA-1
+
+_breach_index: 'BreachIndex | None' = None  # Opened by each worker process, see _init_worker
+
+
+@dataclass(kw_only=True)
+class PasswordAudit:
+    """Findings about the password of an entry, the password itself is never kept"""
+    title: str
+    store: str | None = None
+    strength: float
+    breaches: int = 0
+    reuses: int = 0
+
+    @property
+    def weak(self) -> bool:
+        return self.strength < WEAK_BITS
+
+    @property
+    def findings(self) -> list[str]:
+        findings = []
+        if self.breaches:
+            findings.append(f"breached {self.breaches} times")
+        if self.reuses:
+            findings.append(f"reused in {self.reuses + 1} entries")
+        if self.weak:
+            findings.append(f"weak ({self.strength:.0f} bits)")
+        return findings
+
+
+class BreachIndex:
+    """Looks up passwords in a file of breached password hashes, such as the one of Have I Been Pwned.
+
+    The file holds a hex encoded SHA-1 hash per line, optionally followed by a colon and the number of breaches,
+    sorted by the hash in uppercase. It's memory-mapped and binary searched, so that files of any size are
+    searched without reading them.
+
+    Args:
+        path: Path of the hash file
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            self._mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if hasattr(mmap, "MADV_RANDOM") and size:
+            self._mapped.madvise(mmap.MADV_RANDOM)
+
+    def breaches(self, password: str) -> int:
+        """Number of breaches the password has appeared in, zero if it's not in the file"""
+        return self.lookup(sha1(password.encode("utf8")).hexdigest().upper().encode("ascii"))
+
+    def lookup(self, hash_hex: bytes) -> int:
+        mapped = self._mapped
+        low, high = 0, len(mapped)
+        while low < high:  # Both bounds are at starts of lines
+            middle = (low + high) // 2
+            start = mapped.rfind(b"\n", low, middle) + 1 or low
+            end = mapped.find(b"\n", start, high)
+            end = high if end < 0 else end
+            line_hash = mapped[start:start + _HASH_LENGTH]
+            if line_hash == hash_hex:
+                _, _, count = mapped[start:end].partition(b":")
+                return int(count) if count.strip() else 1
+            if line_hash < hash_hex:
+                low = end + 1
+            else:
+                high = start
+        return 0
+
+    def close(self) -> None:
+        if isinstance(self._mapped, mmap.mmap):
+            self._mapped.close()
+
+    def __enter__(self) -> 'BreachIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PasswordAuditor:
+    """Audits passwords of entries for weakness, reuse and breaches.
+
+    Entries are unlocked in a single device session while the passwords unlocked so far are being scored
+    by a pool of worker processes. The passwords leave the workers only as digests keyed by a key of the audit,
+    which are compared to find the reused ones.
+
+    Args:
+        decrypter: Decrypter of the entries
+        breach_file: Path of the breached password hashes, see BreachIndex
+        workers: Number of worker processes, the number of CPUs by default
+    """
+    def __init__(self, decrypter: 'EntryDecrypter', breach_file: str | None = None, workers: int | None = None):
+        self.decrypter = decrypter
+        self.breach_file = breach_file
+        self.workers = workers
+
+    def audit(self, entries: Iterable['EncryptedEntry'], label: Callable[['EncryptedEntry'], str | None] | None = None,
+              progress: Callable[[int], None] | None = None) -> list[PasswordAudit]:
+        """Audits the entries with a password, this blocks while the entries are unlocked
+
+        Args:
+            entries: Entries to be audited
+            label: Tells the store of an entry, see Store.label
+            progress: Called with the number of entries unlocked so far
+        """
+        reuse_key = secrets.token_bytes(32)
+        audits: list[PasswordAudit] = []
+        chunks: list[tuple[int, Future]] = []
+        # Workers are spawned rather than forked, so that they don't inherit the memory holding the keys
+        with ProcessPoolExecutor(self.workers, get_context("spawn"), initializer=_init_worker,
+                                 initargs=(self.breach_file,)) as executor:
+            entries = list(entries)
+            passwords = []
+            for unlocked, (encrypted, entry) in enumerate(zip(entries, self.decrypter.decrypt_many(entries)), 1):
+                if entry.password:
+                    audits.append(PasswordAudit(title=entry.title, store=label(encrypted) if label else None,
+                                                strength=0))
+                    passwords.append(entry.password)
+                if len(passwords) == CHUNK_SIZE:
+                    chunks.append((len(audits) - len(passwords), executor.submit(_score, passwords, reuse_key)))
+                    passwords = []
+                if progress:
+                    progress(unlocked)
+            if passwords:
+                chunks.append((len(audits) - len(passwords), executor.submit(_score, passwords, reuse_key)))
+            digests = [b""] * len(audits)
+            for offset, chunk in chunks:
+                for i, (strength, breaches, digest) in enumerate(chunk.result(), offset):
+                    audits[i].strength = strength
+                    audits[i].breaches = breaches
+                    digests[i] = digest
+        reuses: dict[bytes, int] = {}
+        for digest in digests:
+            reuses[digest] = reuses.get(digest, 0) + 1
+        for audit, digest in zip(audits, digests):
+            audit.reuses = reuses[digest] - 1
+        return audits
+
+
+def estimate_strength(password: str) -> float:
+    """Estimates entropy of the password in bits by the size of its alphabet and its length.
+    Characters repeating the previous one or continuing its sequence, e.g. "aaa" or "123", don't count.
+    """
+    alphabet = 0
+    if any(c in string.ascii_lowercase for c in password):
+        alphabet += len(string.ascii_lowercase)
+    if any(c in string.ascii_uppercase for c in password):
+        alphabet += len(string.ascii_uppercase)
+    if any(c in string.digits for c in password):
+        alphabet += len(string.digits)
+    if any(c in string.punctuation or c == " " for c in password):
+        alphabet += len(string.punctuation) + 1
+    if any(not c.isascii() for c in password):
+        alphabet += 100
+    length = sum(1 for i, c in enumerate(password) if i == 0 or abs(ord(c) - ord(password[i - 1])) > 1)
+    return length * math.log2(alphabet) if alphabet > 1 else 0.0
+
+
+def _init_worker(breach_file: str | None) -> None:
+    global _breach_index
+    _breach_index = BreachIndex(breach_file) if breach_file else None
+
+
+def _score(passwords: list[str], reuse_key: bytes) -> list[tuple[float, int, bytes]]:
+    return [(
+        estimate_strength(password),
+        _breach_index.breaches(password) if _breach_index else 0,
+        hmac.new(reuse_key, password.encode("utf8"), sha256).digest()
+    ) for password in passwords]
@@ -1,56 +1,202 @@
-import asyncio
 import logging
+import os
+import re
+import sys
 
-from trezorlib.exceptions import PinException
-
-from trezorpass.store import StoreLoadError, StoreDecryptError, StoreDecodeError, get_default_store_manager, EntryDecrypter, \
-    Keychain
-from trezorpass.store.sources import Source, DropboxSource, FileSource
-from trezorpass.utils import prompt_print, welcome, goodbye
-from trezorpass.appdata import clear_data
-from trezorpass.interfaces import get_client_manager, select_entry, manage_entry
-
-
-async def cli(store_source: Source):
-    welcome()
-    try:
-        with await get_client_manager() as client:
-            keychain = Keychain(client)
-            async with get_default_store_manager(keychain, store_source) as store:
-                while True:
-                    entry = await select_entry(store.entries)
-                    await manage_entry(entry, EntryDecrypter(keychain))
-    except KeyboardInterrupt:
-        pass
-    except asyncio.CancelledError:
-        pass
-    except PinException:
-        prompt_print("Trezor pin was not valid")
-    except (StoreLoadError, StoreDecryptError, StoreDecodeError):
-        prompt_print("Failed to load the password store")
-    except BaseException as e:
-        logging.exception("CLI failed", exc_info=e)
-    finally:
-        goodbye()
+from trezorpass.appdata import init_data, clear_data
+from trezorpass.timing import start_profiling, stop_profiling
 
 
 def run():
     import argparse
-    parser = argparse.ArgumentParser(description='Command line interface for interaction with Trezor password store.')
+    parser = argparse.ArgumentParser(description='Command line interface for interaction with Trezor password store.',
+                                     parents=[shared_parser()])
     parser.add_argument("--clear", action='store_true', help="clears saved application data")
-    parser.add_argument("--store", type=str, help="specifies the store file to be used instead of remote store")
+    parser.add_argument("--search", type=str, metavar="QUERY", help="prints entries matching the query and exits")
+    parser.add_argument("--limit", type=int, default=20, help="maximum number of entries printed by --search")
+    parser.add_argument("--agent", action='store_true', help="keeps the device session and the store available to other invocations")
+    parser.add_argument("--lock", action='store_true', help="locks the running agent")
+    parser.add_argument("--no-watch", action='store_true',
+                        help="doesn't reload the store when it changes while browsing or serving as an agent")
+    parser.add_argument("--read-only", action='store_true', help="doesn't allow adding, editing or deleting entries")
+    parser.add_argument("--snapshot", action='store_true',
+                        help="keeps an encrypted snapshot of the decoded store for a faster start while the store is unchanged")
+    parser.add_argument("--healthcheck-interval", type=float, metavar="SECONDS",
+                        help="interval between checks of the device connection, 1 s by default")
     parser.add_argument("--debug", action='store_true', help="print debug logs")
+    parser.add_argument("--profile", nargs="?", const="", metavar="FILE",
+                        help="prints durations of the startup stages on exit and writes them as a Chrome trace to FILE")
+    subparsers = parser.add_subparsers(dest="command")
+    # Without defaults, so that the options given before the command aren't overridden
+    command_parents = [shared_parser(argparse.SUPPRESS)]
+    get_parser = subparsers.add_parser("get", parents=command_parents,
+                                       help="prints entries including their secrets as JSON lines")
+    get_parser.add_argument("queries", nargs="*", help="titles, URLs or usernames of the entries")
+    get_parser.add_argument("--batch", action='store_true', help="reads additional queries from the standard input, one per line")
+    audit_parser = subparsers.add_parser("audit", parents=command_parents,
+                                         help="reports weak, reused and breached passwords")
+    audit_parser.add_argument("--breaches", type=str, metavar="FILE",
+                              help="file of breached SHA-1 password hashes sorted by hash, "
+                                   "e.g. the ordered by hash download of Have I Been Pwned")
+    audit_parser.add_argument("--workers", type=int, help="number of processes scoring the passwords")
+    export_parser = subparsers.add_parser("export", parents=command_parents,
+                                          help="writes all entries including their secrets")
+    export_parser.add_argument("--format", choices=["jsonl", "csv", "archive"], default="jsonl",
+                               help="JSON lines, CSV, or JSON lines encrypted by a passphrase, JSON lines by default")
+    export_parser.add_argument("--output", type=str, metavar="FILE",
+                               help="file to be written once all entries are exported, the standard output by default")
+    export_parser.add_argument("--passphrase-file", type=str, metavar="FILE",
+                               help="file whose first line is the archive passphrase, it's asked for otherwise")
+    export_parser.add_argument("--workers", type=int, help="number of threads decrypting the secrets")
     args = parser.parse_args()
+    if args.command == "audit" and args.breaches and not os.path.isfile(args.breaches):
+        parser.error(f"Breach file {args.breaches} doesn't exist")
+    if args.command == "export" and args.passphrase_file and not os.path.isfile(args.passphrase_file):
+        parser.error(f"Passphrase file {args.passphrase_file} doesn't exist")
+    try:
+        args.stores = parse_stores(args.store or ["dropbox://"])
+    except ValueError as e:
+        parser.error(str(e))
 
-    if not args.debug:
+    if args.debug:
+        logging.basicConfig()
+        logging.getLogger("trezorpass").setLevel(logging.DEBUG)
+    else:
         logging.disable()
 
-    if args.clear:
-        clear_data()
-    elif args.store:
-        asyncio.run(cli(FileSource(args.store)))
+    if args.profile is not None:
+        start_profiling()
+    succeeded = True
+    try:
+        if args.clear:
+            clear_data()
+        else:
+            init_data()
+            succeeded = run_command(args)
+    finally:
+        if args.profile is not None:
+            write_profile(args.profile)
+    if not succeeded:
+        sys.exit(1)
+
+
+def shared_parser(default=None):
+    """Parser of the options accepted both before and after the command
+
+    Args:
+        default: Default of the options, argparse.SUPPRESS to leave out the options that aren't given
+    """
+    import argparse
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--store", type=str, action="append", metavar="[LABEL=]URL", default=default,
+                        help="specifies the store file or URL (file://, dropbox://[ACCOUNT], http(s)://, s3://) to be used, "
+                             "repeat it to use several stores at once, labelled by LABEL, dropbox:// by default")
+    parser.add_argument("--offline", action='store_true', default=default if default is not None else False,
+                        help="uses the cached remote store without connecting to Dropbox")
+    parser.add_argument("--tag", type=str, action="append", default=default if default is not None else [],
+                        help="considers only entries with the tag, repeat it to require several tags")
+    return parser
+
+
+def run_command(args) -> bool:
+    """Runs the command of the arguments
+
+    Returns:
+        Whether the command has succeeded, including all the queries of the get command
+    """
+    # Imported only now, as the modules needed to work with the device and the store take long to import
+    import asyncio
+    from trezorpass import session
+    from trezorpass.agent import AgentClient
+    from trezorpass.client import HEALTHCHECK_INTERVAL
+    from trezorpass.export import read_passphrase
+    from trezorpass.headless import read_queries, results_output, write_secrets_from_agent
+    from trezorpass.store import StoreSnapshots
+    from trezorpass.store.sources import SourceError, open_source
+    from trezorpass.utils import prompt_print
+
+    def run_cli(interaction, watch: bool = False, editable: bool = False) -> bool:
+        try:
+            sources = {label: open_source(url, offline=args.offline) for label, url in args.stores.items()}
+        except SourceError as e:
+            prompt_print(str(e))
+            return False
+        snapshots = StoreSnapshots() if args.snapshot else None
+        healthcheck_interval = args.healthcheck_interval if args.healthcheck_interval is not None else HEALTHCHECK_INTERVAL
+        return asyncio.run(session.cli(sources, interaction, healthcheck_interval, watch and not args.no_watch,
+                                       snapshots, editable and not args.read_only), debug=args.debug)
+
+    if args.lock:
+        if asyncio.run(session.agent_request("lock")) is None:
+            prompt_print("No agent is running")
+            return False
+        return True
+    elif args.command == "get":
+        queries = args.queries + (read_queries(sys.stdin) if args.batch else [])
+        with results_output() as output:
+            failed = asyncio.run(write_secrets_from_agent(AgentClient(), queries, output, args.tag))
+            if failed is None:
+                return run_cli(session.get(queries, output, args.tag))
+            return not failed
+    elif args.command == "audit":
+        return run_cli(session.audit(args.breaches, args.workers))
+    elif args.command == "export":
+        try:
+            passphrase = read_passphrase(args.passphrase_file) if args.format == "archive" else None
+        except ValueError as e:
+            prompt_print(str(e))
+            return False
+        if args.output:
+            return run_cli(session.export(args.output, args.format, passphrase, args.workers))
+        with results_output() as output:
+            return run_cli(session.export(output.buffer, args.format, passphrase, args.workers))
+    elif args.agent:
+        if asyncio.run(AgentClient().ping()):
+            prompt_print("An agent is already running, it can be stopped by --lock")
+            return False
+        return run_cli(session.serve_agent, watch=True)
+    elif args.search is not None:
+        if not asyncio.run(session.search_agent(args.search, args.limit, args.tag)):
+            return run_cli(session.search(args.search, args.limit, args.tag))
+        return True
     else:
-        asyncio.run(cli(DropboxSource()), debug=True if args.debug else False)
+        return run_cli(session.browse(args.tag), watch=True, editable=True)
+
+
+def parse_stores(values: list[str]) -> dict[str, str]:
+    """Pairs the store URLs with their labels, which are either given as LABEL=URL or derived from the URLs
+
+    Raises:
+        ValueError: Labels of the stores aren't unique
+    """
+    stores = {}
+    for value in values:
+        label, url = value.split("=", 1) if re.fullmatch(r"[\w-]+=.+", value, re.DOTALL) else (None, value)
+        label = label or _default_label(url)
+        if label in stores:
+            raise ValueError(f"Store label {label} is used more than once, label the stores as LABEL=URL")
+        stores[label] = url
+    return stores
+
+
+def _default_label(url: str) -> str:
+    # The account, bucket or host if there's any, otherwise the name of the file or the scheme
+    scheme, separator, location = url.partition("://")
+    if not separator or len(scheme) <= 1:
+        scheme, location = "file", url
+    host, _, path = location.partition("/")
+    if scheme == "file" or not host:
+        name = os.path.splitext(os.path.basename(location.rstrip("/\\")))[0]
+        return name or scheme
+    return host
+
+
+def write_profile(trace_file: str):
+    profiler = stop_profiling()
+    print(profiler.summary(), file=sys.stderr)
+    if trace_file:
+        with open(trace_file, "w") as file:
+            profiler.write_chrome_trace(file)
 
 
 if __name__ == "__main__":
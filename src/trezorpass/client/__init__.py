@@ -1,26 +1,54 @@
 import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
-from trezorlib.transport import get_transport
+from trezorlib.transport import get_transport, Transport
 
+from ..timing import timed
 from .client import ThreadSafeTrezorClient
 from .ui import ManagerUI
+from .watcher import DeviceWatcher
+
+HEALTHCHECK_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
 
 
 @contextmanager
-def get_default_client_manager():
-    transport = get_transport()
+def get_default_client_manager(transport: Transport | None = None, watcher: DeviceWatcher | None = None,
+                               healthcheck_interval: float = HEALTHCHECK_INTERVAL):
+    """Connects to the device, keeping watch over the connection for as long as the manager is entered
+
+    Args:
+        transport: Transport of the device, the first available one is used if not specified
+        watcher: Used to wait for the device to reconnect once the connection is lost
+        healthcheck_interval: Number of seconds between pings checking the connection
+    """
+    if not transport:
+        with timed("Device discovery"):
+            transport = get_transport()
+    watcher = watcher if watcher else DeviceWatcher()
     manager_ui = ManagerUI()
     trezor_client = ThreadSafeTrezorClient(transport, manager_ui, _init_device=False)
 
     observer = asyncio.current_task()
+    healthcheck_task = None
+    healthcheck_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="healthcheck")
 
     async def healthcheck():
+        loop = asyncio.get_event_loop()
         try:
             while healthcheck_task:
-                await asyncio.get_event_loop().run_in_executor(None, trezor_client.ping, "healthcheck")
-                await asyncio.sleep(1)
+                try:
+                    await loop.run_in_executor(healthcheck_executor, trezor_client.ping_if_idle, "healthcheck")
+                except Exception as e:
+                    logging.warning("Device connection has been lost, waiting for the device", exc_info=e)
+                    reconnected_transport = await watcher.wait()
+                    with timed("Device reconnection"):
+                        await loop.run_in_executor(healthcheck_executor, trezor_client.reconnect, reconnected_transport)
+                    logging.info("Device has been reconnected")
+                await asyncio.sleep(healthcheck_interval)
         except asyncio.CancelledError:
             pass
         except Exception as e:
@@ -28,10 +56,13 @@ def get_default_client_manager():
             logging.exception("Client healthcheck has failed", exc_info=e)
 
     try:
-        trezor_client.init_device()
+        with timed("Device initialization"):
+            trezor_client.init_device()
         healthcheck_task = asyncio.get_event_loop().create_task(healthcheck())
         yield trezor_client
     finally:
         if healthcheck_task:
             healthcheck_task.cancel()
+        healthcheck_executor.shutdown(wait=False)
         trezor_client.end_session()
+        logger.debug("Device usage: %s", trezor_client.stats)
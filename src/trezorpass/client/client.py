@@ -1,15 +1,85 @@
 import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 
 from trezorlib.client import TrezorClient
+from trezorlib.exceptions import TrezorException
 from trezorlib.transport import Transport
 from trezorlib.ui import TrezorClientUI
 
+from ..timing import timed
+
+
+@dataclass(kw_only=True)
+class ClientStats:
+    pings: int = 0
+    skipped_pings: int = 0
+    calls: int = 0
+    lock_wait_time: float = 0
+    call_time: float = 0
+    max_call_time: float = 0
+
+    def __str__(self):
+        average_call_time = self.call_time / self.calls if self.calls else 0
+        return (f"{self.pings} pings ({self.skipped_pings} skipped), {self.calls} calls "
+                f"(average {average_call_time:.3f} s, max {self.max_call_time:.3f} s), "
+                f"{self.lock_wait_time:.3f} s waiting for the device")
+
 
 class ThreadSafeTrezorClient(TrezorClient):
     def __init__(self, transport: Transport, ui: TrezorClientUI, **kwargs):
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()
+        self.stats = ClientStats()
         super().__init__(transport, ui, **kwargs)
 
+    def call(self, msg):
+        # The whole exchange, including button and PIN requests, must not be interleaved by other messages
+        start = time.perf_counter()
+        with self._lock:
+            acquired = time.perf_counter()
+            try:
+                with timed("Device call", message=type(msg).__name__):
+                    return super().call(msg)
+            finally:
+                call_time = time.perf_counter() - acquired
+                self.stats.calls += 1
+                self.stats.lock_wait_time += acquired - start
+                self.stats.call_time += call_time
+                self.stats.max_call_time = max(self.stats.max_call_time, call_time)
+
     def call_raw(self, msg):
         with self._lock:
             return super().call_raw(msg)
+
+    def ping_if_idle(self, msg: str) -> bool:
+        """Pings the device unless it is busy with another call
+
+        Returns:
+            Whether the device has been pinged
+        """
+        if not self._lock.acquire(blocking=False):
+            self.stats.skipped_pings += 1
+            return False
+        try:
+            self.ping(msg)
+            self.stats.pings += 1
+            return True
+        finally:
+            self._lock.release()
+
+    def reconnect(self, transport: Transport) -> None:
+        """Resumes the session over a new transport of the same device"""
+        with self._lock:
+            device_id = self.features.device_id
+            self.transport = transport
+            self.session_counter = 0
+            self.init_device(session_id=self.session_id)
+            if self.features.device_id != device_id:
+                raise TrezorException("A different device has been connected")
+
+    @contextmanager
+    def exclusive(self):
+        """Reserves the device for the calling thread, so that a sequence of calls isn't interleaved by others"""
+        with self._lock:
+            yield self
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+from typing import Callable
+
+from trezorlib.transport import get_transport, Transport, TransportException
+
+from ..appdata import APP_DIR
+from ..timing import timed
+
+try:
+    import pyudev
+except ImportError:
+    pyudev = None
+
+DEVICE_FILE = os.path.join(APP_DIR, 'device')
+
+
+class DeviceWatcher:
+    """Waits for a Trezor device to become available.
+
+    The transport path of the last found device is tried first, then all transports are enumerated.
+    Unsuccessful probes are retried with an exponential backoff, cut short by USB hotplug events when pyudev is available.
+    USB devices are monitored only while waiting.
+
+    Args:
+        initial_delay: Number of seconds to wait after the first unsuccessful probe
+        max_delay: Maximum number of seconds to wait between probes
+        device_file: File remembering the transport path of the last found device
+    """
+    def __init__(self, initial_delay: float = 0.1, max_delay: float = 2.0, device_file: str = DEVICE_FILE):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.device_file = device_file
+
+    def probe(self, try_last_path: bool = True) -> Transport | None:
+        """Looks for a device, without waiting"""
+        with timed("Device probe", last_path=try_last_path):
+            return self._probe(try_last_path)
+
+    def _probe(self, try_last_path: bool) -> Transport | None:
+        last_path = self._last_path() if try_last_path else None
+        if last_path:
+            try:
+                return get_transport(last_path)
+            except TransportException:
+                pass
+        try:
+            transport = get_transport()
+        except TransportException:
+            return None
+        self._remember_path(transport.get_path())
+        return transport
+
+    async def wait(self, on_retry: Callable[[], None] | None = None) -> Transport:
+        """Waits until a device is found
+
+        Args:
+            on_retry: Called whenever an unsuccessful probe is going to be retried
+        """
+        loop = asyncio.get_event_loop()
+        transport = await loop.run_in_executor(None, self.probe, True)
+        if transport:
+            return transport
+        # Started before the next probe, so that no device plugged in meanwhile is missed
+        monitor = self._create_monitor()
+        try:
+            delay = self.initial_delay
+            while True:
+                if on_retry:
+                    on_retry()
+                if monitor:
+                    await loop.run_in_executor(None, monitor.poll, delay)
+                else:
+                    await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+                transport = await loop.run_in_executor(None, self.probe, False)
+                if transport:
+                    return transport
+        finally:
+            del monitor  # The netlink socket is closed once the monitor is released
+
+    @staticmethod
+    def _create_monitor():
+        if not pyudev:
+            return None
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            monitor.filter_by(subsystem='usb')
+            monitor.start()
+            return monitor
+        except Exception:
+            logging.exception("Unable to monitor USB devices")
+            return None
+
+    def _last_path(self) -> str | None:
+        try:
+            with open(self.device_file, 'r') as file:
+                return file.read().strip() or None
+        except OSError:
+            return None
+
+    def _remember_path(self, path: str) -> None:
+        try:
+            with open(self.device_file, 'w') as file:
+                file.write(path)
+        except OSError:
+            logging.exception("Unable to remember the device path")
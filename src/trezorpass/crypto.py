@@ -1,22 +1,134 @@
+import ctypes
+import os
+from typing import AsyncIterable
+
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
 PATH = "m/10016'/0"
 FILENAME_MESS = '5f91add3fa1c3c76e90c90a3bd0999e2bd7833d06a483fe884ee60397aca277a'
 CIPHER_IVSIZE = 96 // 8
 AUTH_SIZE = 128 // 8
+HEADER_SIZE = CIPHER_IVSIZE + AUTH_SIZE
+BLOCK_SIZE = 128 // 8
 
 
-def decrypt(key: str, data: bytes) -> bytes:
+def decrypt(key: str | bytes, data: bytes, associated_data: bytes | None = None) -> bytes:
     """Decrypts data using AES-GCM.
     Used for decrypting the store and entry secrets.
 
     Args:
-        key: Key for the data acquired from Trezor device
-        data: Binary data containing the (iv + ciphertext + authtag)
+        key: Key for the data acquired from Trezor device, either raw or hex encoded
+        data: Binary data containing the (iv + authtag + ciphertext)
+        associated_data: Data authenticated along with the plaintext, see encrypt
     """
-    iv = data[:CIPHER_IVSIZE]
-    auth_tag = data[CIPHER_IVSIZE: CIPHER_IVSIZE + AUTH_SIZE]
+    data = memoryview(data)
+    iv = bytes(data[:CIPHER_IVSIZE])
+    auth_tag = bytes(data[CIPHER_IVSIZE: CIPHER_IVSIZE + AUTH_SIZE])
     ciphertext = data[CIPHER_IVSIZE + AUTH_SIZE:]
-    cipher = Cipher(algorithms.AES(bytes.fromhex(key)), modes.GCM(iv, auth_tag))
+    if isinstance(key, str):
+        key = bytes.fromhex(key)
+    cipher = Cipher(algorithms.AES(key), modes.GCM(iv, auth_tag))
     decryptor = cipher.decryptor()
+    if associated_data:
+        decryptor.authenticate_additional_data(associated_data)
     return decryptor.update(ciphertext) + decryptor.finalize()
+
+
+def encrypt(key: str | bytes, data: bytes, associated_data: bytes | None = None) -> bytes:
+    """Encrypts data using AES-GCM, in the layout expected by decrypt
+
+    Args:
+        key: Key for the data, either raw or hex encoded
+        data: Plaintext to be encrypted
+        associated_data: Data to be authenticated along with the plaintext, but not encrypted
+    """
+    if isinstance(key, str):
+        key = bytes.fromhex(key)
+    iv = os.urandom(CIPHER_IVSIZE)
+    encryptor = Cipher(algorithms.AES(key), modes.GCM(iv)).encryptor()
+    if associated_data:
+        encryptor.authenticate_additional_data(associated_data)
+    ciphertext = encryptor.update(data) + encryptor.finalize()
+    return iv + encryptor.tag + ciphertext
+
+
+class StreamDecryptor:
+    """Decrypts AES-GCM data as it arrives, in the same layout as decrypt.
+    The plaintext is written into a single buffer, preallocated when the size of the data is known.
+    Otherwise the buffer grows as the data arrives, outgrown buffers are wiped.
+
+    Args:
+        key: Key for the data acquired from Trezor device, either raw or hex encoded
+        size_hint: Expected size of the data, including the iv and authtag
+        associated_data: Data authenticated along with the plaintext, see encrypt
+    """
+    def __init__(self, key: str | bytes, size_hint: int | None = None, associated_data: bytes | None = None):
+        self.key = bytes.fromhex(key) if isinstance(key, str) else key
+        self.associated_data = associated_data
+        self._header = bytearray()
+        self._decryptor = None
+        self._output = bytearray(max(size_hint - HEADER_SIZE, 0) + BLOCK_SIZE - 1 if size_hint else 0)
+        self._length = 0
+
+    def update(self, chunk: bytes) -> None:
+        chunk = memoryview(chunk)
+        if not self._decryptor:
+            missing = HEADER_SIZE - len(self._header)
+            self._header += chunk[:missing]
+            chunk = chunk[missing:]
+            if len(self._header) < HEADER_SIZE:
+                return
+            iv = bytes(self._header[:CIPHER_IVSIZE])
+            auth_tag = bytes(self._header[CIPHER_IVSIZE:])
+            self._decryptor = Cipher(algorithms.AES(self.key), modes.GCM(iv, auth_tag)).decryptor()
+            if self.associated_data:
+                self._decryptor.authenticate_additional_data(self.associated_data)
+        if not chunk:
+            return
+        required = self._length + len(chunk) + BLOCK_SIZE - 1
+        if len(self._output) < required:
+            self._grow(max(required, 2 * len(self._output)))
+        with memoryview(self._output) as output:
+            self._length += self._decryptor.update_into(chunk, output[self._length:])
+
+    def finalize(self) -> memoryview:
+        """Verifies the authtag
+
+        Returns:
+            View of the plaintext, it's the caller's responsibility to wipe it
+        """
+        if not self._decryptor:
+            raise ValueError("Data is incomplete")
+        self._decryptor.finalize()
+        return memoryview(self._output)[:self._length]
+
+    def wipe(self) -> None:
+        wipe(self._output)
+
+    def _grow(self, size: int) -> None:
+        # Copied into a new buffer rather than extended in place, as the reallocation would leave the plaintext
+        # in the freed memory, the old buffer is wiped instead
+        output = bytearray(size)
+        with memoryview(self._output) as decrypted:
+            output[:self._length] = decrypted[:self._length]
+        wipe(self._output)
+        self._output = output
+
+
+async def decrypt_stream(key: str | bytes, chunks: AsyncIterable[bytes], size_hint: int | None = None) -> memoryview:
+    """Decrypts data arriving in chunks, see StreamDecryptor"""
+    decryptor = StreamDecryptor(key, size_hint)
+    try:
+        async for chunk in chunks:
+            decryptor.update(chunk)
+        return decryptor.finalize()
+    except BaseException:
+        decryptor.wipe()
+        raise
+
+
+def wipe(buffer: bytearray | memoryview) -> None:
+    """Overwrites the buffer with zeros"""
+    with memoryview(buffer).cast('B') as view:
+        if len(view):
+            ctypes.memset((ctypes.c_char * len(view)).from_buffer(view), 0, len(view))
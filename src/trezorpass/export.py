@@ -0,0 +1,239 @@
+import csv
+import getpass
+import io
+import json
+import os
+import queue
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, ContextManager, Iterable, Iterator
+
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+from trezorpass.appdata import atomic_file
+from trezorpass.crypto import encrypt, decrypt, wipe
+from trezorpass.store import Keychain, EntryDecrypter, EncryptedEntry, DecryptedEntry, entry_to_dict
+
+EXPORT_FORMATS = ["jsonl", "csv", "archive"]
+CSV_FIELDS = ["title", "url", "username", "password", "safe_note", "tags", "store"]
+PIPELINE_DEPTH = 64  # Entries unlocked ahead of the written ones
+ARCHIVE_MAGIC = b"TPEXPORT\x00\x01"
+ARCHIVE_FRAME_SIZE = 1 << 16
+ARCHIVE_SCRYPT_COST = 1 << 15
+_SALT_SIZE = 16
+_FRAME_PREFIX = struct.Struct(">?I")  # Whether the frame is the last one, length of the encrypted frame
+
+_END = object()
+
+
+class JsonLinesWriter:
+    """Writes the entries as JSON lines, in the format of the get command"""
+    def __init__(self, output: BinaryIO):
+        self.output = output
+
+    def write(self, entry: DecryptedEntry, store: str | None = None) -> None:
+        self.output.write(json.dumps(entry_to_dict(entry, store)).encode("utf8") + b"\n")
+
+    def close(self) -> None:
+        self.output.flush()
+
+
+class CsvWriter:
+    """Writes the entries as CSV with a header, tags are separated by commas within their column"""
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self._row = io.StringIO()
+        self._writer = csv.DictWriter(self._row, CSV_FIELDS, extrasaction="ignore")
+        self._writer.writeheader()
+        self._write_row()
+
+    def write(self, entry: DecryptedEntry, store: str | None = None) -> None:
+        row = entry_to_dict(entry, store)
+        row["tags"] = ",".join(row["tags"])
+        self._writer.writerow(row)
+        self._write_row()
+
+    def close(self) -> None:
+        self.output.flush()
+
+    def _write_row(self) -> None:
+        self.output.write(self._row.getvalue().encode("utf8"))
+        self._row.seek(0)
+        self._row.truncate()
+
+
+class ArchiveWriter:
+    """Writes the entries as JSON lines encrypted by a key derived from a passphrase, so that the archive can be
+    restored without the device, see read_archive.
+
+    The lines are encrypted in frames of a bounded size as they are written, each frame is authenticated
+    along with the header, its index and whether it's the last one, so that frames can't be reordered,
+    and truncated archives are detected.
+
+    Args:
+        output: Output of the archive
+        passphrase: Passphrase the archive is encrypted by
+    """
+    def __init__(self, output: BinaryIO, passphrase: str):
+        self.output = output
+        salt = os.urandom(_SALT_SIZE)
+        self._header = ARCHIVE_MAGIC + salt + struct.pack(">I", ARCHIVE_SCRYPT_COST)
+        self._key = bytearray(_derive_key(passphrase, salt, ARCHIVE_SCRYPT_COST))
+        self._frame = bytearray()
+        self._index = 0
+        self.output.write(self._header)
+
+    def write(self, entry: DecryptedEntry, store: str | None = None) -> None:
+        self._frame += json.dumps(entry_to_dict(entry, store)).encode("utf8") + b"\n"
+        if len(self._frame) >= ARCHIVE_FRAME_SIZE:
+            self._write_frame(last=False)
+
+    def close(self) -> None:
+        """Writes the last frame, an archive without it is incomplete"""
+        self._write_frame(last=True)
+        self.output.flush()
+        wipe(self._key)
+
+    def _write_frame(self, last: bool) -> None:
+        encrypted = encrypt(bytes(self._key), self._frame, _frame_data(self._header, self._index, last))
+        self.output.write(_FRAME_PREFIX.pack(last, len(encrypted)) + encrypted)
+        wipe(self._frame)
+        self._frame.clear()
+        self._index += 1
+
+
+def read_archive(file: BinaryIO, passphrase: str) -> Iterator[dict]:
+    """Reads the entries of an archive written by ArchiveWriter
+
+    Raises:
+        ValueError: The file isn't an archive, the passphrase is wrong, or the archive is damaged or incomplete
+    """
+    header = file.read(len(ARCHIVE_MAGIC) + _SALT_SIZE + 4)
+    if len(header) < len(ARCHIVE_MAGIC) + _SALT_SIZE + 4 or not header.startswith(ARCHIVE_MAGIC):
+        raise ValueError("Not an export archive")
+    salt = header[len(ARCHIVE_MAGIC):len(ARCHIVE_MAGIC) + _SALT_SIZE]
+    cost, = struct.unpack(">I", header[-4:])
+    key = _derive_key(passphrase, salt, cost)
+    index = 0
+    while len(prefix := file.read(_FRAME_PREFIX.size)) == _FRAME_PREFIX.size:
+        last, length = _FRAME_PREFIX.unpack(prefix)
+        try:
+            frame = decrypt(key, file.read(length), _frame_data(header, index, last))
+        except Exception as e:
+            raise ValueError("The archive is damaged or the passphrase is wrong") from e
+        for line in frame.splitlines():
+            yield json.loads(line)
+        if last:
+            return
+        index += 1
+    raise ValueError("The archive is incomplete")
+
+
+class StoreExporter:
+    """Exports decrypted entries through a pipeline, in which the entry keys are being unlocked by the device
+    while the secrets of the unlocked entries are decrypted by a pool of threads and the decrypted entries
+    are written by another thread. Only a bounded number of entries is in flight, whatever the size of the store.
+
+    Args:
+        keychain: Keychain of the connected device
+        workers: Number of threads decrypting the secrets
+    """
+    def __init__(self, keychain: Keychain, workers: int | None = None):
+        self.keychain = keychain
+        self.workers = workers
+
+    def export(self, entries: Iterable[EncryptedEntry], writer: JsonLinesWriter | CsvWriter | ArchiveWriter,
+               label: Callable[[EncryptedEntry], str | None] | None = None,
+               progress: Callable[[int], None] | None = None) -> int:
+        """Exports the entries in their order, this blocks while the entries are unlocked. The writer isn't closed.
+
+        Args:
+            entries: Entries to be exported
+            writer: Writer of the decrypted entries
+            label: Tells the store of an entry, see Store.label
+            progress: Called with the number of entries written so far
+
+        Returns:
+            Number of exported entries
+        """
+        unlocked: queue.Queue = queue.Queue(PIPELINE_DEPTH)
+        failed = threading.Event()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="export-decrypt") as decrypters, \
+                ThreadPoolExecutor(1, thread_name_prefix="export-write") as writers:
+            written = writers.submit(_write, unlocked, writer, label, progress, failed)
+            try:
+                for entry, key in self.keychain.entry_keys(entries):
+                    if failed.is_set():
+                        break  # Nothing more is written, the failure is raised by the writing thread
+                    unlocked.put((entry, decrypters.submit(EntryDecrypter.decrypt_with_key, entry, key)))
+            finally:
+                unlocked.put(_END)
+            return written.result()
+
+
+def _write(unlocked: queue.Queue, writer, label: Callable[[EncryptedEntry], str | None] | None,
+           progress: Callable[[int], None] | None, failed: threading.Event) -> int:
+    count = 0
+    failure = None
+    while (item := unlocked.get()) is not _END:
+        if failure:
+            continue  # Drained, so that unlocking isn't blocked by the full queue
+        entry, decrypted = item
+        try:
+            writer.write(decrypted.result(), label(entry) if label else None)
+        except BaseException as e:
+            failure = e
+            failed.set()
+            continue
+        count += 1
+        if progress:
+            progress(count)
+    if failure:
+        raise failure
+    return count
+
+
+def open_writer(export_format: str, output: BinaryIO, passphrase: str | None = None):
+    """Creates the writer of the format, one of EXPORT_FORMATS, archives need the passphrase"""
+    if export_format == "jsonl":
+        return JsonLinesWriter(output)
+    if export_format == "csv":
+        return CsvWriter(output)
+    if export_format == "archive":
+        if not passphrase:
+            raise ValueError("Archives need a passphrase")
+        return ArchiveWriter(output, passphrase)
+    raise ValueError(f"Unknown export format {export_format}")
+
+
+def export_file(path: str) -> ContextManager[BinaryIO]:
+    """Opens a new file readable by the owner only, which replaces the file at the path once the export is done.
+    A failed export leaves the file at the path as it was."""
+    return atomic_file(path)
+
+
+def read_passphrase(passphrase_file: str | None = None) -> str:
+    """Reads the archive passphrase from the first line of the file, or asks for it twice
+
+    Raises:
+        ValueError: The passphrase is empty or it hasn't been repeated correctly
+    """
+    if passphrase_file:
+        with open(passphrase_file, "r") as file:
+            passphrase = file.readline().rstrip("\r\n")
+    else:
+        passphrase = getpass.getpass("Archive passphrase: ")
+        if getpass.getpass("Repeat the passphrase: ") != passphrase:
+            raise ValueError("The passphrases don't match")
+    if not passphrase:
+        raise ValueError("The archive passphrase can't be empty")
+    return passphrase
+
+
+def _derive_key(passphrase: str, salt: bytes, cost: int) -> bytes:
+    return Scrypt(salt=salt, length=32, n=cost, r=8, p=1).derive(passphrase.encode("utf8"))
+
+
+def _frame_data(header: bytes, index: int, last: bool) -> bytes:
+    return header + struct.pack(">Q?", index, last)
@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from typing import Callable, Iterable, TextIO
+
+from trezorlib.exceptions import Cancelled
+
+from trezorpass.agent import AgentClient, AgentError
+from trezorpass.store import Store, EntryDecrypter, EncryptedEntry, entry_to_dict
+
+
+def read_queries(file: TextIO) -> list[str]:
+    """Reads newline delimited queries, skipping blank lines"""
+    return [line.strip() for line in file if line.strip()]
+
+
+def resolve(store: Store, queries: Iterable[str], tags: Iterable[str] = ()) -> list[tuple[str, EncryptedEntry | None]]:
+    """Pairs each query with the best matching entry of the store, tagged with all the tags if there are any"""
+    tags = list(tags)
+    return [(query, next(iter(store.search(query, tags, limit=1)), None)) for query in queries]
+
+
+def write_secrets(resolved: list[tuple[str, EncryptedEntry | None]], decrypter: EntryDecrypter, output: TextIO,
+                  label: Callable[[EncryptedEntry], str | None] | None = None) -> int:
+    """Unlocks the resolved entries in a single device session, writing a JSON line per query as soon as it is done.
+    Entries are labelled by their stores if the label is given, see Store.label.
+    A query that fails, e.g. by the unlock being declined on the device, gets an error record like an unmatched one.
+
+    Returns:
+        Number of the failed queries
+    """
+    failed = 0
+    with decrypter.keychain.reserved():
+        for query, entry in resolved:
+            if entry:
+                try:
+                    result = {"query": query,
+                              **entry_to_dict(decrypter.decrypt(entry), label(entry) if label else None)}
+                except Cancelled:
+                    result = {"query": query, "error": "Unlock has been cancelled"}
+                except Exception:
+                    logging.exception("Unlock has failed")
+                    result = {"query": query, "error": "Unable to unlock the entry"}
+            else:
+                result = {"query": query, "error": "No matching entry"}
+            failed += "error" in result
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    return failed
+
+
+async def write_secrets_from_agent(client: AgentClient, queries: Iterable[str], output: TextIO,
+                                   tags: Iterable[str] = ()) -> int | None:
+    """Resolves and unlocks the queries through the running agent
+
+    Returns:
+        Number of the failed queries, None if there was no agent to unlock the queries through,
+        nothing is written then
+    """
+    if not await client.ping():
+        return None
+    tags = list(tags)
+    failed = 0
+    for query in queries:
+        try:
+            matches = (await client.request("search", query=query, tags=tags, limit=1))["entries"]
+            if not matches:
+                raise AgentError("No matching entry")
+            entry = (await client.request("unlock", nonce=matches[0]["nonce"]))["entry"]
+            result = {"query": query, **entry}
+        except AgentError as e:
+            result = {"query": query, "error": str(e)}
+        except OSError:
+            result = {"query": query, "error": "Agent is not running anymore"}
+        failed += "error" in result
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+    return failed
+
+
+@contextmanager
+def results_output():
+    """Reserves the standard output for results, anything else printed meanwhile is redirected to the standard error"""
+    sys.stdout.flush()
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    saved_stdout = os.dup(sys.stdout.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    try:
+        yield output
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_stdout, sys.stdout.fileno())
+        os.close(saved_stdout)
+        output.close()
@@ -1,19 +1,21 @@
-from typing import List, TypeVar
+from typing import Callable, List, TypeVar
 import webbrowser
-import asyncio
 
 from InquirerPy import inquirer
 from pyperclip import copy
-from trezorlib.transport import TransportException
 from trezorlib.exceptions import Cancelled
 
-from trezorpass.client import get_default_client_manager
+from trezorpass.client import get_default_client_manager, DeviceWatcher, HEALTHCHECK_INTERVAL
+from trezorpass.timing import timed
 from trezorpass.utils import animate_dots, prompt_print, prompt_print_pairs
-from trezorpass.store import Entry, EncryptedEntry, EntryDecrypter
+from trezorpass.store import Entry, EncryptedEntry, DecryptedEntry, AsyncEntryDecrypter, AsyncEntryEncrypter, StoreEditor
 
 
-async def get_client_manager():
-    """Creates default TrezorClientManager
+async def get_client_manager(healthcheck_interval: float = HEALTHCHECK_INTERVAL):
+    """Waits for a Trezor device and creates default TrezorClientManager for it
+
+    Args:
+        healthcheck_interval: Number of seconds between pings checking the connection to the device
 
     Returns:
         Instance of the TrezorClientManager
@@ -24,43 +26,148 @@ async def get_client_manager():
     """
     prompt_print("Looking for a Trezor device ", end="", flush=True)
     animation = animate_dots(5)
-    while True:
-        try:
-            client = get_default_client_manager()
-            print()
-            return client
-        except TransportException:
-            next(animation)  # Keep waiting
-        except Exception:
-            print()
-            print("Unable to access a Trezor device")
-            raise
-        await asyncio.sleep(0.7)
+    watcher = DeviceWatcher()
+    try:
+        with timed("Device discovery"):
+            transport = await watcher.wait(on_retry=lambda: next(animation))
+    except Exception:
+        print()
+        print("Unable to access a Trezor device")
+        raise
+    print()
+    return get_default_client_manager(transport, watcher, healthcheck_interval)
 
 
 T = TypeVar("T", bound=Entry)
 
 
-async def select_entry(entries: List[T]) -> T:
-    """Facilitates user interaction to select an entry from the given list of entries
+def entry_choices(entries: List[T], label: Callable[[T], str | None] | None = None) -> List[dict]:
+    """Prepares choices for select_entry, these can be reused for repeated selections from the same entries
+
+    Args:
+        entries: Entries to select from
+        label: Tells the store of an entry, which is shown next to its title when there are several stores
+    """
+    if label is None:
+        return [{"value": entry, "name": entry.title} for entry in entries]
+    choices = []
+    for entry in entries:
+        store = label(entry)
+        choices.append({"value": entry, "name": f"{entry.title} [{store}]" if store else entry.title})
+    return choices
+
+
+FILTER_BY_TAG = object()  # Selected when the user asks to filter the entries by a tag, see select_entry
+ADD_ENTRY = object()  # Selected when the user asks to add an entry, see select_entry
+
+
+async def select_entry(choices: List[dict], tag_filter: bool = False, adding: bool = False) -> T:
+    """Facilitates user interaction to select an entry from the given choices
+
+    Args:
+        choices: Choices of entries prepared by entry_choices
+        tag_filter: Whether the user can ask to filter the entries by a tag instead, see select_tag
+        adding: Whether the user can ask to add an entry instead
 
     Returns:
-        A single entry from the specified list of entries
+        A single entry from the specified choices, FILTER_BY_TAG or ADD_ENTRY
 
     Raises:
         KeyboardInterrupt
     """
-    choices = [{"value": entry, "name": entry.title} for entry in entries]
-    selection = await inquirer.fuzzy(
+    instructions = (["Ctrl+T to filter by tag"] if tag_filter else []) + (["Alt+N to add an entry"] if adding else [])
+    prompt = inquirer.fuzzy(
         message="Select an entry:",
         choices=choices,
+        long_instruction=f"Press {', '.join(instructions + ['Ctrl+C to exit'])}"
+    )
+
+    def exit_with(event, result, description: str):
+        prompt.status["answered"] = True
+        prompt.status["result"] = description
+        event.app.exit(result=result)
+    if tag_filter:
+        prompt.register_kb("c-t")(lambda event: exit_with(event, FILTER_BY_TAG, "Filter by tag"))
+    if adding:
+        prompt.register_kb("alt-n")(lambda event: exit_with(event, ADD_ENTRY, "Add an entry"))
+    span = timed("Entry picker first paint", choices=len(choices)).__enter__()
+
+    def painted(_):
+        prompt.application.after_render -= painted
+        span.__exit__(None, None, None)
+    prompt.application.after_render += painted
+    selection = await prompt.execute_async()
+    return selection
+
+
+async def select_tag(tag_counts: List[tuple[str, int]]) -> str | None:
+    """Facilitates user interaction to select a tag to filter the entries by
+
+    Args:
+        tag_counts: Titles of the tags with the numbers of their entries, see TagIndex.counts
+
+    Returns:
+        Title of the selected tag, None to show all the entries
+
+    Raises:
+        KeyboardInterrupt
+    """
+    choices = [{"value": None, "name": "All entries"}]
+    choices.extend({"value": title, "name": f"{title} ({count})"} for title, count in tag_counts)
+    return await inquirer.fuzzy(
+        message="Select a tag:",
+        choices=choices,
         long_instruction="Press Ctrl+C to exit"
     ).execute_async()
-    return selection
 
 
-async def manage_entry(entry: EncryptedEntry, decrypter: EntryDecrypter) -> None:
-    """Facilitates interaction with the given entry"""
+async def fill_entry(entry: DecryptedEntry | None = None) -> DecryptedEntry:
+    """Facilitates user interaction to fill in a new entry or to edit the given one
+
+    Raises:
+        KeyboardInterrupt
+    """
+    url = await inquirer.text("URL:", default=entry.url if entry else "").execute_async()
+    title = await inquirer.text("Title:", default=entry.title if entry else "").execute_async()
+    username = await inquirer.text("Username:", default=entry.username if entry else "").execute_async()
+    password = await inquirer.secret(
+        "Password:",
+        long_instruction="Leave empty to keep the current password" if entry else ""
+    ).execute_async()
+    safe_note = await inquirer.text("Safe note:", default=entry.safe_note if entry else "").execute_async()
+    return DecryptedEntry(
+        url=url,
+        title=title,
+        username=username,
+        nonce=entry.nonce if entry else "",
+        tags=entry.tags if entry else (),
+        password=password if password or not entry else entry.password,
+        safe_note=safe_note
+    )
+
+
+async def add_entry(editor: StoreEditor, encrypter: AsyncEntryEncrypter) -> None:
+    """Facilitates user interaction to add an entry to the store of the editor"""
+    try:
+        entry = await fill_entry()
+        editor.add(await encrypter.encrypt(entry))
+        prompt_print("Entry has been added")
+    except Cancelled:
+        prompt_print("Action has been cancelled")
+    except KeyboardInterrupt:
+        pass
+
+
+async def manage_entry(entry: EncryptedEntry, decrypter: AsyncEntryDecrypter, editor: StoreEditor | None = None,
+                       encrypter: AsyncEntryEncrypter | None = None) -> None:
+    """Facilitates interaction with the given entry
+
+    Args:
+        entry: Entry to be managed
+        decrypter: Decrypter of the entry secrets
+        editor: Editor of the store of the entry, the entry is read-only without it
+        encrypter: Encrypter of the edited entry secrets, required along with the editor
+    """
     clipboard_dirty = False
     try:
         while True:
@@ -71,6 +178,8 @@ async def manage_entry(entry: EncryptedEntry, decrypter: EntryDecrypter) -> None
                 'Show entry',
                 'Show entry including secrets'
             ]
+            if editor:
+                choices.extend(['Edit entry', 'Delete entry'])
             action = await inquirer.select(
                 "Select an action:",
                 choices=choices,
@@ -83,7 +192,7 @@ async def manage_entry(entry: EncryptedEntry, decrypter: EntryDecrypter) -> None
                     copy(entry.username)
                     prompt_print("Username has been copied to the clipboard")
                 elif action == choices[2]:
-                    decrypted_entry = decrypter.decrypt(entry)
+                    decrypted_entry = await decrypter.decrypt(entry)
                     copy(decrypted_entry.password)
                     clipboard_dirty = True
                     prompt_print("Password has been copied to the clipboard")
@@ -94,7 +203,7 @@ async def manage_entry(entry: EncryptedEntry, decrypter: EntryDecrypter) -> None
                         ("Username", entry.username)
                     ])
                 elif action == choices[4]:
-                    decrypted_entry = decrypter.decrypt(entry)
+                    decrypted_entry = await decrypter.decrypt(entry)
                     prompt_print_pairs([
                         ("URL", decrypted_entry.url),
                         ("Title", decrypted_entry.title),
@@ -102,6 +211,17 @@ async def manage_entry(entry: EncryptedEntry, decrypter: EntryDecrypter) -> None
                         ("Password", decrypted_entry.password),
                         ("Safe Note", decrypted_entry.safe_note)
                     ])
+                elif action == 'Edit entry':
+                    decrypted_entry = await decrypter.decrypt(entry)
+                    edited_entry = await encrypter.encrypt(await fill_entry(decrypted_entry), entry, decrypted_entry)
+                    editor.replace(entry, edited_entry)
+                    entry = edited_entry
+                    prompt_print("Entry has been updated")
+                elif action == 'Delete entry':
+                    if await inquirer.confirm(f"Delete {entry.title}?", default=False).execute_async():
+                        editor.delete(entry)
+                        prompt_print("Entry has been deleted")
+                        return
             except Cancelled:
                 prompt_print("Action has been cancelled")
     except KeyboardInterrupt:
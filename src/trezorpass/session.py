@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from typing import Awaitable, BinaryIO, Callable, TextIO
+
+from trezorlib.exceptions import PinException
+
+from trezorpass.store import StoreLoadError, StoreDecryptError, StoreDecodeError, get_merged_store_manager, EntryDecrypter, \
+    AsyncKeychain, AsyncEntryDecrypter, StorePrefetch, Store, StoreSnapshots, AsyncEntryEncrypter, StoreSaveError, \
+    entry_to_dict
+from trezorpass.store.sources import Source
+from trezorpass.utils import prompt_print, welcome, goodbye
+from trezorpass.interfaces import get_client_manager, entry_choices, select_entry, select_tag, manage_entry, \
+    add_entry, FILTER_BY_TAG, ADD_ENTRY
+from trezorpass.timing import timed
+from trezorpass.client import HEALTHCHECK_INTERVAL
+from trezorpass.agent import Agent, AgentClient, AgentError
+from trezorpass.headless import resolve, write_secrets
+from trezorpass.audit import PasswordAuditor, PasswordAudit
+from trezorpass.export import StoreExporter, export_file, open_writer
+
+PROGRESS_INTERVAL = 0.1  # Minimum number of seconds between progress reports of long runs
+
+
+async def cli(store_sources: dict[str, Source], interaction: Callable[[AsyncKeychain, Store], Awaitable[bool | None]],
+              healthcheck_interval: float = HEALTHCHECK_INTERVAL, watch: bool = False,
+              snapshots: StoreSnapshots | None = None, editable: bool = False) -> bool:
+    """Runs the interaction with the stores, all of them are unlocked by the same device session
+
+    Args:
+        store_sources: Sources of the stores by their labels, several stores are merged into one
+        interaction: Called with the keychain and the store once they are loaded, it may return False to report
+            that it has failed
+        healthcheck_interval: Number of seconds between pings checking the connection to the device
+        watch: Whether to reload the stores when they change in their sources
+        snapshots: Snapshots to load the stores from while they are unchanged
+        editable: Whether the stores can be edited, edits are saved before the session ends
+
+    Returns:
+        Whether the session has succeeded, an interrupted one has
+    """
+    welcome()
+    prefetches = {label: StorePrefetch(source) for label, source in store_sources.items()}
+    keychain = None
+    try:
+        with await get_client_manager(healthcheck_interval) as client:
+            with timed("Master key derivation"):
+                keychain = await AsyncKeychain.create(client)
+            async with get_merged_store_manager(keychain.keychain, store_sources, prefetches, watch, snapshots,
+                                                editable) as store:
+                return await interaction(keychain, store) is not False
+    except KeyboardInterrupt:
+        return True
+    except asyncio.CancelledError:
+        return True
+    except PinException:
+        prompt_print("Trezor pin was not valid")
+    except (StoreLoadError, StoreDecryptError, StoreDecodeError):
+        prompt_print("Failed to load the password store")
+    except StoreSaveError:
+        logging.exception("Store save has failed")
+        prompt_print("Failed to save the password store, the unsaved edits have been lost")
+    except BaseException as e:
+        logging.exception("CLI failed", exc_info=e)
+    finally:
+        for prefetch in prefetches.values():
+            prefetch.cancel()
+        for source in store_sources.values():
+            await source.close()
+        if keychain:
+            keychain.close()
+        goodbye()
+    return False
+
+
+def browse(tags: list[str]):
+    async def select_entries(keychain: AsyncKeychain, store: Store):
+        decrypter = AsyncEntryDecrypter(keychain)
+        encrypter = AsyncEntryEncrypter(keychain)
+        selected_tags = tags
+        revision, choices = None, None
+        while True:
+            if revision != store.revision:  # The store has been reloaded or the tags have changed
+                with timed("Entry choices"):
+                    entries = store.tagged(selected_tags) if selected_tags else store.entries
+                    revision, choices = store.revision, entry_choices(entries, store.label)
+            entry = await select_entry(choices, tag_filter=bool(store.tags), adding=store.editor_for() is not None)
+            if entry is FILTER_BY_TAG:
+                tag = await select_tag(store.tag_index.counts())
+                selected_tags = [tag] if tag else []
+                revision = None
+            elif entry is ADD_ENTRY:
+                await add_entry(store.editor_for(), encrypter)
+            else:
+                await manage_entry(entry, decrypter, store.editor_for(entry), encrypter)
+    return select_entries
+
+
+def search(query: str, limit: int, tags: list[str]):
+    async def print_matches(keychain: AsyncKeychain, store: Store):
+        with timed("Search"):
+            matches = store.search(query, tags, limit)
+        print_entries([entry_to_dict(entry, store.label(entry)) for entry in matches])
+    return print_matches
+
+
+def print_entries(entries: list[dict]):
+    if not entries:
+        prompt_print("No matching entries")
+    for entry in entries:
+        store = f" [{entry['store']}]" if entry.get("store") else ""
+        prompt_print(f"{entry['title']} | {entry['url']} | {entry['username']}{store}")
+
+
+def get(queries: list[str], output: TextIO, tags: list[str]):
+    async def print_secrets(keychain: AsyncKeychain, store: Store) -> bool:
+        resolved = resolve(store, queries, tags)
+        failed = await keychain.run(write_secrets, resolved, EntryDecrypter(keychain.keychain), output, store.label)
+        return not failed
+    return print_secrets
+
+
+def audit(breach_file: str | None, workers: int | None):
+    async def print_report(keychain: AsyncKeychain, store: Store):
+        auditor = PasswordAuditor(EntryDecrypter(keychain.keychain), breach_file, workers)
+        total = len(store.entries)
+
+        def progress(unlocked: int):
+            prompt_print(f"Unlocked {unlocked}/{total} entries", end="\r", flush=True)
+        with timed("Audit", entries=total):
+            audits = await keychain.run(auditor.audit, store.entries, store.label, progress)
+        print()
+        print_audits(audits)
+    return print_report
+
+
+def print_audits(audits: list[PasswordAudit]):
+    """Prints the findings by entry titles, the most severe ones first"""
+    flagged = [audit for audit in audits if audit.findings]
+    flagged.sort(key=lambda audit: (audit.breaches > 0, audit.reuses > 0, audit.weak), reverse=True)
+    for audit in flagged:
+        store = f" [{audit.store}]" if audit.store else ""
+        prompt_print(f"{audit.title}{store}: {', '.join(audit.findings)}")
+    prompt_print(f"{len(flagged)} of {len(audits)} passwords have findings")
+
+
+def export(output: BinaryIO | str, export_format: str, passphrase: str | None, workers: int | None):
+    """Exports all the entries to the output, or to the file at the path replacing it once the export is done"""
+    async def write_entries(keychain: AsyncKeychain, store: Store):
+        exporter = StoreExporter(keychain.keychain, workers)
+        total = len(store.entries)
+        reported = 0.0
+
+        def progress(written: int):
+            nonlocal reported
+            if written == total or time.monotonic() - reported >= PROGRESS_INTERVAL:
+                reported = time.monotonic()
+                prompt_print(f"Exported {written}/{total} entries", end="\r", flush=True)
+        with export_file(output) if isinstance(output, str) else nullcontext(output) as file:
+            writer = open_writer(export_format, file, passphrase)
+            with timed("Export", entries=total):
+                await keychain.run(exporter.export, store.entries, writer, store.label, progress)
+            writer.close()
+        print()
+    return write_entries
+
+
+async def serve_agent(keychain: AsyncKeychain, store: Store):
+    try:
+        await Agent(keychain, store).serve(listening=lambda path: prompt_print(f"Agent is listening on {path}"))
+    except AgentError as e:
+        prompt_print(str(e))
+
+
+async def agent_request(command: str, **kwargs) -> dict | None:
+    """Sends the request to the running agent, if there is any"""
+    client = AgentClient()
+    if not client.available():
+        return None
+    try:
+        return await client.request(command, **kwargs)
+    except (ConnectionError, FileNotFoundError):
+        return None
+
+
+async def search_agent(query: str, limit: int, tags: list[str]) -> bool:
+    """Searches through the running agent
+
+    Returns:
+        Whether there was an agent to search through
+    """
+    response = await agent_request("search", query=query, tags=tags, limit=limit)
+    if response is None:
+        return False
+    print_entries(response["entries"])
+    return True
@@ -1,19 +1,130 @@
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+from contextlib import asynccontextmanager, AsyncExitStack
+
+from ..crypto import wipe
+from ..timing import timed
 
 from .entry import *
 from .store import *
 from .tag import *
+from .index import *
+from .keychain import *
 from .loaders import *
 from .decoders import *
 from .decrypters import *
+from .encoders import *
+from .encrypters import *
+from .editor import *
+from .watcher import *
+from .snapshot import *
+from .merged import *
+
+
+@asynccontextmanager
+async def get_default_store_manager(keychain: Keychain, source: Source, prefetch: StorePrefetch | None = None,
+                                    watch: bool = False, snapshots: StoreSnapshots | None = None,
+                                    editable: bool = False):
+    """Loads the store
+
+    Args:
+        keychain: Keychain of the connected device
+        source: Source to load the store from
+        prefetch: Store being loaded in advance
+        watch: Whether to keep the store up to date with the source while it's used, see StoreWatcher
+        snapshots: Snapshots to load the store from while it's unchanged in the source, see StoreSnapshots
+        editable: Whether the store can be edited, provided the source is writable, see StoreEditor
+    """
+    editable = editable and source.writable
+    # Snapshots are looked up by the current version. A loaded store takes the version of the loaded data instead,
+    # which is never newer than the data, so that a change since then triggers a reload rather than being missed
+    metadata = asyncio.create_task(source.stat(keychain.store_name)) if snapshots else None
+    tasks = [metadata]
+    snapshot_saving = None
+    editor = None
+    try:
+        version = await _version(metadata) if metadata else None
+        store = None
+        if version is not None:
+            with timed("Store snapshot loading"):
+                store = await asyncio.to_thread(snapshots.load, keychain, version)
+        if store is None:
+            store, loaded = await _load(keychain, source, prefetch, keep_encoded=editable)
+            version = loaded.version
+            if snapshots and version is not None:
+                snapshot_saving = asyncio.create_task(asyncio.to_thread(snapshots.save, keychain, store, version))
+        elif prefetch:
+            prefetch.cancel()
+        store.version = version
+        if editable:
+            editor = store.editor = StoreEditor(keychain, source, store, snapshots=snapshots)
+        if watch:
+            watcher = StoreWatcher(keychain, source, store, snapshots=snapshots, editor=editor)
+            tasks.append(asyncio.create_task(watcher.run()))
+        try:
+            yield store
+        finally:
+            if editor:
+                await editor.close()
+    finally:
+        for task in tasks:
+            if task and not task.cancel() and not task.cancelled():
+                task.exception()  # Marks a failure as handled
+        if snapshot_saving:
+            await snapshot_saving  # Saving doesn't take long and an interrupted one is never resumed
 
 
 @asynccontextmanager
-async def get_default_store_manager(keychain: Keychain, source: Source):
+async def get_merged_store_manager(keychain: Keychain, sources: dict[str, Source],
+                                   prefetches: dict[str, StorePrefetch] | None = None, watch: bool = False,
+                                   snapshots: StoreSnapshots | None = None, editable: bool = False):
+    """Loads several stores at once, sharing the keychain, and merges them, see MergedStore.
+    A single store is used as it is.
+
+    Args:
+        keychain: Keychain of the connected device
+        sources: Sources to load the stores from, by labels of the stores
+        prefetches: Stores being loaded in advance, by the same labels
+        watch: Whether to keep the stores up to date with their sources while they are used, see StoreWatcher
+        snapshots: Snapshots to load the stores from while they are unchanged, each store has its own scope
+        editable: Whether the stores can be edited, see get_default_store_manager
+    """
+    prefetches = prefetches or {}
+    async with AsyncExitStack() as stack:
+        managers = {
+            label: get_default_store_manager(keychain, source, prefetches.get(label), watch,
+                                             snapshots.scoped(label) if snapshots and len(sources) > 1 else snapshots,
+                                             editable)
+            for label, source in sources.items()
+        }
+        entered = await asyncio.gather(*(stack.enter_async_context(manager) for manager in managers.values()),
+                                       return_exceptions=True)
+        # The stores that have loaded are closed by the stack when any other one fails
+        for result in entered:
+            if isinstance(result, BaseException):
+                raise result
+        stores = dict(zip(managers, entered))
+        yield next(iter(stores.values())) if len(stores) == 1 else MergedStore(stores)
+
+
+async def _load(keychain: Keychain, source: Source, prefetch: StorePrefetch | None,
+                keep_encoded: bool = False) -> tuple[Store, SourceMetadata]:
     loader = StoreLoader(keychain)
     decrypter = StoreDecrypter(keychain)
-    decoder = StoreDecoder(keychain, EntryDecoder(), TagDecoder())
+    decoder = StoreDecoder(keychain, EntryDecoder(), TagDecoder(), keep_encoded)
+    metadata, chunks = await loader.open(source, prefetch)
+    # Sized by the source, so that the plaintext is decrypted into a single buffer
+    decrypted_store = await decrypter.decrypt_stream(chunks, metadata.size)
+    try:
+        # Decoded in a thread, so that other stores keep downloading meanwhile
+        return await asyncio.to_thread(decoder.decode, decrypted_store), metadata
+    finally:
+        wipe(decrypted_store)
+
 
-    loaded_store = await loader.load(source)
-    decrypted_store = decrypter.decrypt(loaded_store)
-    yield decoder.decode(decrypted_store)
+async def _version(metadata: asyncio.Task) -> str | None:
+    try:
+        return (await metadata).version
+    except Exception:
+        logging.exception("Unable to tell the version of the store")
+        return None
@@ -1,49 +1,195 @@
 import json
+import re
+from json.decoder import scanstring
+from typing import Iterator
 
 from .tag import Tag
 from .entry import EncryptedEntry
 from .keychain import Keychain
 from .store import Store
+from ..timing import timed
 from .errors import StoreDecodeError
 
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
 
 class EntryDecoder:
-    def decode(self, entry_dict: dict) -> EncryptedEntry:
+    def decode(self, entry_dict: dict, tags: dict[str, Tag] | None = None) -> EncryptedEntry:
+        """Decodes the entry
+
+        Args:
+            entry_dict: Entry as it's stored
+            tags: Tags of the store by their ids, the entry refers to them by the ids
+        """
+        encrypted_password = entry_dict["password"]["data"]
+        tag_ids = entry_dict.get("tags") if tags is not None else None
         return EncryptedEntry(
             url=entry_dict["title"],  # Intended
             title=entry_dict["note"],  # Intended
             username=entry_dict["username"],
             nonce=entry_dict["nonce"],
-            encrypted_password=bytes(entry_dict["password"]["data"]),
-            encrypted_safe_note=bytes(entry_dict["safe_note"]["data"]),
-            tags=[]
+            tags=tuple(tags[str(tag_id)] for tag_id in tag_ids) if tag_ids else (),
+            ciphertext=bytes(encrypted_password + entry_dict["safe_note"]["data"]),
+            password_size=len(encrypted_password)
         )
 
 
 class TagDecoder:
     def decode(self, tag_dict: dict) -> Tag:
         return Tag(
-            title=tag_dict["title"]
+            title=tag_dict["title"],
+            icon=tag_dict.get("icon")
         )
 
 
 class StoreDecoder:
-    def __init__(self, keychain: Keychain, entry_decoder: EntryDecoder, tag_decoder: TagDecoder):
+    """Decodes the store as Trezor Password Manager encodes it
+
+    Args:
+        keychain: Keychain of the connected device
+        entry_decoder: Decoder of the entries
+        tag_decoder: Decoder of the tags
+        keep_encoded: Whether to keep the entries as they are encoded, so that an edited store is saved
+            with its unchanged entries exactly as they were, see Store.encoded_entries
+    """
+    def __init__(self, keychain: Keychain, entry_decoder: EntryDecoder, tag_decoder: TagDecoder,
+                 keep_encoded: bool = False):
         self.keychain = keychain
         self.entry_decoder = entry_decoder
         self.tag_decoder = tag_decoder
+        self.keep_encoded = keep_encoded
 
     def decode(self, encoded_store: bytes) -> Store:
+        store = Store(name=self.keychain.store_name)
+        with timed("Store decoding", bytes=len(encoded_store)) as span:
+            for _ in self.decode_incrementally(encoded_store, store):
+                pass
+            store.tag_index  # Built while the store is being loaded, as it's cheap compared to the decoding
+            span.set(entries=len(store.entries))
+        return store
+
+    def decode_incrementally(self, encoded_store: bytes, store: Store) -> Iterator[EncryptedEntry]:
+        """Decodes the store entry by entry, only a single entry is parsed into Python objects at a time
+
+        Args:
+            encoded_store: Decrypted store
+            store: Store to be filled with the decoded entries and tags
+
+        Yields:
+            Entries as they get decoded
+        """
         try:
-            store_dict = json.loads(encoded_store)
-            tags_dict = store_dict['tags']
-            entries_dict = store_dict['entries']
-            tags = [self.tag_decoder.decode(tags_dict[key]) for key in tags_dict]
-            entries = [self.entry_decoder.decode(entries_dict[key]) for key in entries_dict]
-            return Store(
-                name=self.keychain.store_name,
-                entries=entries,
-                tags=tags
-            )
+            scanner = _JsonScanner(str(encoded_store, "utf8"))
+            # Entries may come before the tags, those refer to tags that get their titles once the tags are decoded
+            tags = _TagsById()
+            encoded_entries = store.encoded_entries = {} if self.keep_encoded else None
+            for key in scanner.members():
+                if key == 'entries':
+                    for _ in scanner.members():
+                        if encoded_entries is None:
+                            entry = self.entry_decoder.decode(scanner.value(), tags)
+                        else:
+                            entry_dict, text = scanner.value_with_text()
+                            entry = self.entry_decoder.decode(entry_dict, tags)
+                            # Tag ids are kept as they are encoded, the encoder checks them against the tags
+                            encoded_entries[id(entry)] = (entry, tuple(entry_dict.get("tags") or ()),
+                                                          text.encode("utf8"))
+                        store.entries.append(entry)
+                        yield entry
+                elif key == 'tags':
+                    tags_dict = scanner.value()
+                    store.tags = [tags.define(key, self.tag_decoder.decode(tags_dict[key])) for key in tags_dict]
+                else:
+                    store.metadata[key] = scanner.value()  # Kept to be written back, see StoreEncoder
+            scanner.end()
+            if tags.undefined:
+                _drop_undefined_tags(store.entries, tags.undefined)
         except Exception as e:
             raise StoreDecodeError() from e
+
+
+class _TagsById(dict):
+    """Tags by their ids, referring to a tag that hasn't been decoded yet creates it without a title"""
+    def __init__(self):
+        super().__init__()
+        self.undefined: set[int] = set()
+
+    def __missing__(self, tag_id: str) -> Tag:
+        tag = self[tag_id] = Tag(title="")
+        self.undefined.add(id(tag))
+        return tag
+
+    def define(self, tag_id: str, decoded: Tag) -> Tag:
+        tag = self.get(tag_id)
+        if tag is None:
+            tag = self[tag_id] = decoded
+        else:
+            tag.title = decoded.title
+            tag.icon = decoded.icon
+            self.undefined.discard(id(tag))
+        return tag
+
+
+def _drop_undefined_tags(entries: list[EncryptedEntry], undefined: set[int]) -> None:
+    # Tags that the store doesn't define are dropped, the entries refer only to the tags of the store
+    for entry in entries:
+        if any(id(tag) in undefined for tag in entry.tags):
+            entry.tags = tuple(tag for tag in entry.tags if id(tag) not in undefined)
+
+
+class _JsonScanner:
+    """Walks through a JSON document, parsing only the values it is asked for"""
+    def __init__(self, text: str):
+        self.text = text
+        self.index = 0
+        self._decoder = json.JSONDecoder()
+
+    def members(self) -> Iterator[str]:
+        """Iterates over keys of the object at the current position.
+        Each value has to be consumed, either by value() or members(), before the next key is requested.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.index += 1
+            return
+        while True:
+            self._expect('"')
+            key, self.index = scanstring(self.text, self.index)
+            self._expect(':')
+            self._skip()
+            yield key
+            if self._peek() == ',':
+                self.index += 1
+            else:
+                self._expect('}')
+                return
+
+    def value(self):
+        """Parses the value at the current position"""
+        self._skip()
+        value, self.index = self._decoder.raw_decode(self.text, self.index)
+        return value
+
+    def value_with_text(self) -> tuple[object, str]:
+        """Parses the value at the current position, along with the text it has been parsed from"""
+        self._skip()
+        start = self.index
+        value = self.value()
+        return value, self.text[start:self.index]
+
+    def end(self) -> None:
+        self._skip()
+        if self.index != len(self.text):
+            raise ValueError(f"Extra data at {self.index}")
+
+    def _skip(self) -> None:
+        self.index = _WHITESPACE.match(self.text, self.index).end()
+
+    def _peek(self) -> str:
+        self._skip()
+        return self.text[self.index:self.index + 1]
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expecting '{char}' at {self.index}")
+        self.index += 1
@@ -1,9 +1,11 @@
 import json
+from typing import AsyncIterable, Iterable, Iterator
 
-from ..crypto import decrypt
-from .keychain import Keychain
+from ..crypto import decrypt, decrypt_stream, StreamDecryptor
+from ..timing import timed
+from .keychain import Keychain, AsyncKeychain
 from .entry import EncryptedEntry, DecryptedEntry
-from .errors import StoreDecryptError
+from .errors import StoreDecryptError, StoreLoadError
 
 
 class EntryDecrypter:
@@ -11,9 +13,23 @@ class EntryDecrypter:
         self.keychain = keychain
 
     def decrypt(self, entry: EncryptedEntry) -> DecryptedEntry:
-        key = self.keychain.entry_key(entry)
-        password = json.loads(decrypt(key, entry.encrypted_password).decode("utf8"))
-        safe_note = json.loads(decrypt(key, entry.encrypted_safe_note).decode("utf8"))
+        return self.decrypt_with_key(entry, self.keychain.entry_key(entry))
+
+    def decrypt_many(self, entries: Iterable[EncryptedEntry]) -> Iterator[DecryptedEntry]:
+        """Decrypts multiple entries within a single device session
+
+        Yields:
+            Decrypted entries in the order of the given entries
+        """
+        for entry, key in self.keychain.entry_keys(entries):
+            yield self.decrypt_with_key(entry, key)
+
+    @staticmethod
+    def decrypt_with_key(entry: EncryptedEntry, key: bytes) -> DecryptedEntry:
+        """Decrypts the entry with its key unlocked beforehand, without any device call"""
+        with timed("Entry decryption", bytes=len(entry.ciphertext)):
+            password = json.loads(decrypt(key, entry.encrypted_password).decode("utf8"))
+            safe_note = json.loads(decrypt(key, entry.encrypted_safe_note).decode("utf8"))
         return DecryptedEntry(
             url=entry.url,
             title=entry.title,
@@ -25,12 +41,39 @@ class EntryDecrypter:
         )
 
 
+class AsyncEntryDecrypter:
+    """Decrypts entries without blocking the event loop, see AsyncKeychain"""
+    def __init__(self, keychain: AsyncKeychain):
+        self.keychain = keychain
+        self.decrypter = EntryDecrypter(keychain.keychain)
+
+    async def decrypt(self, entry: EncryptedEntry) -> DecryptedEntry:
+        return await self.keychain.run(self.decrypter.decrypt, entry)
+
+
 class StoreDecrypter:
     def __init__(self, keychain: Keychain):
         self.keychain = keychain
 
-    def decrypt(self, encrypted_store: bytes) -> bytes:
+    def decrypt(self, encrypted_store: bytes) -> memoryview:
+        """Decrypts the store into a buffer that should be wiped once the store is decoded"""
+        decryptor = StreamDecryptor(self.keychain.store_key, len(encrypted_store))
+        try:
+            with timed("Store decryption", bytes=len(encrypted_store)):
+                decryptor.update(encrypted_store)
+                return decryptor.finalize()
+        except Exception as e:
+            decryptor.wipe()
+            raise StoreDecryptError() from e
+
+    async def decrypt_stream(self, chunks: AsyncIterable[bytes], size_hint: int | None = None) -> memoryview:
+        """Decrypts the store as it's being loaded, see decrypt"""
         try:
-            return decrypt(self.keychain.store_key, encrypted_store)
+            with timed("Store decryption") as span:
+                decrypted_store = await decrypt_stream(self.keychain.store_key, chunks, size_hint)
+                span.set(bytes=len(decrypted_store))
+                return decrypted_store
+        except StoreLoadError:
+            raise
         except Exception as e:
             raise StoreDecryptError() from e
@@ -0,0 +1,195 @@
+import asyncio
+import dataclasses
+import logging
+from contextlib import suppress
+
+from ..crypto import wipe
+from ..timing import timed
+from .decoders import StoreDecoder, EntryDecoder, TagDecoder
+from .decrypters import StoreDecrypter
+from .encoders import StoreEncoder, EntryEncoder, TagEncoder
+from .encrypters import StoreEncrypter
+from .entry import EncryptedEntry
+from .errors import StoreSaveError
+from .keychain import Keychain
+from .snapshot import StoreSnapshots
+from .sources import Source, SourceConflictError
+from .store import Store
+from .tag import Tag
+
+SAVE_DELAY = 1.0
+SAVE_ATTEMPTS = 3
+
+
+class StoreEditor:
+    """Edits the store and saves it to its source.
+
+    Edits show in the store at once, but they are saved after a short delay, so that quick successive edits
+    are coalesced into a single upload. Only the edited entries are encrypted and encoded again.
+    Changes made to the source meanwhile aren't overwritten: if the store has changed since the version
+    the edits are based on, it's reloaded and the edits are applied on top of it.
+
+    Args:
+        keychain: Keychain the store has been loaded with
+        source: Source the store has been loaded from, it has to be writable
+        store: Loaded store with the version it has been loaded at, see Store.version
+        delay: Number of seconds edits are collected for before they are saved
+        snapshots: Snapshots to be updated by the saved store
+    """
+    def __init__(self, keychain: Keychain, source: Source, store: Store, delay: float = SAVE_DELAY,
+                 snapshots: StoreSnapshots | None = None):
+        self.keychain = keychain
+        self.source = source
+        self.store = store
+        self.delay = delay
+        self.snapshots = snapshots
+        self.encoder = StoreEncoder(EntryEncoder(), TagEncoder())
+        self.encrypter = StoreEncrypter(keychain)
+        self.decrypter = StoreDecrypter(keychain)
+        self.decoder = StoreDecoder(keychain, EntryDecoder(), TagDecoder(), keep_encoded=True)
+        self._edits: list[tuple[str | None, EncryptedEntry | None]] = []  # Nonce of the edited entry, new entry
+        self._saving: asyncio.Task | None = None
+        self._flushing = asyncio.Event()
+
+    @property
+    def pending(self) -> int:
+        """Number of edits that haven't been saved yet"""
+        return len(self._edits)
+
+    def add(self, entry: EncryptedEntry) -> None:
+        self._edit(None, entry)
+
+    def replace(self, entry: EncryptedEntry, new_entry: EncryptedEntry) -> None:
+        self._edit(entry.nonce, new_entry)
+
+    def delete(self, entry: EncryptedEntry) -> None:
+        self._edit(entry.nonce, None)
+
+    def rebase(self, store: Store) -> Store:
+        """Applies the pending edits to a reloaded version of the store"""
+        return _apply(store, self._edits) if self._edits else store
+
+    async def save(self) -> None:
+        """Saves the pending edits
+
+        Raises:
+            StoreSaveError: The store couldn't be saved, the edits are kept pending
+        """
+        for _ in range(SAVE_ATTEMPTS):
+            saved_edits = len(self._edits)
+            if not saved_edits:
+                return
+            if self.store.encoded_entries is None:
+                # Loaded without its encoding, e.g. from a snapshot, the entries are reloaded to be written as they are
+                await self._reload()
+            store = self.store
+            # Taken at once, as the store may be swapped while it's being encoded
+            edited = Store(name=store.name, entries=store.entries, tags=store.tags, metadata=store.metadata,
+                           version=store.version, encoded_entries=store.encoded_entries)
+            try:
+                with timed("Store save", entries=len(edited.entries)):
+                    encrypted_store = await asyncio.to_thread(self._encode, edited)
+                    metadata = await self.source.save_store(self.keychain.store_name, encrypted_store, edited.version)
+            except SourceConflictError:
+                logging.info("Store has changed in the source, applying the edits to its current version")
+                await self._reload()
+                continue
+            except Exception as e:
+                raise StoreSaveError() from e
+            del self._edits[:saved_edits]  # Edits made during the upload are saved next time
+            store.version = metadata.version
+            if self.snapshots and not self._edits:
+                await asyncio.to_thread(self.snapshots.save, self.keychain, edited, metadata.version)
+            return
+        raise StoreSaveError("Store keeps changing in the source")
+
+    async def close(self) -> None:
+        """Saves the pending edits without waiting for the delay
+
+        Raises:
+            StoreSaveError: The pending edits couldn't be saved
+        """
+        self._flushing.set()
+        if self._saving:
+            await self._saving
+        await self.save()
+
+    def _edit(self, nonce: str | None, entry: EncryptedEntry | None) -> None:
+        self._edits.append((nonce, entry))
+        self.store.swap(_apply(self.store, [(nonce, entry)]))
+        if self._saving is None or self._saving.done():
+            self._saving = asyncio.create_task(self._save_pending())
+
+    async def _save_pending(self) -> None:
+        while self._edits:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._flushing.wait(), self.delay)
+            try:
+                await self.save()
+            except StoreSaveError:
+                logging.exception("Store save has failed, the edits are saved again with the next edit")
+                return
+
+    def _encode(self, store: Store) -> bytes:
+        encoded_store = self.encoder.encode(store)
+        try:
+            return self.encrypter.encrypt(encoded_store)
+        finally:
+            wipe(encoded_store)
+
+    async def _reload(self) -> None:
+        try:
+            encrypted_store, metadata = await self.source.load_store_if_changed(self.keychain.store_name, None)
+            store = await asyncio.to_thread(self._decode, encrypted_store)
+        except Exception as e:
+            raise StoreSaveError() from e
+        store.version = metadata.version
+        self.store.swap(self.rebase(store))
+
+    def _decode(self, encrypted_store: bytes) -> Store:
+        decrypted_store = self.decrypter.decrypt(encrypted_store)
+        try:
+            return self.decoder.decode(decrypted_store)
+        finally:
+            wipe(decrypted_store)
+
+
+def _apply(base: Store, edits: list[tuple[str | None, EncryptedEntry | None]]) -> Store:
+    # Edits are looked up by the nonces of both the edited and the new entry, so applying them again is harmless
+    entries: list[EncryptedEntry | None] = list(base.entries)
+    tags = list(base.tags)
+    tags_by_title = {tag.title: tag for tag in tags}
+    positions = {entry.nonce: i for i, entry in enumerate(entries)}
+    for nonce, entry in edits:
+        i = positions.pop(nonce, None) if nonce else None
+        if entry is None:
+            if i is not None:
+                entries[i] = None
+            continue
+        entry = _retag(entry, tags_by_title, tags)
+        if i is None:
+            i = positions.get(entry.nonce)
+        if i is None:
+            i = len(entries)
+            entries.append(entry)
+        else:
+            entries[i] = entry
+        positions[entry.nonce] = i
+    store = Store(name=base.name, entries=[entry for entry in entries if entry is not None], tags=tags,
+                  metadata=base.metadata, version=base.version, encoded_entries=base.encoded_entries)
+    store.tag_index
+    return store
+
+
+def _retag(entry: EncryptedEntry, tags_by_title: dict[str, Tag], tags: list[Tag]) -> EncryptedEntry:
+    # Entries refer to the tags of the store they are in, tags missing in the store are added to it
+    if all(tags_by_title.get(tag.title) is tag for tag in entry.tags):
+        return entry
+    entry_tags = []
+    for tag in entry.tags:
+        store_tag = tags_by_title.get(tag.title)
+        if store_tag is None:
+            store_tag = tags_by_title[tag.title] = Tag(title=tag.title, icon=tag.icon)
+            tags.append(store_tag)
+        entry_tags.append(store_tag)
+    return dataclasses.replace(entry, tags=tuple(entry_tags))
@@ -0,0 +1,79 @@
+import json
+
+from ..timing import timed
+from .entry import EncryptedEntry
+from .store import Store
+from .tag import Tag
+
+_SEPARATORS = (",", ":")
+DEFAULT_TAG_ICON = "tag"
+
+
+class EntryEncoder:
+    def encode(self, entry: EncryptedEntry, tag_ids: list[int]) -> bytes:
+        """Encodes the entry as Trezor Password Manager stores it, see EntryDecoder
+
+        Args:
+            entry: Entry to be encoded
+            tag_ids: Ids of the entry tags within the store
+        """
+        return json.dumps({
+            "title": entry.url,  # Intended
+            "username": entry.username,
+            "password": {"type": "Buffer", "data": list(entry.encrypted_password)},
+            "nonce": entry.nonce,
+            "tags": tag_ids,
+            "safe_note": {"type": "Buffer", "data": list(entry.encrypted_safe_note)},
+            "note": entry.title,  # Intended
+            "success": True,
+            "export": False
+        }, separators=_SEPARATORS).encode("utf8")
+
+
+class TagEncoder:
+    def encode(self, tag: Tag) -> dict:
+        return {
+            "title": tag.title,
+            "icon": tag.icon or DEFAULT_TAG_ICON
+        }
+
+
+class StoreEncoder:
+    """Encodes the store in the format StoreDecoder decodes.
+
+    An entry that is unchanged since it has been decoded is written exactly as it was, see Store.encoded_entries,
+    so are the entries unchanged since the previous encoding. Edited entries are new objects,
+    so only those get encoded again.
+    """
+    def __init__(self, entry_encoder: EntryEncoder, tag_encoder: TagEncoder):
+        self.entry_encoder = entry_encoder
+        self.tag_encoder = tag_encoder
+        self._encoded: dict[int, tuple[EncryptedEntry, tuple[int, ...], bytes]] = {}
+
+    def encode(self, store: Store) -> bytearray:
+        """Encodes the store into a buffer that should be wiped once the store is encrypted"""
+        with timed("Store encoding", entries=len(store.entries)) as span:
+            tag_ids = {id(tag): i for i, tag in enumerate(store.tags)}
+            document = {key: value for key, value in store.metadata.items() if key not in ("tags", "entries")}
+            document["tags"] = {str(i): self.tag_encoder.encode(tag) for i, tag in enumerate(store.tags)}
+            encoded = bytearray(json.dumps(document, separators=_SEPARATORS).encode("utf8"))
+            del encoded[-1:]  # The entries are appended to the document
+            encoded += b',"entries":{'
+            encoded_entries = {}
+            for i, entry in enumerate(store.entries):
+                entry_tag_ids = tuple(tag_ids[id(tag)] for tag in entry.tags)
+                cached = self._encoded.get(id(entry))
+                if cached is None and store.encoded_entries:
+                    cached = store.encoded_entries.get(id(entry))
+                if cached is None or cached[0] is not entry or cached[1] != entry_tag_ids:
+                    cached = (entry, entry_tag_ids, self.entry_encoder.encode(entry, list(entry_tag_ids)))
+                    span.add("encoded", 1)
+                encoded_entries[id(entry)] = cached
+                if i:
+                    encoded += b","
+                encoded += b'"%d":' % i
+                encoded += cached[2]
+            encoded += b"}}"
+            self._encoded = encoded_entries
+            span.set(bytes=len(encoded))
+        return encoded
@@ -0,0 +1,66 @@
+import json
+
+from ..crypto import encrypt
+from ..timing import timed
+from .keychain import Keychain, AsyncKeychain, entry_key_message
+from .entry import EncryptedEntry, DecryptedEntry
+
+
+class EntryEncrypter:
+    """Encrypts secrets of entries, the reverse of EntryDecrypter"""
+    def __init__(self, keychain: Keychain):
+        self.keychain = keychain
+
+    def encrypt(self, entry: DecryptedEntry, previous: EncryptedEntry | None = None,
+                previous_secrets: DecryptedEntry | None = None) -> EncryptedEntry:
+        """Encrypts the entry, reusing whatever is unchanged since its previous version
+
+        Args:
+            entry: Entry to be encrypted, its nonce is ignored
+            previous: Previous version of the entry, its key is reused unless the URL host or the username changed,
+                as the key is bound to them. A new key is created by the device otherwise.
+            previous_secrets: Decrypted previous version, its ciphertexts are reused if the secrets are unchanged
+        """
+        same_key = previous is not None and entry_key_message(previous) == entry_key_message(entry)
+        if same_key and previous_secrets is not None and previous_secrets.password == entry.password \
+                and previous_secrets.safe_note == entry.safe_note:
+            ciphertext, password_size = previous.ciphertext, previous.password_size
+            nonce = previous.nonce
+        else:
+            if same_key:
+                nonce, key = previous.nonce, self.keychain.entry_key(previous)
+            else:
+                nonce, key = self.keychain.create_entry_key(entry)
+            with timed("Entry encryption"):
+                encrypted_password = encrypt(key, json.dumps(entry.password).encode("utf8"))
+                encrypted_safe_note = encrypt(key, json.dumps(entry.safe_note).encode("utf8"))
+            ciphertext, password_size = encrypted_password + encrypted_safe_note, len(encrypted_password)
+        return EncryptedEntry(
+            url=entry.url,
+            title=entry.title,
+            username=entry.username,
+            nonce=nonce,
+            tags=entry.tags,
+            ciphertext=ciphertext,
+            password_size=password_size
+        )
+
+
+class AsyncEntryEncrypter:
+    """Encrypts entries without blocking the event loop, see AsyncKeychain"""
+    def __init__(self, keychain: AsyncKeychain):
+        self.keychain = keychain
+        self.encrypter = EntryEncrypter(keychain.keychain)
+
+    async def encrypt(self, entry: DecryptedEntry, previous: EncryptedEntry | None = None,
+                      previous_secrets: DecryptedEntry | None = None) -> EncryptedEntry:
+        return await self.keychain.run(self.encrypter.encrypt, entry, previous, previous_secrets)
+
+
+class StoreEncrypter:
+    def __init__(self, keychain: Keychain):
+        self.keychain = keychain
+
+    def encrypt(self, encoded_store: bytes) -> bytes:
+        with timed("Store encryption", bytes=len(encoded_store)):
+            return encrypt(self.keychain.store_key, encoded_store)
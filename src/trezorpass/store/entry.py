@@ -3,22 +3,50 @@ from dataclasses import dataclass
 from .tag import Tag
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Entry:
     url: str
     title: str
     username: str
     nonce: str
-    tags: list[Tag]
+    tags: tuple[Tag, ...] = ()
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class EncryptedEntry(Entry):
-    encrypted_password: bytes
-    encrypted_safe_note: bytes
+    """Entry with its secrets still encrypted.
+    Both ciphertexts share a single buffer, the password one comes first.
+    """
+    ciphertext: bytes
+    password_size: int
 
+    @property
+    def encrypted_password(self) -> memoryview:
+        return memoryview(self.ciphertext)[:self.password_size]
 
-@dataclass(kw_only=True)
+    @property
+    def encrypted_safe_note(self) -> memoryview:
+        return memoryview(self.ciphertext)[self.password_size:]
+
+
+@dataclass(kw_only=True, slots=True)
 class DecryptedEntry(Entry):
     password: str
     safe_note: str
+
+
+def entry_to_dict(entry: Entry, store_label: str | None = None) -> dict:
+    """Plain form of the entry, as the agent responds with it and as it's written out, e.g. by exports"""
+    entry_dict = {
+        "title": entry.title,
+        "url": entry.url,
+        "username": entry.username,
+        "nonce": entry.nonce,
+        "tags": [tag.title for tag in entry.tags]
+    }
+    if store_label:
+        entry_dict["store"] = store_label
+    if isinstance(entry, DecryptedEntry):
+        entry_dict["password"] = entry.password
+        entry_dict["safe_note"] = entry.safe_note
+    return entry_dict
@@ -12,3 +12,7 @@ class StoreLoadError(Exception):
 
 class EntryDecryptError(Exception):
     pass
+
+
+class StoreSaveError(Exception):
+    pass
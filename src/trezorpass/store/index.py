@@ -0,0 +1,132 @@
+from array import array
+from itertools import islice
+from typing import Iterable, Sequence
+from urllib.parse import urlparse
+
+from .entry import Entry
+
+
+class SearchIndex:
+    """Trigram index over titles, URL hosts and usernames of the entries.
+    Candidates are taken from the rarest trigram of the query and verified by substring matching.
+
+    Args:
+        entries: Entries to be indexed
+    """
+    def __init__(self, entries: Sequence[Entry]):
+        self.entries = entries
+        # Entries are indexed in the order of their titles, so that ranking doesn't need to sort
+        self._order = sorted(range(len(entries)), key=lambda i: entries[i].title.lower())
+        self._titles: list[str] = []
+        self._hosts: list[str] = []
+        self._haystacks: list[str] = []
+        self._postings: dict[str, array] = {}
+        self._tags: dict[str, set[int]] = {}
+        for j, i in enumerate(self._order):
+            entry = entries[i]
+            title, host, username = entry.title.lower(), _host(entry.url).lower(), entry.username.lower()
+            haystack = "\n".join((title, host, username))
+            self._titles.append(title)
+            self._hosts.append(host)
+            self._haystacks.append(haystack)
+            for gram in _trigrams(haystack):
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array('I')
+                postings.append(j)
+            for tag in entry.tags:
+                self._tags.setdefault(tag.title.lower(), set()).add(j)
+
+    def search(self, query: str, tags: Iterable[str] = (), limit: int | None = None) -> list[Entry]:
+        """Finds entries matching all words of the query
+
+        Args:
+            query: Words to be looked up in titles, URL hosts and usernames
+            tags: Titles of tags the entries have to be tagged with
+            limit: Maximum number of entries to return
+
+        Returns:
+            Matching entries, the most relevant first
+        """
+        words = query.lower().split()
+        matches = self._candidates(words, tags)
+        for word in words:
+            matches = [j for j in matches if word in self._haystacks[j]]
+        return [self.entries[self._order[j]] for j in self._rank(matches, words, limit)]
+
+    def _candidates(self, words: list[str], tags: Iterable[str]) -> Sequence[int]:
+        candidates = None
+        for tag in tags:
+            tagged = self._tags.get(tag.lower(), set())
+            candidates = tagged if candidates is None else candidates & tagged
+        postings = [self._postings.get(gram, ()) for word in words for gram in _trigrams(word)]
+        if postings:
+            rarest = min(postings, key=len)
+            return rarest if candidates is None else [j for j in rarest if j in candidates]
+        return range(len(self.entries)) if candidates is None else sorted(candidates)
+
+    def _rank(self, matches: list[int], words: list[str], limit: int | None) -> list[int]:
+        titles, hosts = self._titles, self._hosts
+        phrase = " ".join(words)
+        first, rest = (words[0], words[1:]) if words else ("", [])
+        # Tiers are consumed lazily, so that only as many entries as requested get ranked
+        tiers = (
+            (j for j in matches if titles[j].startswith(phrase)),
+            (j for j in matches if first in titles[j] and (not rest or all(word in titles[j] for word in rest))),
+            (j for j in matches if first in hosts[j]),
+            matches
+        )
+        ranked = []
+        ranked_set = set()
+        for tier in tiers:
+            remaining = None if limit is None else limit - len(ranked)
+            for j in islice((j for j in tier if j not in ranked_set), remaining):
+                ranked.append(j)
+                ranked_set.add(j)
+        return ranked
+
+
+class TagIndex:
+    """Positions of the entries by titles of their tags, tag titles are matched case-insensitively
+
+    Args:
+        entries: Entries to be indexed
+    """
+    def __init__(self, entries: Sequence[Entry]):
+        self.entries = entries
+        self._titles: dict[str, str] = {}
+        self._tagged: dict[str, array] = {}
+        for i, entry in enumerate(entries):
+            for tag in entry.tags:
+                key = tag.title.lower()
+                positions = self._tagged.get(key)
+                if positions is None:
+                    positions = self._tagged[key] = array('I')
+                    self._titles[key] = tag.title
+                if not positions or positions[-1] != i:  # Entries may list a tag twice
+                    positions.append(i)
+
+    def counts(self) -> list[tuple[str, int]]:
+        """Titles of the tags with the numbers of their entries, in the order of titles"""
+        return sorted(((self._titles[key], len(positions)) for key, positions in self._tagged.items()),
+                      key=lambda count: count[0].lower())
+
+    def filter(self, tags: Iterable[str]) -> list[Entry]:
+        """Finds entries tagged with all the tags, in the order of the entries"""
+        tagged = sorted((self._tagged.get(tag.lower(), ()) for tag in tags), key=len)
+        if not tagged:
+            return list(self.entries)
+        positions = tagged[0]
+        for other_positions in tagged[1:]:
+            members = set(other_positions)
+            positions = [i for i in positions if i in members]
+        return [self.entries[i] for i in positions]
+
+
+def _host(url: str) -> str:
+    parsed = urlparse(url)
+    return parsed.hostname or url
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
@@ -1,25 +1,83 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from hmac import HMAC
 from hashlib import sha256
+from typing import Callable, ContextManager, Iterable, Iterator, TypeVar
 from urllib.parse import urlparse
 
 from trezorlib.client import TrezorClient
 from trezorlib.misc import encrypt_keyvalue, decrypt_keyvalue
 from trezorlib.tools import parse_path
 
-from ..crypto import PATH, FILENAME_MESS
+from ..crypto import PATH, FILENAME_MESS, wipe
+from ..timing import timed
 from .entry import Entry
 
+ADDRESS_N = parse_path(PATH)
+
+T = TypeVar("T")
+
+
+class EntryKeyCache:
+    """Keeps recently unlocked entry keys, wiping them from memory once they are evicted
+
+    Args:
+        max_size: Maximum number of keys to be kept
+        ttl: Number of seconds a key is kept for
+    """
+    def __init__(self, max_size: int = 32, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._keys: OrderedDict[str, tuple[bytearray, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, nonce: str) -> bytes | None:
+        with self._lock:
+            self._evict_expired()
+            if nonce not in self._keys:
+                return None
+            self._keys.move_to_end(nonce)
+            return bytes(self._keys[nonce][0])
+
+    def put(self, nonce: str, key: bytes) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if nonce in self._keys:
+                wipe(self._keys.pop(nonce)[0])
+            self._keys[nonce] = (bytearray(key), time.monotonic() + self.ttl)
+            while len(self._keys) > self.max_size:
+                wipe(self._keys.popitem(last=False)[1][0])
+
+    def clear(self) -> None:
+        with self._lock:
+            while self._keys:
+                wipe(self._keys.popitem()[1][0])
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        while self._keys:
+            nonce, (key, expiration) = next(iter(self._keys.items()))
+            if expiration > now:
+                break
+            wipe(self._keys.pop(nonce)[0])
+
 
 class Keychain:
-    def __init__(self, client: TrezorClient):
+    def __init__(self, client: TrezorClient, key_cache: EntryKeyCache | None = None):
         self.client = client
+        self.key_cache = key_cache if key_cache is not None else EntryKeyCache()
 
-        address_n = parse_path(PATH)
         key = "Activate TREZOR Password Manager?"
         value = bytes.fromhex(
             "2d650551248d792eabf628f451200d7f51cb63e46aadcbb1038aacb05e8c8aee2d650551248d792eabf628f451200d7f51cb63e46aadcbb1038aacb05e8c8aee"
         )
-        self.master_key = encrypt_keyvalue(client, address_n, key, value).hex()
+        self.master_key = encrypt_keyvalue(client, ADDRESS_N, key, value).hex()
 
     @property
     def store_key(self) -> str:
@@ -30,13 +88,115 @@ class Keychain:
         file_key = self.master_key[:len(self.master_key) // 2]
         return HMAC(file_key.encode(), FILENAME_MESS.encode(), sha256).hexdigest() + '.pswd'
 
-    def entry_key(self, entry: Entry) -> str:
-        address_n = parse_path(PATH)
-        url = urlparse(entry.url)
-        if url.scheme in ('ftp', 'http', 'https'):
-            domain = url.netloc
-        else:
-            domain = entry.url
-        key = f'Unlock {domain} for user {entry.username}?'
+    def entry_key(self, entry: Entry) -> bytes:
+        key = self.key_cache.get(entry.nonce)
+        if key is None:
+            key = self._unlock(entry)
+            self.key_cache.put(entry.nonce, key)
+        return key
+
+    def create_entry_key(self, entry: Entry) -> tuple[str, bytes]:
+        """Creates a key for a new entry, or for an entry whose URL host or username has changed
+
+        Returns:
+            Nonce of the entry, which the key is unlocked from, and the key
+        """
+        key = os.urandom(32)
+        with timed("Entry key creation"):
+            nonce = encrypt_keyvalue(self.client, ADDRESS_N, entry_key_message(entry), key,
+                                     ask_on_encrypt=False, ask_on_decrypt=True).hex()
+        self.key_cache.put(nonce, key)
+        return nonce, key
+
+    def entry_keys(self, entries: Iterable[Entry]) -> Iterator[tuple[Entry, bytes]]:
+        """Unlocks keys of multiple entries, keeping the device reserved until all of them are unlocked
+
+        Yields:
+            Pairs of the entry and its key, in the order of the given entries
+        """
+        with self.reserved():
+            for entry in entries:
+                yield entry, self.entry_key(entry)
+
+    def reserved(self) -> ContextManager:
+        """Keeps the device reserved for the calls made within, so that other calls don't interleave with them"""
+        return getattr(self.client, "exclusive", nullcontext)()
+
+    def close(self) -> None:
+        """Wipes the cached entry keys"""
+        self.key_cache.clear()
+
+    def _unlock(self, entry: Entry) -> bytes:
         value = bytes.fromhex(entry.nonce)
-        return decrypt_keyvalue(self.client, address_n, key, value, ask_on_encrypt=False).hex()
+        with timed("Entry key unlock"):
+            return decrypt_keyvalue(self.client, ADDRESS_N, entry_key_message(entry), value, ask_on_encrypt=False)
+
+
+def entry_key_message(entry: Entry) -> str:
+    """Message the device shows when unlocking the entry, the entry key is bound to it"""
+    url = urlparse(entry.url)
+    if url.scheme in ('ftp', 'http', 'https'):
+        domain = url.netloc
+    else:
+        domain = entry.url
+    return f'Unlock {domain} for user {entry.username}?'
+
+
+class AsyncKeychain:
+    """Runs the device calls of a keychain on a dedicated thread, so that the event loop isn't blocked
+    while the device waits for the user. Cancelled or timed out calls are cancelled on the device as well.
+
+    Args:
+        keychain: Keychain to be used
+        executor: Executor running the device calls
+        timeout: Number of seconds to wait for a device call, including the user confirmation
+    """
+    def __init__(self, keychain: Keychain, executor: ThreadPoolExecutor, timeout: float | None = None):
+        self.keychain = keychain
+        self.executor = executor
+        self.timeout = timeout
+
+    @staticmethod
+    async def create(client: TrezorClient, timeout: float | None = None, **kwargs) -> 'AsyncKeychain':
+        """Derives the keychain of the client, see Keychain"""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="keychain")
+        try:
+            keychain = await _run_on_device(client, executor, timeout, lambda: Keychain(client, **kwargs))
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        return AsyncKeychain(keychain, executor, timeout)
+
+    @property
+    def store_key(self) -> str:
+        return self.keychain.store_key
+
+    @property
+    def store_name(self) -> str:
+        return self.keychain.store_name
+
+    async def entry_key(self, entry: Entry) -> bytes:
+        return await self.run(self.keychain.entry_key, entry)
+
+    async def run(self, function: Callable[..., T], *args) -> T:
+        """Runs a function making device calls through the keychain"""
+        return await _run_on_device(self.keychain.client, self.executor, self.timeout, function, *args)
+
+    def close(self) -> None:
+        self.keychain.close()
+        self.executor.shutdown(wait=False)
+
+
+async def _run_on_device(client: TrezorClient, executor: ThreadPoolExecutor, timeout: float | None,
+                         function: Callable[..., T], *args) -> T:
+    call = executor.submit(function, *args)
+    future = asyncio.wrap_future(call)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError):
+        # A call queued behind another one is dropped before it starts, the device action belongs to the other one.
+        # A running call is blocked waiting for the device, it's released by cancelling the pending device action.
+        if not call.cancel() and not call.done():
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            client.cancel()
+        raise
@@ -1,14 +1,75 @@
+import asyncio
+import dataclasses
+import logging
+from typing import AsyncIterator
+
+from ..timing import timed
 from .keychain import Keychain
-from .sources import Source
+from .sources import Source, SourceMetadata
 from .errors import StoreLoadError
 
 
+class StorePrefetch:
+    """Starts loading the store before the keychain is available, provided the source can tell the store name
+
+    Args:
+        source: Source to load the store from
+    """
+    def __init__(self, source: Source):
+        self.source = source
+        self.store_name = source.store_name_hint()
+        self.task = asyncio.create_task(self._load()) if self.store_name else None
+
+    async def _load(self) -> tuple[bytes, SourceMetadata]:
+        with timed("Store prefetch"):
+            # Loaded along with the metadata of the loaded store, which may have changed by the time it's used
+            return await self.source.load_store_if_changed(self.store_name, None)
+
+    def matches(self, store_name: str) -> bool:
+        return self.task is not None and self.source.resolve(self.store_name) == self.source.resolve(store_name)
+
+    def cancel(self) -> None:
+        if self.task and not self.task.cancel() and not self.task.cancelled():
+            self.task.exception()  # Marks a failed prefetch as handled
+
+
 class StoreLoader:
     def __init__(self, keychain: Keychain):
         self.keychain = keychain
 
-    async def load(self, source: Source) -> bytes:
+    async def open(self, source: Source,
+                   prefetch: StorePrefetch | None = None) -> tuple[SourceMetadata, AsyncIterator[bytes]]:
+        """Starts loading the store in chunks as they arrive from the source, see Source.open_store
+
+        Returns:
+            Metadata of the store being loaded, in particular its version, and its chunks
+        """
+        store_name = self.keychain.store_name
+        if prefetch and prefetch.matches(store_name):
+            try:
+                data, metadata = await prefetch.task
+                return dataclasses.replace(metadata, size=len(data)), _prefetched(data)
+            except Exception:
+                logging.exception("Store prefetch has failed")
+        elif prefetch:
+            prefetch.cancel()
         try:
-            return await source.load_store(self.keychain.store_name)
+            with timed("Store opening"):
+                metadata, chunks = await source.open_store(store_name)
         except Exception as e:
             raise StoreLoadError() from e
+        return metadata, _download(chunks)
+
+
+async def _prefetched(data: bytes) -> AsyncIterator[bytes]:
+    yield data
+
+
+async def _download(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    try:
+        with timed("Store download") as span:
+            async for chunk in chunks:
+                span.add("bytes", len(chunk))
+                yield chunk
+    except Exception as e:
+        raise StoreLoadError() from e
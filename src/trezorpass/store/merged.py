@@ -0,0 +1,88 @@
+from typing import TYPE_CHECKING, NamedTuple
+
+from .entry import EncryptedEntry
+from .index import SearchIndex, TagIndex
+from .store import Store
+from .tag import Tag
+
+if TYPE_CHECKING:
+    from .editor import StoreEditor
+
+
+class _Merge(NamedTuple):
+    revisions: tuple[int, ...]
+    entries: list[EncryptedEntry]
+    tags: list[Tag]
+    labels: dict[int, str]
+
+
+class MergedStore(Store):
+    """Single view of several stores, each entry is labelled by the store it comes from.
+
+    The view follows the stores as they are reloaded, it's merged again on the first use after any of them changes.
+
+    Args:
+        stores: Stores by their labels, in the order their entries are listed
+    """
+    def __init__(self, stores: dict[str, Store]):
+        # The fields that aren't views of the stores are set here, as they can't be set by the dataclass __init__
+        self.name = ", ".join(stores)
+        self.metadata = {}
+        self.version = None
+        self.editor = None
+        self.encoded_entries = None
+        self.stores = stores
+        self._merged: _Merge | None = None
+        self._index: tuple[tuple[int, ...], SearchIndex] | None = None
+        self._tag_index: tuple[tuple[int, ...], TagIndex] | None = None
+
+    def _merge(self) -> _Merge:
+        revisions = tuple(store.revision for store in self.stores.values())
+        if self._merged is None or self._merged.revisions != revisions:
+            entries, tags, labels = [], [], {}
+            for label, store in self.stores.items():
+                entries.extend(store.entries)
+                tags.extend(store.tags)
+                labels.update((id(entry), label) for entry in store.entries)
+            self._merged = _Merge(revisions, entries, tags, labels)
+        return self._merged
+
+    @property
+    def entries(self) -> list[EncryptedEntry]:
+        return self._merge().entries
+
+    @property
+    def tags(self) -> list[Tag]:
+        return self._merge().tags
+
+    @property
+    def revision(self) -> int:
+        """Changes whenever any of the stores is reloaded, as their revisions only grow"""
+        return sum(store.revision for store in self.stores.values())
+
+    @property
+    def index(self) -> SearchIndex:
+        merged = self._merge()
+        if self._index is None or self._index[0] != merged.revisions:
+            self._index = (merged.revisions, SearchIndex(merged.entries))
+        return self._index[1]
+
+    @property
+    def tag_index(self) -> TagIndex:
+        merged = self._merge()
+        if self._tag_index is None or self._tag_index[0] != merged.revisions:
+            self._tag_index = (merged.revisions, TagIndex(merged.entries))
+        return self._tag_index[1]
+
+    def label(self, entry: EncryptedEntry) -> str | None:
+        return self._merge().labels.get(id(entry))
+
+    def editor_for(self, entry: EncryptedEntry | None = None) -> 'StoreEditor | None':
+        """Editor of the store the entry comes from, new entries are added to the first editable store"""
+        if entry is not None:
+            store = self.stores.get(self.label(entry))
+            return store.editor_for(entry) if store else None
+        return next((store.editor for store in self.stores.values() if store.editor), None)
+
+    def swap(self, other: Store) -> None:
+        raise TypeError("Merged stores are reloaded through the stores they are made of")
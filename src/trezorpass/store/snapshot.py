@@ -0,0 +1,183 @@
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from hashlib import sha256
+from hmac import HMAC
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from ..appdata import APP_DIR, write_atomic
+from ..crypto import encrypt, wipe, StreamDecryptor
+from .entry import EncryptedEntry
+from .keychain import Keychain
+from .store import Store
+from .tag import Tag
+
+SNAPSHOT_DIR = os.path.join(APP_DIR, 'snapshots')
+MAGIC = b"TPSNAP\x00\x02"
+_COUNTS = struct.Struct("<II")
+_LENGTH = struct.Struct("<Q")
+_VERSION_LENGTH = struct.Struct("<H")
+_SEPARATOR = "\0"
+
+
+class StoreSnapshots:
+    """Keeps decoded stores on the disk in a compact binary format, so that they don't need to be parsed again.
+
+    A snapshot is made of a single version of the store and is only loaded while the store has the same version.
+    It's encrypted by a key derived from the store key, the version is authenticated along with it.
+
+    Args:
+        directory: Directory to keep the snapshots in
+    """
+    def __init__(self, directory: str | Path = SNAPSHOT_DIR):
+        self.directory = Path(directory)
+
+    def scoped(self, scope: str) -> 'StoreSnapshots':
+        """Snapshots kept apart from the others, e.g. of a store of the same name in another source"""
+        return StoreSnapshots(self.directory / sha256(scope.encode("utf8")).hexdigest()[:16])
+
+    def _path(self, store_name: str) -> Path:
+        return self.directory / (store_name + '.snapshot')
+
+    def load(self, keychain: Keychain, version: str) -> Store | None:
+        """Loads the snapshot of the store, unless it's missing or made of another version"""
+        try:
+            with open(self._path(keychain.store_name), 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self._load(keychain, version, memoryview(mapped))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.exception("Unable to read the store snapshot")
+            return None
+
+    def _load(self, keychain: Keychain, version: str, data: memoryview) -> Store | None:
+        with data:
+            header = _header(version)
+            if data[:len(header)] != header:
+                return None
+            decryptor = StreamDecryptor(_snapshot_key(keychain), len(data) - len(header), header)
+            decryptor.update(data[len(header):])
+        plaintext = decryptor.finalize()
+        try:
+            return decode_snapshot(plaintext, keychain.store_name)
+        finally:
+            wipe(plaintext)
+
+    def save(self, keychain: Keychain, store: Store, version: str) -> None:
+        plaintext = bytearray()
+        try:
+            plaintext = encode_snapshot(store)
+            header = _header(version)
+            encrypted = encrypt(_snapshot_key(keychain), plaintext, header)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            write_atomic(self._path(keychain.store_name), header + encrypted)
+        except Exception:
+            logging.exception("Unable to save the store snapshot")
+        finally:
+            wipe(plaintext)
+
+
+def encode_snapshot(store: Store) -> bytearray:
+    """Encodes the store column by column: texts are joined by a separator, numbers are packed into arrays"""
+    tag_refs = {id(tag): i for i, tag in enumerate(store.tags)}
+    entries = store.entries
+    ciphertext_ends = array('I')
+    end = 0
+    for entry in entries:
+        end += len(entry.ciphertext)
+        ciphertext_ends.append(end)
+    sections = [
+        _join(tag.title for tag in store.tags),
+        _join(tag.icon or "" for tag in store.tags),
+        _join(entry.url for entry in entries),
+        _join(entry.title for entry in entries),
+        _join(entry.username for entry in entries),
+        _join(entry.nonce for entry in entries),
+        array('I', (entry.password_size for entry in entries)),
+        ciphertext_ends,
+        array('I', (len(entry.tags) for entry in entries)),
+        array('I', (tag_refs[id(tag)] for entry in entries for tag in entry.tags)),
+        b"".join(entry.ciphertext for entry in entries),
+        json.dumps(store.metadata).encode("utf8")
+    ]
+    encoded = bytearray(_COUNTS.pack(len(entries), len(store.tags)))
+    for section in sections:
+        encoded += _LENGTH.pack(len(section) * section.itemsize if isinstance(section, array) else len(section))
+        encoded += section
+    return encoded
+
+
+def decode_snapshot(encoded: memoryview, name: str) -> Store:
+    entries_count, tags_count = _COUNTS.unpack_from(encoded)
+    sections = _sections(encoded[_COUNTS.size:])
+    tag_titles, tag_icons = (_split(next(sections), tags_count) for _ in range(2))
+    tags = [Tag(title=title, icon=icon or None) for title, icon in zip(tag_titles, tag_icons)]
+    urls, titles, usernames, nonces = (_split(next(sections), entries_count) for _ in range(4))
+    password_sizes, ciphertext_ends, tag_counts, tag_refs = (_array(next(sections)) for _ in range(4))
+    ciphertexts = next(sections)
+    metadata = json.loads(str(next(sections), "utf8"))
+    if not len(password_sizes) == len(ciphertext_ends) == len(tag_counts) == entries_count:
+        raise ValueError("Snapshot is corrupted")
+    entries = []
+    start = 0
+    tag_start = 0
+    for url, title, username, nonce, password_size, end, tag_count in zip(
+            urls, titles, usernames, nonces, password_sizes, ciphertext_ends, tag_counts):
+        entries.append(EncryptedEntry(
+            url=url,
+            title=title,
+            username=username,
+            nonce=nonce,
+            tags=tuple(tags[i] for i in tag_refs[tag_start:tag_start + tag_count]) if tag_count else (),
+            ciphertext=bytes(ciphertexts[start:end]),
+            password_size=password_size
+        ))
+        start = end
+        tag_start += tag_count
+    store = Store(name=name, entries=entries, tags=tags, metadata=metadata)
+    store.tag_index  # Built on loading, as StoreDecoder does
+    return store
+
+
+def _snapshot_key(keychain: Keychain) -> bytes:
+    return HMAC(bytes.fromhex(keychain.store_key), b"trezorpass snapshot", sha256).digest()
+
+
+def _header(version: str) -> bytes:
+    encoded_version = version.encode("utf8")
+    return MAGIC + _VERSION_LENGTH.pack(len(encoded_version)) + encoded_version
+
+
+def _join(texts: Iterable[str]) -> bytes:
+    texts = list(texts)
+    if any(_SEPARATOR in text for text in texts):
+        raise ValueError("Texts containing the separator can't be snapshotted")
+    return _SEPARATOR.join(texts).encode("utf8")
+
+
+def _split(section: memoryview, count: int) -> list[str]:
+    texts = str(section, "utf8").split(_SEPARATOR) if count else []
+    if len(texts) != count:
+        raise ValueError("Snapshot is corrupted")
+    return texts
+
+
+def _array(section: memoryview) -> array:
+    # Snapshots never leave the machine, so the native byte order is used
+    numbers = array('I')
+    numbers.frombytes(section)
+    return numbers
+
+
+def _sections(encoded: memoryview) -> Iterator[memoryview]:
+    offset = 0
+    while offset < len(encoded):
+        (length,) = _LENGTH.unpack_from(encoded, offset)
+        offset += _LENGTH.size
+        yield encoded[offset:offset + length]
+        offset += length
@@ -1,3 +1,20 @@
 from trezorpass.store.sources.source import *
-from trezorpass.store.sources.dropbox_source import *
+from trezorpass.store.sources.cache import *
 from trezorpass.store.sources.file_source import *
+from trezorpass.store.sources.registry import *
+
+# Remote sources depend on heavy SDKs, they're only imported once used
+_LAZY_MODULES = {
+    "trezorpass.store.sources.dropbox_source": ["DropboxSource", "OAuth", "DROPBOX_APP_KEY", "DROPBOX_TOKEN_FILE",
+                                                "LONGPOLL_TIMEOUT"],
+    "trezorpass.store.sources.http_source": ["HttpSource"],
+    "trezorpass.store.sources.s3_source": ["S3Source"],
+}
+_LAZY_NAMES = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    return getattr(importlib.import_module(_LAZY_NAMES[name]), name)
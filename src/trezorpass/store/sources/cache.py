@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from trezorpass.appdata import APP_DIR, write_atomic
+
+CACHE_DIR = os.path.join(APP_DIR, 'cache')
+
+
+@dataclass(kw_only=True)
+class CachedStore:
+    rev: str
+    content_hash: str
+    data: bytes
+
+
+@dataclass(kw_only=True)
+class CachedMetadata:
+    rev: str
+    content_hash: str
+    size: int
+
+
+class StoreCache:
+    """Keeps downloaded stores on the disk together with their remote revision.
+
+    The cached data is the store exactly as downloaded, so it stays encrypted by the store key.
+
+    Args:
+        directory: Directory to keep the cached stores in
+    """
+    def __init__(self, directory: str = CACHE_DIR):
+        self.directory = Path(directory)
+
+    def _data_path(self, store_name: str) -> Path:
+        return self.directory / store_name
+
+    def _meta_path(self, store_name: str) -> Path:
+        return self.directory / (store_name + '.json')
+
+    def load(self, store_name: str) -> CachedStore | None:
+        try:
+            with open(self._meta_path(store_name), 'r') as file:
+                meta = json.load(file)
+            with open(self._data_path(store_name), 'rb') as file:
+                data = file.read()
+            return CachedStore(rev=meta['rev'], content_hash=meta['content_hash'], data=data)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.exception("Unable to read the cached store")
+            return None
+
+    def load_metadata(self, store_name: str) -> CachedMetadata | None:
+        """Describes the cached store without reading it"""
+        try:
+            with open(self._meta_path(store_name), 'r') as file:
+                meta = json.load(file)
+            size = os.stat(self._data_path(store_name)).st_size
+            return CachedMetadata(rev=meta['rev'], content_hash=meta['content_hash'], size=size)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.exception("Unable to read the cached store")
+            return None
+
+    def last_store_name(self) -> str | None:
+        """Name of the most recently cached store"""
+        try:
+            meta_paths = list(self.directory.glob('*.json'))
+        except OSError:
+            return None
+        if not meta_paths:
+            return None
+        return max(meta_paths, key=lambda path: path.stat().st_mtime).name.removesuffix('.json')
+
+    def store(self, store_name: str, cached: CachedStore) -> None:
+        """Replaces the cached store, its revision is written last, so that an interrupted write leaves no store
+        rather than a store of another revision"""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._meta_path(store_name).unlink(missing_ok=True)
+            write_atomic(self._data_path(store_name), cached.data)
+            meta = {'rev': cached.rev, 'content_hash': cached.content_hash}
+            write_atomic(self._meta_path(store_name), json.dumps(meta).encode())
+        except Exception:
+            logging.exception("Unable to cache the store")
@@ -1,17 +1,30 @@
+import asyncio
 import logging
 from datetime import datetime
 import json
 import os
+import re
+import threading
+from typing import AsyncIterator
 
 import dropbox
+import requests
 from InquirerPy import inquirer
 
-from trezorpass.store.sources.source import Source, SourceError
-from trezorpass.appdata import APP_DIR
+from trezorpass.store.sources.source import Source, SourceError, SourceConflictError, SourceMetadata, CHUNK_SIZE, \
+    iterate_chunks, run_in_daemon_thread
+from trezorpass.store.sources.cache import StoreCache, CachedStore, CACHE_DIR
+from trezorpass.appdata import APP_DIR, write_atomic
 
 DROPBOX_APP_KEY = "s340kh3l0vla1nv"  # APP_KEY of the official TPM, potentially breaking if maintainers disable
 # PKCE flow for Dropbox auth
 DROPBOX_TOKEN_FILE = os.path.join(APP_DIR, 'dropbox')
+LONGPOLL_TIMEOUT = 300
+REFRESH_MARGIN = 600  # Seconds before the expiration the access token is refreshed at, ahead of the SDK doing so
+REFRESH_RETRY_INTERVAL = 60
+MAX_CONNECTIONS = 4
+
+_authentication_lock = asyncio.Lock()  # Sources of multiple accounts mustn't prompt at once
 
 
 class OAuth:
@@ -21,27 +34,92 @@ class OAuth:
         self.expiration = expiration
 
     @staticmethod
-    def load():
+    def load(token_file: str = DROPBOX_TOKEN_FILE):
         oauth = OAuth()
-        with open(DROPBOX_TOKEN_FILE, 'r') as file:
+        with open(token_file, 'r') as file:
             oauth.__dict__ = json.load(file)
             return oauth
 
-    def store(self):
-        with open(DROPBOX_TOKEN_FILE, 'w+') as file:
-            os.chmod(DROPBOX_TOKEN_FILE, 0o600)
-            file.write(json.dumps(self.__dict__))
+    def store(self, token_file: str = DROPBOX_TOKEN_FILE):
+        """Writes the tokens to a new file renamed over the old one, so that the tokens are never left half written"""
+        write_atomic(token_file, json.dumps(self.__dict__).encode())  # Readable by the owner only
+
+    @property
+    def expires_at(self) -> datetime | None:
+        """Expiration of the access token in UTC, as the Dropbox SDK keeps it"""
+        return datetime.fromisoformat(self.expiration) if self.expiration else None
+
+
+class _Dropbox(dropbox.Dropbox):
+    """Dropbox client reporting the access tokens it refreshes, whether refreshed on demand or ahead of time"""
+    def __init__(self, *args, on_refresh, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_refresh = on_refresh
+        self._refresh_lock = threading.Lock()
+
+    def refresh_access_token(self, *args, **kwargs):
+        access_token = self._oauth2_access_token
+        with self._refresh_lock:
+            if self._oauth2_access_token != access_token:
+                return  # Refreshed by another request meanwhile
+            super().refresh_access_token(*args, **kwargs)
+            self._on_refresh(self._oauth2_access_token, self._oauth2_access_token_expiration)
 
 
 class DropboxSource(Source):
-    def __init__(self):
+    """Loads the store from Dropbox, keeping a local copy that is only re-downloaded when the remote one changes
+
+    A single client is kept for the lifetime of the source, so that loads, metadata checks and long polls reuse
+    its connections. Its access token is refreshed in the background before it expires, and the refreshed
+    tokens are saved, so that neither requests nor the next start wait for the refresh.
+
+    Args:
+        client: Dropbox client to be used instead of the one authenticated by the saved tokens
+        cache: Cache of the downloaded stores
+        offline: Whether to serve the cached store without contacting Dropbox
+        account: Name distinguishing a Dropbox account from the default one, it has its own tokens and cache
+        session: HTTP session the client authenticated by the saved tokens sends its requests through,
+            a pooled one by default
+    """
+    def __init__(self, client: dropbox.Dropbox | None = None, cache: StoreCache | None = None, offline: bool = False,
+                 account: str | None = None, session: requests.Session | None = None):
+        self.client = client
+        self.session = session
+        self._client: _Dropbox | None = None
+        self._client_lock = threading.Lock()
+        self._refresher: asyncio.Task | None = None
+        self.account = account
+        self.token_file = f"{DROPBOX_TOKEN_FILE}-{account}" if account else DROPBOX_TOKEN_FILE
+        if cache is None:
+            cache = StoreCache(os.path.join(CACHE_DIR, account)) if account else StoreCache()
+        self.cache = cache
+        self.offline = offline
         try:
-            self.oauth = OAuth.load()
+            self.oauth = OAuth.load(self.token_file)
         except Exception as e:
             self.oauth = None
 
     @staticmethod
-    async def authenticate():
+    def from_url(url: str, offline: bool = False, **options) -> 'DropboxSource':
+        """Creates the source of dropbox://, or of dropbox://ACCOUNT for another account than the default one
+
+        Raises:
+            SourceError: The account name isn't made of letters, digits, underscores and hyphens only
+        """
+        account = url.removeprefix("dropbox://").strip("/")
+        if account and not re.fullmatch(r"[\w-]+", account):
+            raise SourceError(f"Invalid Dropbox account name {account!r}")
+        return DropboxSource(offline=offline, account=account if account else None)
+
+    async def authenticate(self):
+        async with _authentication_lock:
+            if self.oauth:  # Authenticated while waiting for another account
+                return self.oauth
+            if self.account:
+                print(f"Authorizing Dropbox account {self.account}")
+            return await self._authenticate()
+
+    async def _authenticate(self):
         auth_flow = dropbox.DropboxOAuth2FlowNoRedirect(DROPBOX_APP_KEY, use_pkce=True, token_access_type='offline')
         authorize_url = auth_flow.start()
         print("1. Go to: " + authorize_url)
@@ -58,19 +136,169 @@ class DropboxSource(Source):
                     raise SourceError()
         oauth = OAuth(oauth_result.access_token, oauth_result.refresh_token, oauth_result.expires_at.isoformat())
         try:
-            oauth.store()
+            oauth.store(self.token_file)
         except Exception as ex:
             logging.exception("Unable to store the oauth tokens")
         return oauth
 
-    async def load_store(self, store_name) -> bytes:
+    async def _ensure_client(self):
+        if self.client:
+            return
         if not self.oauth:
             self.oauth = await self.authenticate()
-        with dropbox.Dropbox(
-                oauth2_access_token=self.oauth.access_token,
-                oauth2_refresh_token=self.oauth.refresh_token,
-                oauth2_access_token_expiration=datetime.fromisoformat(self.oauth.expiration),
-                app_key=DROPBOX_APP_KEY
-        ) as dbx:
-            (_, response) = dbx.files_download("/" + store_name)
-            return response.content
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_ahead())
+
+    def _connect(self) -> dropbox.Dropbox:
+        if self.client:
+            return self.client
+        with self._client_lock:
+            if not self._client:
+                self._client = _Dropbox(
+                    oauth2_access_token=self.oauth.access_token,
+                    oauth2_refresh_token=self.oauth.refresh_token,
+                    oauth2_access_token_expiration=self.oauth.expires_at,
+                    app_key=DROPBOX_APP_KEY,
+                    session=self.session or dropbox.create_session(MAX_CONNECTIONS),
+                    on_refresh=self._refreshed
+                )
+            return self._client
+
+    async def _refresh_ahead(self):
+        while self.oauth.refresh_token and self.oauth.expires_at:
+            delay = (self.oauth.expires_at - datetime.utcnow()).total_seconds() - REFRESH_MARGIN
+            if delay > 0:
+                await asyncio.sleep(delay)
+            dbx = self._connect()
+            try:
+                await asyncio.to_thread(dbx.refresh_access_token)
+            except (requests.exceptions.RequestException, dropbox.exceptions.DropboxException):
+                logging.warning("Unable to refresh the Dropbox access token, retrying in %d s", REFRESH_RETRY_INTERVAL)
+                await asyncio.sleep(REFRESH_RETRY_INTERVAL)
+
+    def _refreshed(self, access_token: str, expiration: datetime):
+        self.oauth = OAuth(access_token, self.oauth.refresh_token, expiration.isoformat())
+        try:
+            self.oauth.store(self.token_file)
+        except Exception:
+            logging.exception("Unable to store the oauth tokens")
+
+    async def close(self):
+        if self._refresher and not self._refresher.cancel() and not self._refresher.cancelled():
+            self._refresher.exception()  # Marks a failure as handled
+        if self._client and not self.session:  # Injected clients and sessions are closed by their owners
+            self._client.close()
+
+    async def load_store(self, store_name) -> bytes:
+        data, _ = await self.load_store_if_changed(store_name, None)
+        return data
+
+    async def open_store(self, store_name,
+                         chunk_size: int = CHUNK_SIZE) -> tuple[SourceMetadata, AsyncIterator[bytes]]:
+        """The store is downloaded at once, the metadata is that of the downloaded or cached revision"""
+        data, metadata = await self.load_store_if_changed(store_name, None)
+        return metadata, iterate_chunks(data, chunk_size)
+
+    async def load_store_if_changed(self, store_name, version) -> tuple[bytes | None, SourceMetadata]:
+        if not self.offline:
+            await self._ensure_client()
+        return await asyncio.to_thread(self._load_store, store_name, version)
+
+    def _load_store(self, store_name, version: str | None = None) -> tuple[bytes | None, SourceMetadata]:
+        cached = self.cache.load(store_name)
+        if self.offline:
+            if not cached:
+                raise SourceError("The store is not available offline")
+            return None if cached.rev == version else cached.data, _cached_metadata(cached)
+        path = "/" + store_name
+        try:
+            dbx = self._connect()
+            if cached or version is not None:
+                metadata = dbx.files_get_metadata(path)
+                if metadata.rev == version:
+                    return None, _metadata(metadata)
+                if cached and metadata.rev == cached.rev:
+                    return cached.data, _metadata(metadata)
+                if cached and metadata.content_hash == cached.content_hash:
+                    cached.rev = metadata.rev
+                    self.cache.store(store_name, cached)
+                    return cached.data, _metadata(metadata)
+            (metadata, response) = dbx.files_download(path)
+            data = response.content
+        except requests.exceptions.ConnectionError:
+            if not cached:
+                raise
+            logging.warning("Dropbox is not reachable, using the cached store")
+            return None if cached.rev == version else cached.data, _cached_metadata(cached)
+        self.cache.store(store_name, CachedStore(rev=metadata.rev, content_hash=metadata.content_hash, data=data))
+        return data, _metadata(metadata)
+
+    async def stat(self, store_name) -> SourceMetadata:
+        if self.offline:
+            cached = await asyncio.to_thread(self.cache.load_metadata, store_name)
+            if not cached:
+                raise SourceError("The store is not available offline")
+            return SourceMetadata(size=cached.size, version=cached.rev)
+        await self._ensure_client()
+        metadata = await asyncio.to_thread(self._connect().files_get_metadata, "/" + store_name)
+        return _metadata(metadata)
+
+    async def wait_for_change(self, store_name, version, poll_interval) -> None:
+        """Waits for changes of the store folder by long polling, poll_interval only applies to retries"""
+        if self.offline:
+            return await super().wait_for_change(store_name, version, poll_interval)
+
+        await self._ensure_client()
+        dbx = self._connect()
+        while True:
+            try:
+                # The cursor is taken before the check, so that no change is missed in between
+                cursor = (await asyncio.to_thread(dbx.files_list_folder_get_latest_cursor, "")).cursor
+                if (await self.stat(store_name)).version != version:
+                    return
+                changes = False
+                while not changes:
+                    result = await run_in_daemon_thread(dbx.files_list_folder_longpoll, cursor, LONGPOLL_TIMEOUT)
+                    changes = result.changes
+                    if result.backoff:
+                        await asyncio.sleep(result.backoff)
+            except requests.exceptions.ConnectionError:
+                logging.warning("Dropbox is not reachable, retrying in %d s", poll_interval)
+                await asyncio.sleep(poll_interval)
+
+    @property
+    def writable(self) -> bool:
+        return not self.offline
+
+    async def save_store(self, store_name, data: bytes, version: str | None) -> SourceMetadata:
+        """Uploads the store, the upload fails rather than overwriting a revision other than the given one"""
+        if self.offline:
+            raise SourceError("The store can't be saved offline")
+        await self._ensure_client()
+        return await asyncio.to_thread(self._save_store, store_name, bytes(data), version)
+
+    def _save_store(self, store_name, data: bytes, version: str | None) -> SourceMetadata:
+        mode = dropbox.files.WriteMode.update(version) if version else dropbox.files.WriteMode.add
+        try:
+            metadata = self._connect().files_upload(data, "/" + store_name, mode=mode, mute=True,
+                                                    strict_conflict=True)
+        except dropbox.exceptions.ApiError as e:
+            if isinstance(e.error, dropbox.files.UploadError) and e.error.is_path() \
+                    and e.error.get_path().reason.is_conflict():
+                raise SourceConflictError("The store has changed in Dropbox since it has been loaded") from e
+            raise
+        self.cache.store(store_name, CachedStore(rev=metadata.rev, content_hash=metadata.content_hash, data=data))
+        return _metadata(metadata)
+
+    def store_name_hint(self) -> str | None:
+        if not self.offline and not self.client and not self.oauth:
+            return None  # Authentication is interactive, it can't run alongside the device discovery
+        return self.cache.last_store_name()
+
+
+def _metadata(metadata: dropbox.files.FileMetadata) -> SourceMetadata:
+    return SourceMetadata(size=metadata.size, version=metadata.rev, mtime=metadata.server_modified)
+
+
+def _cached_metadata(cached: CachedStore) -> SourceMetadata:
+    return SourceMetadata(size=len(cached.data), version=cached.rev)
@@ -1,11 +1,131 @@
-from trezorpass.store.sources import Source
+import asyncio
+import mmap
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from trezorpass.appdata import write_atomic
+from trezorpass.store.sources.source import Source, SourceMetadata, SourceConflictError, CHUNK_SIZE
 
 
 class FileSource(Source):
+    """Loads the store from a local file.
+
+    The file is memory-mapped rather than read, so that the store is handed over without copying it.
+    The mapping is reused as long as the file is unchanged according to its stat.
+    Stores are expected to be replaced rather than rewritten in place, as truncating a mapped file breaks the mapping.
+    Saved stores are replaced likewise, by renaming a new file over the old one, which is unmapped first unless
+    the store loaded from it is still in use.
+
+    Args:
+        filename: Path of the store, the store name is looked up in the working directory if not given
+    """
+    writable = True
+
     def __init__(self, filename: str | None) -> None:
         self.filename = filename
+        self._mapping: tuple[tuple, memoryview] | None = None
+
+    @staticmethod
+    def from_url(url: str, **options) -> 'FileSource':
+        path = url.removeprefix("file://")
+        return FileSource(path if path else None)
+
+    async def load_store(self, store_name) -> memoryview:
+        data, _ = await asyncio.to_thread(self._map, self.resolve(store_name))
+        await asyncio.to_thread(_fault_in, data)
+        return data
+
+    async def stat(self, store_name) -> SourceMetadata:
+        stat = await asyncio.to_thread(os.stat, self.resolve(store_name))
+        return _metadata(stat)
+
+    async def iter_store(self, store_name, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[memoryview]:
+        _, chunks = await self.open_store(store_name, chunk_size)
+        async for chunk in chunks:
+            yield chunk
+
+    async def open_store(self, store_name,
+                         chunk_size: int = CHUNK_SIZE) -> tuple[SourceMetadata, AsyncIterator[memoryview]]:
+        """The metadata is that of the mapped file"""
+        data, metadata = await asyncio.to_thread(self._map, self.resolve(store_name))
+        return metadata, _iter_mapping(data, chunk_size)
+
+    async def load_store_if_changed(self, store_name, version) -> tuple[memoryview | None, SourceMetadata]:
+        """The version is compared with that of the opened file, which is only mapped if it has changed"""
+        data, metadata = await asyncio.to_thread(self._map, self.resolve(store_name), version)
+        if data is not None:
+            await asyncio.to_thread(_fault_in, data)
+        return data, metadata
+
+    async def save_store(self, store_name, data: bytes, version: str | None) -> SourceMetadata:
+        return await asyncio.to_thread(self._save, self.resolve(store_name), data, version)
 
-    async def load_store(self, store_name) -> bytes:
-        filename = self.filename if self.filename else store_name
+    def store_name_hint(self) -> str | None:
+        return self.filename
+
+    def resolve(self, store_name: str | None) -> str | None:
+        return self.filename if self.filename else store_name
+
+    def _map(self, filename: str, unless_version: str | None = None) -> tuple[memoryview | None, SourceMetadata]:
         with open(filename, "rb") as file:
-            return file.read()
+            metadata = _metadata(os.fstat(file.fileno()))
+            if unless_version is not None and metadata.version == unless_version:
+                return None, metadata
+            key = (filename, metadata.version)
+            if self._mapping and self._mapping[0] == key:
+                return self._mapping[1], metadata
+            if not metadata.size:
+                data = memoryview(b"")  # Empty files can't be mapped
+            else:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                data = memoryview(mapped)
+        self._mapping = (key, data)
+        return data, metadata
+
+    def _save(self, filename: str, data: bytes, version: str | None) -> SourceMetadata:
+        try:
+            current_version = _metadata(os.stat(filename)).version
+        except FileNotFoundError:
+            current_version = None
+        if current_version != version:
+            raise SourceConflictError(f"{filename} has changed since it has been loaded")
+        self._unmap(filename)
+        write_atomic(filename, data)
+        _, metadata = self._map(filename)
+        return metadata
+
+    def _unmap(self, filename: str) -> None:
+        """Releases the mapping of the file, as a mapped file can't be replaced on some platforms, e.g. Windows"""
+        if not self._mapping or self._mapping[0][0] != filename:
+            return
+        (_, data), self._mapping = self._mapping, None
+        mapped = data.obj
+        del data
+        if isinstance(mapped, mmap.mmap):
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # The store is still in use, e.g. by a reload, the file stays mapped until it's released
+
+
+def _metadata(stat: os.stat_result) -> SourceMetadata:
+    return SourceMetadata(
+        size=stat.st_size,
+        version=f"{stat.st_ino}-{stat.st_mtime_ns}-{stat.st_size}",
+        mtime=datetime.fromtimestamp(stat.st_mtime, timezone.utc)
+    )
+
+
+async def _iter_mapping(data: memoryview, chunk_size: int) -> AsyncIterator[memoryview]:
+    for offset in range(0, len(data), chunk_size):
+        chunk = data[offset:offset + chunk_size]
+        await asyncio.to_thread(_fault_in, chunk)
+        yield chunk
+
+
+def _fault_in(data: memoryview) -> None:
+    # Touches a byte of every page, so that the event loop isn't blocked by reading them from the disk later
+    data[::mmap.PAGESIZE].tobytes()
@@ -0,0 +1,92 @@
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from trezorpass.store.sources.source import Source, SourceMetadata, CHUNK_SIZE, iterate_in_thread
+
+
+class HttpSource(Source):
+    """Loads the store over HTTP(S)
+
+    Args:
+        url: URL of the store, or of the directory containing the store if it ends with a slash
+        headers: Additional request headers, e.g. for authorization
+        timeout: Number of seconds to wait for the server
+    """
+    def __init__(self, url: str, headers: dict[str, str] | None = None, timeout: float = 30):
+        self.url = url
+        self.headers = headers if headers else {}
+        self.timeout = timeout
+
+    @staticmethod
+    def from_url(url: str, **options) -> 'HttpSource':
+        return HttpSource(url)
+
+    async def load_store(self, store_name) -> bytes:
+        def fetch():
+            with self._open(store_name) as response:
+                return response.read()
+        return await asyncio.to_thread(fetch)
+
+    async def stat(self, store_name) -> SourceMetadata:
+        def fetch():
+            with self._open(store_name, method="HEAD") as response:
+                return _metadata(response)
+        return await asyncio.to_thread(fetch)
+
+    async def iter_store(self, store_name, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        _, chunks = await self.open_store(store_name, chunk_size)
+        async for chunk in chunks:
+            yield chunk
+
+    async def open_store(self, store_name,
+                         chunk_size: int = CHUNK_SIZE) -> tuple[SourceMetadata, AsyncIterator[bytes]]:
+        """The metadata is taken from the headers of the response the store is read from"""
+        response = await asyncio.to_thread(self._open, store_name)
+        return _metadata(response), _read(response, chunk_size)
+
+    async def load_store_if_changed(self, store_name, version) -> tuple[bytes | None, SourceMetadata]:
+        def fetch():
+            if not version:
+                headers = {}
+            elif version.startswith(('"', 'W/')):
+                headers = {"If-None-Match": version}
+            else:
+                headers = {"If-Modified-Since": version}
+            try:
+                with self._open(store_name, headers=headers) as response:
+                    return response.read(), _metadata(response)
+            except HTTPError as e:
+                if e.code == 304:
+                    return None, _metadata(e, version)  # Servers may leave the validators out
+                raise
+        return await asyncio.to_thread(fetch)
+
+    def store_name_hint(self) -> str | None:
+        return None if self.url.endswith("/") else self.url
+
+    def resolve(self, store_name: str | None) -> str | None:
+        return self.url + store_name if self.url.endswith("/") else self.url
+
+    def _open(self, store_name, method: str = "GET", headers: dict[str, str] | None = None):
+        request = Request(self.resolve(store_name), method=method, headers={**self.headers, **(headers or {})})
+        return urlopen(request, timeout=self.timeout)
+
+
+async def _read(response, chunk_size: int) -> AsyncIterator[bytes]:
+    with response:
+        async for chunk in iterate_in_thread(iter(lambda: response.read(chunk_size), b"")):
+            yield chunk
+
+
+def _metadata(response, version: str | None = None) -> SourceMetadata:
+    """Metadata of the response, its version falls back to the given one if the response has no validator"""
+    length = response.headers.get("Content-Length")
+    modified = response.headers.get("Last-Modified")
+    return SourceMetadata(
+        size=int(length) if length else None,
+        version=response.headers.get("ETag") or modified or version,
+        mtime=parsedate_to_datetime(modified) if modified else None
+    )
@@ -0,0 +1,47 @@
+import importlib
+from typing import Callable
+from urllib.parse import urlsplit
+
+from trezorpass.store.sources.source import Source, SourceError
+from trezorpass.store.sources.file_source import FileSource
+
+_factories: dict[str, Callable[..., Source]] = {}
+
+
+def register_source(scheme: str, factory: Callable[..., Source]) -> None:
+    """Registers a factory of sources for the URL scheme
+
+    Args:
+        scheme: URL scheme handled by the factory
+        factory: Called with the URL and the options given to open_source, unknown options should be ignored
+    """
+    _factories[scheme.lower()] = factory
+
+
+def open_source(url: str, **options) -> Source:
+    """Creates source of the store located by the URL, plain paths are considered to be files"""
+    scheme = urlsplit(url).scheme.lower()
+    if len(scheme) <= 1:  # Plain path, possibly starting with a drive letter
+        scheme = "file"
+    if scheme not in _factories:
+        raise SourceError(f"Unsupported store location: {url}")
+    return _factories[scheme](url, **options)
+
+
+def lazy_factory(module: str, source: str) -> Callable[..., Source]:
+    """Factory of sources that imports their module only when the first source is created
+
+    Args:
+        module: Absolute name of the module defining the source
+        source: Name of the source class, its from_url is used as the factory
+    """
+    def factory(url: str, **options) -> Source:
+        return getattr(importlib.import_module(module), source).from_url(url, **options)
+    return factory
+
+
+register_source("file", FileSource.from_url)
+register_source("dropbox", lazy_factory("trezorpass.store.sources.dropbox_source", "DropboxSource"))
+register_source("http", lazy_factory("trezorpass.store.sources.http_source", "HttpSource"))
+register_source("https", lazy_factory("trezorpass.store.sources.http_source", "HttpSource"))
+register_source("s3", lazy_factory("trezorpass.store.sources.s3_source", "S3Source"))
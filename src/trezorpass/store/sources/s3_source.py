@@ -0,0 +1,90 @@
+import asyncio
+import os
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+from trezorpass.store.sources.source import Source, SourceError, SourceMetadata, CHUNK_SIZE, iterate_in_thread
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+    ClientError = ()  # Nothing is caught, only a given client can be used without boto3
+
+
+class S3Source(Source):
+    """Loads the store from an S3 compatible object storage
+
+    Args:
+        bucket: Bucket containing the store
+        key: Key of the store, or the prefix the store name is appended to if it's empty or ends with a slash
+        client: S3 client, by default one is created from the environment
+        endpoint_url: Endpoint of the storage, defaults to AWS_ENDPOINT_URL from the environment
+    """
+    def __init__(self, bucket: str, key: str = "", client=None, endpoint_url: str | None = None):
+        self.bucket = bucket
+        self.key = key
+        self.endpoint_url = endpoint_url if endpoint_url else os.environ.get("AWS_ENDPOINT_URL")
+        self._client = client
+
+    @staticmethod
+    def from_url(url: str, **options) -> 'S3Source':
+        parsed = urlsplit(url)
+        return S3Source(parsed.netloc, parsed.path.lstrip("/"))
+
+    @property
+    def client(self):
+        if not self._client:
+            if not boto3:
+                raise SourceError("S3 stores require boto3 to be installed")
+            self._client = boto3.client("s3", endpoint_url=self.endpoint_url)
+        return self._client
+
+    async def load_store(self, store_name) -> bytes:
+        def fetch():
+            return self._get(store_name)["Body"].read()
+        return await asyncio.to_thread(fetch)
+
+    async def stat(self, store_name) -> SourceMetadata:
+        response = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.resolve(store_name))
+        return _metadata(response)
+
+    async def iter_store(self, store_name, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        _, chunks = await self.open_store(store_name, chunk_size)
+        async for chunk in chunks:
+            yield chunk
+
+    async def open_store(self, store_name,
+                         chunk_size: int = CHUNK_SIZE) -> tuple[SourceMetadata, AsyncIterator[bytes]]:
+        """The metadata is taken from the response the store is read from"""
+        response = await asyncio.to_thread(self._get, store_name)
+        return _metadata(response), iterate_in_thread(response["Body"].iter_chunks(chunk_size))
+
+    async def load_store_if_changed(self, store_name, version) -> tuple[bytes | None, SourceMetadata]:
+        def fetch():
+            try:
+                response = self._get(store_name, **({"IfNoneMatch": version} if version else {}))
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") == "304":
+                    return None, SourceMetadata(version=version)
+                raise
+            return response["Body"].read(), _metadata(response)
+        return await asyncio.to_thread(fetch)
+
+    def store_name_hint(self) -> str | None:
+        return None if not self.key or self.key.endswith("/") else self.key
+
+    def resolve(self, store_name: str | None) -> str | None:
+        return self.key + store_name if not self.key or self.key.endswith("/") else self.key
+
+    def _get(self, store_name, **kwargs) -> dict:
+        return self.client.get_object(Bucket=self.bucket, Key=self.resolve(store_name), **kwargs)
+
+
+def _metadata(response: dict) -> SourceMetadata:
+    return SourceMetadata(
+        size=response.get("ContentLength"),
+        version=response.get("ETag"),
+        mtime=response.get("LastModified")
+    )
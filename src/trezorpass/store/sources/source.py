@@ -1,12 +1,158 @@
+import asyncio
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+CHUNK_SIZE = 1 << 20
+
+T = TypeVar("T")
+
+
+@dataclass(kw_only=True)
+class SourceMetadata:
+    size: int | None = None
+    version: str | None = None
+    mtime: datetime | None = None
+
+
 class Source:
     """Loads the password store
     
     Args:
         store_name: Name of the store to load, implementors may ignore this argument
     """
+    writable = False  # Whether the source implements save_store
+
     async def load_store(self, store_name: str | None) -> bytes:
         raise NotImplementedError()
 
+    async def stat(self, store_name: str | None) -> SourceMetadata:
+        """Describes the store without loading it"""
+        raise NotImplementedError()
+
+    async def iter_store(self, store_name: str | None, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Loads the store in chunks, implementors should override this to yield the chunks as they arrive"""
+        async for chunk in iterate_chunks(await self.load_store(store_name), chunk_size):
+            yield chunk
+
+    async def open_store(self, store_name: str | None,
+                         chunk_size: int = CHUNK_SIZE) -> tuple[SourceMetadata, AsyncIterator[bytes]]:
+        """Starts loading the store in chunks, see iter_store, along with the metadata of the store being loaded.
+        By default the metadata is taken before loading, so that its version is never newer than the data,
+        implementors should override this to take the metadata from the load itself.
+
+        Returns:
+            Metadata of the store and its chunks
+        """
+        try:
+            metadata = await self.stat(store_name)
+        except NotImplementedError:
+            metadata = SourceMetadata()
+        return metadata, self.iter_store(store_name, chunk_size)
+
+    async def load_store_if_changed(self, store_name: str | None,
+                                    version: str | None) -> tuple[bytes | None, SourceMetadata]:
+        """Loads the store unless its version matches the given one.
+        By default the metadata is taken before loading, see open_store, the store is loaded unconditionally
+        if the source can't describe it.
+
+        Returns:
+            The store, or None if it's unchanged, and the metadata of the returned store
+        """
+        try:
+            metadata = await self.stat(store_name)
+        except NotImplementedError:
+            return await self.load_store(store_name), SourceMetadata()
+        if version is not None and metadata.version == version:
+            return None, metadata
+        return await self.load_store(store_name), metadata
+
+    async def wait_for_change(self, store_name: str | None, version: str | None, poll_interval: float) -> None:
+        """Returns once the version of the store differs from the given one, polling its metadata by default
+
+        Args:
+            poll_interval: Number of seconds between checks, implementors notified of changes may ignore it
+
+        Raises:
+            NotImplementedError: The source can't tell changes of the store, as it can't describe it
+        """
+        while (await self.stat(store_name)).version == version:
+            await asyncio.sleep(poll_interval)
+
+    async def save_store(self, store_name: str | None, data: bytes, version: str | None) -> SourceMetadata:
+        """Saves the store, provided that it hasn't changed since the given version
+
+        Args:
+            data: Encrypted store
+            version: Version the store has been edited from, None if the store is new
+
+        Returns:
+            Metadata of the saved store
+
+        Raises:
+            SourceConflictError: The store has changed since the given version
+        """
+        raise NotImplementedError()
+
+    async def close(self) -> None:
+        """Releases connections and background tasks of the source once it's no longer used"""
+        pass
+
+    def store_name_hint(self) -> str | None:
+        """Name of the store expected to be loaded, allowing it to be loaded before the keychain is available"""
+        return None
+
+    def resolve(self, store_name: str | None) -> str | None:
+        """Identifies the store that is loaded for the given store name"""
+        return store_name
+
 
 class SourceError(Exception):
     pass
+
+
+class SourceConflictError(SourceError):
+    pass
+
+
+async def iterate_chunks(data: bytes, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Splits loaded data into chunks without copying them"""
+    data = memoryview(data)
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+
+async def iterate_in_thread(iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Consumes a blocking iterator off the event loop"""
+    end = object()
+    while (chunk := await asyncio.to_thread(next, iterator, end)) is not end:
+        yield chunk
+
+
+async def run_in_daemon_thread(fn: Callable[..., T], *args) -> T:
+    """Runs a long blocking call off the event loop. Unlike asyncio.to_thread, a call that's still running
+    when its awaiter is cancelled doesn't hold up the shutdown of the event loop or the interpreter"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(result: T | None, exception: BaseException | None) -> None:
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def run() -> None:
+        try:
+            result, exception = fn(*args), None
+        except BaseException as e:
+            result, exception = None, e
+        try:
+            loop.call_soon_threadsafe(resolve, result, exception)
+        except RuntimeError:
+            pass  # The event loop is closed, nobody waits for the result anymore
+
+    threading.Thread(target=run, daemon=True).start()
+    return await future
@@ -1,12 +1,71 @@
 from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Iterable
 
 from .entry import EncryptedEntry
+from .index import SearchIndex, TagIndex
 from .tag import Tag
 
+if TYPE_CHECKING:
+    from .editor import StoreEditor
+
 
 @dataclass(kw_only=True)
 class Store:
     name: str
     entries: list[EncryptedEntry] = field(default_factory=list)
     tags: list[Tag] = field(default_factory=list)
+    metadata: dict = field(default_factory=dict)
+    version: str | None = None
+    revision: int = 0
+    editor: 'StoreEditor | None' = field(default=None, repr=False, compare=False)
+    # Entries as they have been encoded in the source, written back unchanged, see StoreDecoder and StoreEncoder
+    encoded_entries: dict[int, tuple[EncryptedEntry, tuple, bytes]] | None = field(default=None, repr=False,
+                                                                                   compare=False)
+
+    @cached_property
+    def index(self) -> SearchIndex:
+        """Search index of the entries, built on the first use"""
+        return SearchIndex(self.entries)
+
+    @cached_property
+    def tag_index(self) -> TagIndex:
+        """Entries by their tags, built when the store is decoded"""
+        return TagIndex(self.entries)
+
+    def tagged(self, tags: Iterable[str]) -> list[EncryptedEntry]:
+        """Finds entries tagged with all the tags, see TagIndex.filter"""
+        return self.tag_index.filter(tags)
+
+    def search(self, query: str, tags: Iterable[str] = (), limit: int | None = None) -> list[EncryptedEntry]:
+        """Finds entries matching the query, see SearchIndex.search"""
+        return self.index.search(query, tags, limit)
+
+    def label(self, entry: EncryptedEntry) -> str | None:
+        """Label of the store the entry comes from, when the store is made of several ones, see MergedStore"""
+        return None
+
+    def editor_for(self, entry: EncryptedEntry | None = None) -> 'StoreEditor | None':
+        """Editor of the store the entry comes from, or of the store new entries are added to
+
+        Returns:
+            The editor, None if the store is read-only
+        """
+        return self.editor
 
+    def swap(self, other: 'Store') -> None:
+        """Replaces the contents by the contents of another store, e.g. a reloaded one, and bumps the revision.
+        The swap doesn't yield to the event loop, so coroutines see either the old or the new contents.
+        """
+        self.__dict__.pop("index", None)
+        self.__dict__.pop("tag_index", None)
+        self.entries = other.entries
+        self.tags = other.tags
+        self.metadata = other.metadata
+        self.version = other.version
+        self.encoded_entries = other.encoded_entries
+        if "index" in other.__dict__:
+            self.index = other.index
+        if "tag_index" in other.__dict__:
+            self.tag_index = other.tag_index
+        self.revision += 1
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Tag:
     title: str
+    icon: str | None = None
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+from ..crypto import wipe
+from ..timing import timed
+from .decoders import StoreDecoder, EntryDecoder, TagDecoder
+from .decrypters import StoreDecrypter
+from .editor import StoreEditor
+from .errors import StoreLoadError
+from .keychain import Keychain
+from .snapshot import StoreSnapshots
+from .sources import Source
+from .store import Store
+
+POLL_INTERVAL = 2.0
+
+
+class StoreWatcher:
+    """Reloads the store whenever it changes in its source, swapping the contents of the loaded store.
+    The reloaded store is decrypted by the already derived store key, so the device isn't involved.
+
+    Args:
+        keychain: Keychain the store has been loaded with
+        source: Source the store has been loaded from
+        store: Loaded store with the version it has been loaded at, kept up to date by the watcher
+        poll_interval: Number of seconds between checks of sources that can't notify about changes, and between retries
+        snapshots: Snapshots to be updated by the reloaded store
+        editor: Editor of the store, its pending edits are applied to the reloaded store
+    """
+    def __init__(self, keychain: Keychain, source: Source, store: Store, poll_interval: float = POLL_INTERVAL,
+                 snapshots: StoreSnapshots | None = None, editor: StoreEditor | None = None):
+        self.keychain = keychain
+        self.source = source
+        self.store = store
+        self.poll_interval = poll_interval
+        self.snapshots = snapshots
+        self.editor = editor
+        self.decrypter = StoreDecrypter(keychain)
+        self.decoder = StoreDecoder(keychain, EntryDecoder(), TagDecoder(), keep_encoded=editor is not None)
+
+    async def run(self) -> None:
+        """Watches the source until cancelled, or until it turns out that the source can't tell changes"""
+        while True:
+            try:
+                await self.source.wait_for_change(self.keychain.store_name, self.store.version, self.poll_interval)
+                await self.reload()
+            except NotImplementedError:
+                logging.warning("The source can't tell changes of the store, the store isn't kept up to date")
+                return
+            except Exception:
+                logging.exception("Store reload has failed")
+                await asyncio.sleep(self.poll_interval)
+
+    async def reload(self) -> bool:
+        """Reloads the store unless it's unchanged
+
+        Returns:
+            Whether the store has been reloaded
+        """
+        version = self.store.version
+        try:
+            encrypted_store, metadata = await self.source.load_store_if_changed(self.keychain.store_name, version)
+        except Exception as e:
+            raise StoreLoadError() from e
+        if encrypted_store is None:
+            return False
+        with timed("Store reload"):
+            store = await asyncio.to_thread(self._decode, encrypted_store, metadata.version)
+        if self.store.version != version:
+            return False  # The store has been saved by its editor meanwhile, the reloaded one may be older
+        store.version = metadata.version
+        self.store.swap(self.editor.rebase(store) if self.editor else store)
+        return True
+
+    def _decode(self, encrypted_store: bytes, version: str | None) -> Store:
+        decrypted_store = self.decrypter.decrypt(encrypted_store)
+        try:
+            store = self.decoder.decode(decrypted_store)
+        finally:
+            wipe(decrypted_store)
+        if "index" in self.store.__dict__:
+            store.index  # Rebuilt here rather than on the first search after the swap
+        if self.snapshots and version is not None:
+            self.snapshots.save(self.keychain, store, version)
+        return store
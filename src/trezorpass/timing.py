@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import TextIO
+
+logger = logging.getLogger(__name__)
+
+_profiler: 'Profiler | None' = None
+
+
+class Span:
+    """Duration of a stage, with optional attributes such as byte counts"""
+    __slots__ = ("stage", "attributes", "start", "end", "thread")
+
+    def __init__(self, stage: str, attributes: dict):
+        self.stage = stage
+        self.attributes = attributes
+        self.start = 0
+        self.end = 0
+        self.thread = 0
+
+    def __enter__(self) -> 'Span':
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.end = time.perf_counter_ns()
+        logger.debug("%s took %.3f s", self.stage, self.duration)
+        profiler = _profiler
+        if profiler:
+            profiler.spans.append(self)
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / 1e9
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, attribute: str, amount: int) -> None:
+        """Accumulates an attribute, e.g. bytes processed in chunks"""
+        self.attributes[attribute] = self.attributes.get(attribute, 0) + amount
+
+
+class _DisabledSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> '_DisabledSpan':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def add(self, attribute: str, amount: int) -> None:
+        pass
+
+
+_DISABLED_SPAN = _DisabledSpan()
+
+
+def timed(stage: str, **attributes) -> Span | _DisabledSpan:
+    """Measures duration of the wrapped stage, which is logged and recorded by the running profiler.
+    Nothing is measured unless debug logs or profiling are enabled.
+
+    Args:
+        stage: Name of the stage to be reported
+        attributes: Details of the stage, e.g. byte counts
+    """
+    if _profiler is None and not logger.isEnabledFor(logging.DEBUG):
+        return _DISABLED_SPAN
+    return Span(stage, attributes)
+
+
+class Profiler:
+    """Collects spans of all threads while it's running, see start_profiling"""
+    def __init__(self):
+        self.start = time.perf_counter_ns()
+        self.spans: list[Span] = []
+
+    def summary(self) -> str:
+        """Aggregates the spans by stage, in the order the stages have first started"""
+        stages = defaultdict(list)
+        for span in sorted(self.spans, key=lambda span: span.start):
+            stages[span.stage].append(span)
+        lines = [f"{'stage':<32} {'count':>6} {'total s':>9} {'max s':>9}  details"]
+        for stage, spans in stages.items():
+            totals = defaultdict(int)
+            for span in spans:
+                for attribute, value in span.attributes.items():
+                    if isinstance(value, (int, float)):
+                        totals[attribute] += value
+            details = ", ".join(f"{attribute} {_format(attribute, value)}" for attribute, value in totals.items())
+            lines.append(f"{stage:<32} {len(spans):>6} {sum(span.duration for span in spans):>9.3f} "
+                         f"{max(span.duration for span in spans):>9.3f}  {details}")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, file: TextIO) -> None:
+        """Writes the spans in the Trace Event Format, viewable in chrome://tracing or Perfetto"""
+        pid = os.getpid()
+        events = [{
+            "name": span.stage,
+            "ph": "X",
+            "ts": (span.start - self.start) / 1e3,
+            "dur": (span.end - span.start) / 1e3,
+            "pid": pid,
+            "tid": span.thread,
+            "args": span.attributes
+        } for span in self.spans]
+        events.extend({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread.ident, "args": {"name": thread.name}}
+                      for thread in threading.enumerate())
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def start_profiling() -> Profiler:
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def stop_profiling() -> Profiler | None:
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def _format(attribute: str, value: int | float) -> str:
+    if attribute == "bytes":
+        return f"{value / 2 ** 20:.1f} MB" if value >= 2 ** 20 else f"{value / 2 ** 10:.1f} kB"
+    return str(value)
@@ -0,0 +1,15 @@
+import pytest
+
+from trezorpass.store import Keychain
+
+from .fakes import FakeTrezorClient
+
+
+@pytest.fixture
+def client() -> FakeTrezorClient:
+    return FakeTrezorClient()
+
+
+@pytest.fixture
+def keychain(client) -> Keychain:
+    return Keychain(client)
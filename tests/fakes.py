@@ -0,0 +1,167 @@
+import hashlib
+import hmac
+import json
+import random
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import dropbox
+import requests
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from trezorlib import messages
+from trezorlib.exceptions import Cancelled
+
+from trezorpass.crypto import encrypt
+from trezorpass.store import Keychain, Entry, StoreDecrypter
+from trezorpass.store.sources import Source, SourceMetadata, SourceConflictError
+
+
+class FakeTrezorClient:
+    """Stands in for TrezorClient in the calls made by Keychain, answering CipherKeyValue like the device does,
+    by AES-CBC with a key derived from the secret, the key string and the confirmation flags
+
+    Args:
+        secret: Secret of the emulated device
+        declined: Key strings whose confirmation the user declines
+    """
+    def __init__(self, secret: bytes = b"test", declined: set[str] | None = None):
+        self.secret = secret
+        self.declined = declined if declined is not None else set()
+        self.calls = []  # Key strings of the calls
+        self.cancels = 0
+
+    def call(self, msg):
+        if not isinstance(msg, messages.CipherKeyValue):
+            raise NotImplementedError(f"{type(msg).__name__} is not emulated")
+        self.calls.append(msg.key)
+        if msg.key in self.declined:
+            raise Cancelled()
+        if len(msg.value) % 16:
+            raise ValueError("Value length must be a multiple of 16")
+        flags = f"{'E' if msg.ask_on_encrypt else ''}{'D' if msg.ask_on_decrypt else ''}"
+        key = hmac.new(self.secret, f"{msg.key}{flags}".encode(), hashlib.sha256).digest()
+        cipher = Cipher(algorithms.AES(key), modes.CBC(msg.iv if msg.iv else bytes(16)))
+        context = cipher.encryptor() if msg.encrypt else cipher.decryptor()
+        return messages.CipheredKeyValue(value=context.update(msg.value) + context.finalize())
+
+    def cancel(self) -> None:
+        self.cancels += 1
+
+
+class FakeDropbox:
+    """Stands in for the Dropbox client, keeping a single file. Uploads of a revision other than the current one
+    are rejected as conflicts.
+
+    Args:
+        data: Content of the file, None if there's no file
+        rev: Number of the revision of the file
+    """
+    def __init__(self, data: bytes | None = None, rev: int = 1):
+        self.data = data
+        self.rev = rev
+        self.reachable = True
+        self.calls = []  # Names of the requests
+        self.uploads = []
+
+    def replace(self, data: bytes) -> None:
+        """Changes the file as another client would"""
+        self.data = data
+        self.rev += 1
+
+    def files_get_metadata(self, path):
+        self._request("get_metadata")
+        return self._metadata(path)
+
+    def files_download(self, path):
+        self._request("download")
+        return self._metadata(path), SimpleNamespace(content=self.data)
+
+    def files_upload(self, data, path, mode, mute, strict_conflict):
+        self._request("upload")
+        self.uploads.append((data, path, mode))
+        if mode != dropbox.files.WriteMode.add and mode != dropbox.files.WriteMode.update(self._rev()):
+            reason = dropbox.files.WriteError.conflict(dropbox.files.WriteConflictError.file)
+            error = dropbox.files.UploadError.path(dropbox.files.UploadWriteFailed(reason=reason,
+                                                                                   upload_session_id="session"))
+            raise dropbox.exceptions.ApiError("request", error, None, None)
+        self.replace(data)
+        return self._metadata(path)
+
+    def _request(self, name: str) -> None:
+        self.calls.append(name)
+        if not self.reachable:
+            raise requests.exceptions.ConnectionError()
+
+    def _metadata(self, path: str) -> dropbox.files.FileMetadata:
+        modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        return dropbox.files.FileMetadata(name=path.lstrip("/"), id="id:store", client_modified=modified,
+                                          server_modified=modified, rev=self._rev(), size=len(self.data),
+                                          content_hash=hashlib.sha256(self.data).hexdigest())
+
+    def _rev(self) -> str:
+        return "%09d" % self.rev  # Revisions have at least 9 characters
+
+
+class MemorySource(Source):
+    """Writable source keeping the store in memory, every save makes a new version"""
+    writable = True
+
+    def __init__(self, data: bytes):
+        self.data = bytes(data)
+        self.revision = 1
+        self.saves = []  # Versions the saves have been attempted from
+
+    @property
+    def version(self) -> str:
+        return str(self.revision)
+
+    def replace(self, data: bytes) -> None:
+        """Changes the store as another client would"""
+        self.data = bytes(data)
+        self.revision += 1
+
+    async def load_store(self, store_name) -> bytes:
+        return self.data
+
+    async def stat(self, store_name) -> SourceMetadata:
+        return SourceMetadata(size=len(self.data), version=self.version)
+
+    async def save_store(self, store_name, data: bytes, version: str | None) -> SourceMetadata:
+        self.saves.append(version)
+        if version != self.version:
+            raise SourceConflictError("The store has changed")
+        self.replace(data)
+        return await self.stat(store_name)
+
+
+def store_dict(client, entries_count: int, seed: int = 0) -> dict:
+    """Store of the entries Entry 0, Entry 1... with decryptable secrets, the first one tagged Work"""
+    rng = random.Random(seed)
+    keychain = Keychain(client)
+    entries = {}
+    for i in range(entries_count):
+        entry = Entry(url=f"https://service{i}.example.com/login", title=f"Entry {i}", username=f"user{i}",
+                      nonce=rng.randbytes(32).hex())
+        key = keychain.entry_key(entry)
+        entries[str(i)] = {
+            "title": entry.url,  # Intended
+            "username": entry.username,
+            "nonce": entry.nonce,
+            "note": entry.title,  # Intended
+            "password": {"type": "Buffer", "data": list(encrypt(key, json.dumps(f"password{i}").encode()))},
+            "safe_note": {"type": "Buffer", "data": list(encrypt(key, json.dumps(f"note{i}").encode()))},
+            "tags": [1] if i == 0 else [],
+            "success": True,
+            "export": False
+        }
+    return {"version": "0.0.1", "extVersion": "0.6.0", "config": {"orderType": "date"},
+            "tags": {"0": {"title": "All", "icon": "home"}, "1": {"title": "Work", "icon": "tag"}}, "entries": entries}
+
+
+def encrypted_store(client, entries_count: int, seed: int = 0) -> bytes:
+    """Store encrypted the way Trezor Password Manager does it, see store_dict"""
+    return encrypt(Keychain(client).store_key, json.dumps(store_dict(client, entries_count, seed)).encode())
+
+
+def decrypted_store(keychain: Keychain, data: bytes) -> dict:
+    return json.loads(bytes(StoreDecrypter(keychain).decrypt(data)))
@@ -0,0 +1,136 @@
+import asyncio
+import io
+import json
+import os
+import stat
+
+import pytest
+
+from trezorpass.agent import Agent, AgentClient, AgentError
+from trezorpass.headless import write_secrets_from_agent
+from trezorpass.store import AsyncKeychain, entry_key_message, get_default_store_manager
+
+from .fakes import MemorySource, encrypted_store
+
+
+async def serving(client, path: str, interaction, idle_timeout: float = 60):
+    """Runs the interaction with an agent serving a store of 3 entries on the path, then locks the agent"""
+    keychain = await AsyncKeychain.create(client)
+    async with get_default_store_manager(keychain.keychain, MemorySource(encrypted_store(client, 3))) as store:
+        agent = Agent(keychain, store, idle_timeout)
+        listening = asyncio.Event()
+        serve = asyncio.create_task(agent.serve(path, lambda _: listening.set()))
+        await asyncio.wait_for(listening.wait(), 5)
+        try:
+            return await interaction(agent)
+        finally:
+            agent.lock()
+            await asyncio.wait_for(serve, 5)
+
+
+def test_search_and_unlock(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+
+    async def interaction(agent: Agent):
+        agent_client = AgentClient(path)
+        assert await agent_client.ping()
+        entries = (await agent_client.request("search", query="Entry 1", limit=1))["entries"]
+        assert [(entry["title"], entry["username"]) for entry in entries] == [("Entry 1", "user1")]
+        assert "password" not in entries[0]
+        return (await agent_client.request("unlock", nonce=entries[0]["nonce"]))["entry"]
+
+    entry = asyncio.run(serving(client, path, interaction))
+
+    assert (entry["password"], entry["safe_note"]) == ("password1", "note1")
+
+
+def test_unknown_entry_and_command_are_errors(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+
+    async def interaction(agent: Agent):
+        agent_client = AgentClient(path)
+        with pytest.raises(AgentError, match="Entry not found"):
+            await agent_client.request("unlock", nonce="00")
+        with pytest.raises(AgentError, match="Unknown command"):
+            await agent_client.request("unknown")
+        assert await agent_client.ping()  # Still serving
+
+    asyncio.run(serving(client, path, interaction))
+
+
+def test_socket_is_private_and_removed_on_lock(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+
+    async def interaction(agent: Agent):
+        return stat.S_IMODE(os.stat(path).st_mode)
+
+    mode = asyncio.run(serving(client, path, interaction))
+
+    assert not mode & 0o077
+    assert not os.path.exists(path)
+
+
+def test_lock_request_shuts_agent_down(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+
+    async def interaction(agent: Agent):
+        await AgentClient(path).request("lock")
+        await asyncio.sleep(0.1)
+        return await AgentClient(path).ping()
+
+    assert not asyncio.run(serving(client, path, interaction))
+
+
+def test_second_agent_is_refused(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+
+    async def interaction(agent: Agent):
+        with pytest.raises(AgentError, match="Another agent"):
+            await Agent(agent.keychain, agent.store).serve(path)
+        assert await AgentClient(path).ping()
+
+    asyncio.run(serving(client, path, interaction))
+
+
+def test_stale_socket_is_replaced(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+    open(path, "w").close()
+
+    async def interaction(agent: Agent):
+        return await AgentClient(path).ping()
+
+    assert asyncio.run(serving(client, path, interaction))
+
+
+def test_idle_agent_shuts_down(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+
+    async def interaction(agent: Agent):
+        await asyncio.sleep(0.3)
+        return os.path.exists(path)
+
+    assert not asyncio.run(serving(client, path, interaction, idle_timeout=0.1))
+
+
+def test_write_secrets_from_agent(client, tmp_path):
+    path = str(tmp_path / "agent.sock")
+    output = io.StringIO()
+
+    async def interaction(agent: Agent):
+        client.declined.add(entry_key_message(agent.store.entries[2]))
+        return await write_secrets_from_agent(AgentClient(path), ["Entry 0", "Entry 2", "missing"], output)
+
+    failed = asyncio.run(serving(client, path, interaction))
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failed == 2
+    assert records[0]["password"] == "password0"
+    assert records[1] == {"query": "Entry 2", "error": "Cancelled"}
+    assert records[2] == {"query": "missing", "error": "No matching entry"}
+
+
+def test_write_secrets_without_agent(tmp_path):
+    output = io.StringIO()
+
+    assert asyncio.run(write_secrets_from_agent(AgentClient(str(tmp_path / "agent.sock")), ["Entry 0"], output)) is None
+    assert output.getvalue() == ""
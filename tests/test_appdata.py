@@ -0,0 +1,30 @@
+import os
+import stat
+
+import pytest
+
+from trezorpass.appdata import atomic_file, write_atomic
+
+
+def test_write_replaces_file_readable_by_owner_only(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"old")
+
+    write_atomic(path, b"new")
+
+    assert path.read_bytes() == b"new"
+    assert not stat.S_IMODE(path.stat().st_mode) & 0o077
+    assert os.listdir(tmp_path) == ["file"]
+
+
+def test_failed_write_leaves_file_as_it_was(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_file(path) as file:
+            file.write(b"partial")
+            raise RuntimeError()
+
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["file"]
@@ -0,0 +1,55 @@
+import logging
+import sys
+
+import pytest
+
+from trezorpass import cli
+
+
+def parse(monkeypatch, *argv: str):
+    parsed = []
+    monkeypatch.setattr(logging, "disable", lambda *args: None)
+    monkeypatch.setattr(cli, "init_data", lambda: None)
+    monkeypatch.setattr(cli, "run_command", lambda args: parsed.append(args) or True)
+    monkeypatch.setattr(sys, "argv", ["trezor-pass", *argv])
+    cli.run()
+    return parsed[0]
+
+
+@pytest.mark.parametrize("command", ["get", "audit", "export"])
+def test_shared_options_follow_command(monkeypatch, command):
+    args = parse(monkeypatch, command, "--tag", "Work", "--store", "work=work.pswd", "--offline")
+
+    assert args.tag == ["Work"]
+    assert args.stores == {"work": "work.pswd"}
+    assert args.offline
+
+
+def test_shared_options_precede_command(monkeypatch):
+    args = parse(monkeypatch, "--tag", "Work", "--store", "work.pswd", "--offline", "get", "--batch")
+
+    assert args.tag == ["Work"]
+    assert args.stores == {"work": "work.pswd"}
+    assert args.offline
+    assert args.batch
+
+
+def test_shared_options_default(monkeypatch):
+    args = parse(monkeypatch, "get", "query")
+
+    assert args.tag == []
+    assert args.stores == {"dropbox": "dropbox://"}
+    assert not args.offline
+    assert args.queries == ["query"]
+
+
+def test_failed_command_exits_non_zero(monkeypatch):
+    monkeypatch.setattr(logging, "disable", lambda *args: None)
+    monkeypatch.setattr(cli, "init_data", lambda: None)
+    monkeypatch.setattr(cli, "run_command", lambda args: False)
+    monkeypatch.setattr(sys, "argv", ["trezor-pass", "get", "query"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli.run()
+
+    assert exit_info.value.code == 1
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import requests
+
+from trezorpass.store.sources import DropboxSource, StoreCache, OAuth
+from trezorpass.store.sources.dropbox_source import REFRESH_MARGIN
+
+
+class FakeSession(requests.Session):
+    """Answers the token refreshes and metadata requests of the Dropbox client without any connection"""
+    def __init__(self):
+        super().__init__()
+        self.requests = []  # Paths and access tokens of the requests
+        self.refreshes = 0
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        path = url.split("/", 3)[3]
+        self.requests.append((path, (headers or {}).get("Authorization")))
+        if path == "oauth2/token":
+            self.refreshes += 1
+            return _response({"access_token": f"access{self.refreshes}", "expires_in": 14400})
+        if path == "2/files/get_metadata":
+            return _response({".tag": "file", "name": "store.pswd", "id": "id:store", "rev": "000000001", "size": 5,
+                              "client_modified": "2024-01-01T00:00:00Z", "server_modified": "2024-01-01T00:00:00Z",
+                              "content_hash": "0" * 64, "path_display": "/store.pswd"})
+        raise AssertionError(f"Unexpected request of {path}")
+
+
+def _response(content: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps(content).encode()
+    return response
+
+
+def authenticated_source(tmp_path, session: FakeSession, expires_in: float) -> DropboxSource:
+    source = DropboxSource(cache=StoreCache(tmp_path / "cache"), session=session)
+    source.token_file = str(tmp_path / "dropbox")
+    expiration = datetime.utcnow() + timedelta(seconds=expires_in)
+    source.oauth = OAuth("access0", "refresh", expiration.isoformat())
+    return source
+
+
+def test_token_is_refreshed_ahead_of_expiration(tmp_path):
+    session = FakeSession()
+    source = authenticated_source(tmp_path, session, expires_in=REFRESH_MARGIN / 2)
+
+    async def stat():
+        metadata = await source.stat("store.pswd")
+        while not session.refreshes:
+            await asyncio.sleep(0.01)
+        await source.close()
+        return metadata
+    metadata = asyncio.run(asyncio.wait_for(stat(), 5))
+
+    assert metadata.version == "000000001"
+    assert source.oauth.access_token == "access1"
+    assert source.oauth.expires_at > datetime.utcnow() + timedelta(seconds=REFRESH_MARGIN)
+    assert OAuth.load(source.token_file).access_token == "access1"  # Saved for the next start
+
+
+def test_client_is_kept_and_uses_refreshed_token(tmp_path):
+    session = FakeSession()
+    source = authenticated_source(tmp_path, session, expires_in=REFRESH_MARGIN / 2)
+
+    async def stat_twice():
+        await source.stat("store.pswd")
+        while not session.refreshes:
+            await asyncio.sleep(0.01)
+        await source.stat("store.pswd")
+        await source.close()
+    asyncio.run(asyncio.wait_for(stat_twice(), 5))
+
+    metadata_requests = [token for path, token in session.requests if path == "2/files/get_metadata"]
+    assert metadata_requests[-1] == "Bearer access1"
+    assert source._client is not None and source._client._session is session
+
+
+def test_token_far_from_expiration_isnt_refreshed(tmp_path):
+    session = FakeSession()
+    source = authenticated_source(tmp_path, session, expires_in=REFRESH_MARGIN * 10)
+
+    async def stat():
+        await source.stat("store.pswd")
+        await asyncio.sleep(0.05)
+        await source.close()
+    asyncio.run(stat())
+
+    assert session.refreshes == 0
+    assert [token for _, token in session.requests] == ["Bearer access0"]
@@ -0,0 +1,181 @@
+import asyncio
+
+import dropbox
+import pytest
+import requests
+
+from trezorpass.store.sources import cache as store_cache, dropbox_source
+from trezorpass.store.sources import DropboxSource, SourceConflictError, SourceError, StoreCache, CachedStore
+
+from .fakes import FakeDropbox
+
+
+@pytest.fixture
+def cache(tmp_path) -> StoreCache:
+    return StoreCache(tmp_path)
+
+
+def test_save_updates_loaded_revision(cache):
+    client = FakeDropbox(b"store", rev=1)
+    source = DropboxSource(client=client, cache=cache)
+
+    metadata = asyncio.run(source.save_store("store.pswd", b"new store", "000000001"))
+
+    assert client.uploads == [(b"new store", "/store.pswd", dropbox.files.WriteMode.update("000000001"))]
+    assert metadata.version == "000000002"
+    assert metadata.size == len(b"new store")
+    cached = cache.load("store.pswd")
+    assert cached.rev == "000000002"
+    assert cached.data == b"new store"
+
+
+def test_save_adds_new_store(cache):
+    client = FakeDropbox()
+
+    asyncio.run(DropboxSource(client=client, cache=cache).save_store("store.pswd", b"new store", None))
+
+    assert client.uploads[0][2] == dropbox.files.WriteMode.add
+
+
+def test_save_conflict_is_reported(cache):
+    client = FakeDropbox(b"store", rev=2)
+    source = DropboxSource(client=client, cache=cache)
+
+    with pytest.raises(SourceConflictError):
+        asyncio.run(source.save_store("store.pswd", b"new store", "000000001"))
+
+    assert cache.load("store.pswd") is None
+
+
+def test_offline_stat_reads_only_cached_metadata(cache, monkeypatch):
+    cache.store("store.pswd", CachedStore(rev="000000003", content_hash="0" * 64, data=b"cached store"))
+    monkeypatch.setattr(cache, "load", None)  # The cached store isn't read
+
+    metadata = asyncio.run(DropboxSource(cache=cache, offline=True).stat("store.pswd"))
+
+    assert metadata.version == "000000003"
+    assert metadata.size == len(b"cached store")
+
+
+def test_offline_stat_of_uncached_store_fails(cache):
+    with pytest.raises(SourceError):
+        asyncio.run(DropboxSource(cache=cache, offline=True).stat("store.pswd"))
+
+
+def test_load_downloads_and_caches_store(cache):
+    client = FakeDropbox(b"store", rev=1)
+
+    data = asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+
+    assert data == b"store"
+    assert client.calls == ["download"]
+    assert cache.load("store.pswd").rev == "000000001"
+
+
+def test_interrupted_cache_write_leaves_no_store(cache, monkeypatch):
+    cache.store("store.pswd", CachedStore(rev="000000001", content_hash="old", data=b"old store"))
+
+    def write_atomic(path, data):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(store_cache, "write_atomic", write_atomic)
+    cache.store("store.pswd", CachedStore(rev="000000002", content_hash="new", data=b"new store"))
+
+    assert cache.load("store.pswd") is None
+    assert cache.load_metadata("store.pswd") is None
+
+
+def test_unchanged_revision_is_served_from_cache(cache):
+    client = FakeDropbox(b"store", rev=1)
+    asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+    client.calls.clear()
+
+    data, metadata = asyncio.run(DropboxSource(client=client, cache=cache).load_store_if_changed("store.pswd", None))
+
+    assert data == b"store"
+    assert metadata.version == "000000001"
+    assert client.calls == ["get_metadata"]
+
+
+def test_new_revision_of_same_content_isnt_downloaded(cache):
+    client = FakeDropbox(b"store", rev=1)
+    asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+    client.rev = 2  # E.g. restored from the history
+    client.calls.clear()
+
+    data = asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+
+    assert data == b"store"
+    assert client.calls == ["get_metadata"]
+    assert cache.load("store.pswd").rev == "000000002"
+
+
+def test_changed_store_is_downloaded_again(cache):
+    client = FakeDropbox(b"store", rev=1)
+    asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+    client.replace(b"changed store")
+    client.calls.clear()
+
+    data = asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+
+    assert data == b"changed store"
+    assert client.calls == ["get_metadata", "download"]
+    assert cache.load("store.pswd").data == b"changed store"
+
+
+def test_unchanged_version_isnt_loaded(cache):
+    client = FakeDropbox(b"store", rev=1)
+
+    data, metadata = asyncio.run(DropboxSource(client=client, cache=cache).load_store_if_changed("store.pswd",
+                                                                                                 "000000001"))
+
+    assert data is None
+    assert metadata.version == "000000001"
+    assert client.calls == ["get_metadata"]
+
+
+def test_unreachable_dropbox_falls_back_to_cache(cache):
+    client = FakeDropbox(b"store", rev=1)
+    asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+    client.reachable = False
+
+    data, metadata = asyncio.run(DropboxSource(client=client, cache=cache).load_store_if_changed("store.pswd", None))
+
+    assert data == b"store"
+    assert metadata.version == "000000001"
+
+
+def test_unreachable_dropbox_without_cache_fails(cache):
+    client = FakeDropbox(b"store", rev=1)
+    client.reachable = False
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+
+
+def test_offline_store_is_served_from_cache(cache):
+    client = FakeDropbox(b"store", rev=1)
+    asyncio.run(DropboxSource(client=client, cache=cache).load_store("store.pswd"))
+    client.calls.clear()
+
+    data = asyncio.run(DropboxSource(client=client, cache=cache, offline=True).load_store("store.pswd"))
+
+    assert data == b"store"
+    assert client.calls == []
+
+
+def test_offline_store_without_cache_fails(cache):
+    with pytest.raises(SourceError):
+        asyncio.run(DropboxSource(cache=cache, offline=True).load_store("store.pswd"))
+
+
+def test_account_is_taken_from_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(dropbox_source, "DROPBOX_TOKEN_FILE", str(tmp_path / "dropbox"))
+
+    assert DropboxSource.from_url("dropbox://").account is None
+    assert DropboxSource.from_url("dropbox://work-2/").token_file == str(tmp_path / "dropbox-work-2")
+
+
+@pytest.mark.parametrize("url", ["dropbox://../x", "dropbox://work/../../x", "dropbox://a b"])
+def test_account_escaping_app_dir_is_refused(url):
+    with pytest.raises(SourceError, match="account"):
+        DropboxSource.from_url(url)
@@ -0,0 +1,75 @@
+import asyncio
+import dataclasses
+
+from trezorpass.store import get_default_store_manager
+
+from .fakes import MemorySource, encrypted_store, decrypted_store
+
+
+def test_edits_are_coalesced_into_single_upload(client, keychain):
+    source = MemorySource(encrypted_store(client, 10))
+
+    async def edit():
+        async with get_default_store_manager(keychain, source, editable=True) as store:
+            first, second, third = store.entries[:3]
+            store.editor.delete(first)
+            store.editor.replace(second, dataclasses.replace(second, title="Renamed"))
+            store.editor.delete(third)
+            assert store.editor.pending == 3
+            assert len(store.entries) == 8
+    asyncio.run(edit())
+
+    assert source.saves == ["1"]
+    entries = list(decrypted_store(keychain, source.data)["entries"].values())
+    assert len(entries) == 8
+    assert entries[0]["note"] == "Renamed"
+
+
+def test_unchanged_entries_are_saved_as_they_were(client, keychain):
+    source = MemorySource(encrypted_store(client, 5))
+    original = list(decrypted_store(keychain, source.data)["entries"].values())
+
+    async def edit():
+        async with get_default_store_manager(keychain, source, editable=True) as store:
+            store.editor.delete(store.entries[0])
+    asyncio.run(edit())
+
+    assert list(decrypted_store(keychain, source.data)["entries"].values()) == original[1:]
+
+
+def test_conflicting_save_applies_edits_to_reloaded_store(client, keychain):
+    source = MemorySource(encrypted_store(client, 10, seed=1))
+    changed = encrypted_store(client, 12, seed=2)
+
+    async def edit():
+        async with get_default_store_manager(keychain, source, editable=True) as store:
+            deleted = store.entries[0]
+            source.replace(changed)  # Saved by another client meanwhile
+            store.editor.delete(deleted)
+        return store, deleted
+    store, deleted = asyncio.run(edit())
+
+    assert source.saves == ["1", "2"]
+    assert store.version == source.version
+    # The reloaded store has none of the loaded entries, the deletion of one of them is a no-op
+    assert len(store.entries) == 12
+    assert deleted.nonce not in {entry.nonce for entry in store.entries}
+    assert len(decrypted_store(keychain, source.data)["entries"]) == 12
+
+
+def test_conflicting_save_keeps_edits_of_entries_in_reloaded_store(client, keychain):
+    data = encrypted_store(client, 10)
+    source = MemorySource(data)
+
+    async def edit():
+        async with get_default_store_manager(keychain, source, editable=True) as store:
+            source.replace(data)  # Same content under a new version
+            store.editor.replace(store.entries[1], dataclasses.replace(store.entries[1], title="Renamed"))
+        return store
+    store = asyncio.run(edit())
+
+    assert source.saves == ["1", "2"]
+    assert store.entries[1].title == "Renamed"
+    entries = list(decrypted_store(keychain, source.data)["entries"].values())
+    assert len(entries) == 10
+    assert entries[1]["note"] == "Renamed"
@@ -0,0 +1,130 @@
+import asyncio
+import os
+
+import pytest
+
+from trezorpass.store import StorePrefetch, get_default_store_manager
+from trezorpass.store.sources import FileSource, SourceConflictError
+
+from .fakes import encrypted_store, decrypted_store
+
+
+def test_save_replaces_file_atomically(tmp_path):
+    path = tmp_path / "store.pswd"
+    path.write_bytes(b"old")
+    source = FileSource(str(path))
+    version = asyncio.run(source.stat(None)).version
+    inode = path.stat().st_ino
+
+    metadata = asyncio.run(source.save_store(None, b"new store", version))
+
+    assert path.read_bytes() == b"new store"
+    assert path.stat().st_ino != inode  # Renamed over the old file rather than rewritten in place
+    assert metadata == asyncio.run(source.stat(None))
+    assert metadata.version != version
+    assert os.listdir(tmp_path) == ["store.pswd"]
+
+
+def test_save_creates_new_file(tmp_path):
+    path = tmp_path / "store.pswd"
+
+    asyncio.run(FileSource(str(path)).save_store(None, b"new store", None))
+
+    assert path.read_bytes() == b"new store"
+
+
+def test_save_refuses_changed_file(tmp_path):
+    path = tmp_path / "store.pswd"
+    path.write_bytes(b"old")
+    source = FileSource(str(path))
+    version = asyncio.run(source.stat(None)).version
+    (tmp_path / "changed").write_bytes(b"changed store")
+    os.replace(tmp_path / "changed", path)
+
+    with pytest.raises(SourceConflictError):
+        asyncio.run(source.save_store(None, b"new store", version))
+
+    assert path.read_bytes() == b"changed store"
+    assert os.listdir(tmp_path) == ["store.pswd"]
+
+
+def test_save_refuses_new_file_over_existing_one(tmp_path):
+    path = tmp_path / "store.pswd"
+    path.write_bytes(b"old")
+
+    with pytest.raises(SourceConflictError):
+        asyncio.run(FileSource(str(path)).save_store(None, b"new store", None))
+
+    assert path.read_bytes() == b"old"
+
+
+def test_save_unmaps_file_before_replacing_it(tmp_path, monkeypatch):
+    path = tmp_path / "store.pswd"
+    path.write_bytes(b"old store")
+    source = FileSource(str(path))
+    data = asyncio.run(source.load_store(None))
+    mapped, version = data.obj, asyncio.run(source.stat(None)).version
+    del data
+    replace = os.replace
+
+    def replace_unmapped(src, dst):
+        if os.path.samefile(dst, path):
+            assert mapped.closed  # Mapped files can't be replaced on Windows
+        replace(src, dst)
+    monkeypatch.setattr(os, "replace", replace_unmapped)
+
+    metadata = asyncio.run(source.save_store(None, b"new store", version))
+
+    assert mapped.closed
+    assert bytes(asyncio.run(source.load_store(None))) == b"new store"
+    assert metadata == asyncio.run(source.stat(None))
+
+
+def test_save_keeps_store_in_use_mapped(tmp_path):
+    path = tmp_path / "store.pswd"
+    path.write_bytes(b"old store")
+    source = FileSource(str(path))
+    data = asyncio.run(source.load_store(None))
+
+    asyncio.run(source.save_store(None, b"new store", asyncio.run(source.stat(None)).version))
+
+    assert bytes(data) == b"old store"
+    assert bytes(asyncio.run(source.load_store(None))) == b"new store"
+
+
+def test_loaded_metadata_describes_loaded_data(tmp_path):
+    path = tmp_path / "store.pswd"
+    path.write_bytes(b"old")
+    source = FileSource(str(path))
+
+    async def load():
+        metadata, chunks = await source.open_store(None)
+        (tmp_path / "changed").write_bytes(b"changed store")
+        os.replace(tmp_path / "changed", path)
+        return metadata, b"".join([bytes(chunk) async for chunk in chunks])
+    metadata, data = asyncio.run(load())
+
+    assert data == b"old"
+    assert metadata.size == 3
+    assert metadata.version != asyncio.run(source.stat(None)).version
+
+
+def test_store_replaced_after_prefetch_is_reloaded(client, keychain, tmp_path):
+    path = tmp_path / keychain.store_name
+    path.write_bytes(encrypted_store(client, 20, seed=1))
+    source = FileSource(str(path))
+
+    async def edit():
+        prefetch = StorePrefetch(source)
+        await prefetch.task
+        (tmp_path / "changed").write_bytes(encrypted_store(client, 30, seed=2))
+        os.replace(tmp_path / "changed", path)
+        async with get_default_store_manager(keychain, source, prefetch, editable=True) as store:
+            assert len(store.entries) == 20  # Prefetched
+            store.editor.delete(store.entries[0])
+        return store
+    store = asyncio.run(edit())
+
+    # The save has conflicted with the replaced file, the deletion is applied to it instead of overwriting it
+    assert len(store.entries) == 30
+    assert len(decrypted_store(keychain, path.read_bytes())["entries"]) == 30
@@ -0,0 +1,86 @@
+import asyncio
+import io
+import json
+from contextlib import nullcontext
+
+from trezorpass import session
+from trezorpass.headless import resolve, write_secrets
+from trezorpass.store import EntryDecrypter, Keychain, entry_key_message, get_default_store_manager
+from trezorpass.store.sources import Source
+
+from .fakes import MemorySource, encrypted_store
+
+
+def run_session(client, source: Source, interaction) -> bool:
+    async def get_client_manager(healthcheck_interval):
+        return nullcontext(client)
+    session_get_client_manager = session.get_client_manager
+    session.get_client_manager = get_client_manager
+    try:
+        return asyncio.run(session.cli({"store": source}, interaction))
+    finally:
+        session.get_client_manager = session_get_client_manager
+
+
+def get(client, source: Source, queries: list[str], tags: list[str] = ()) -> tuple[bool, list[dict]]:
+    output = io.StringIO()
+    succeeded = run_session(client, source, session.get(queries, output, list(tags)))
+    return succeeded, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_every_query_gets_record(client):
+    source = MemorySource(encrypted_store(client, 3))
+
+    succeeded, records = get(client, source, ["Entry 1", "Entry 2"])
+
+    assert succeeded
+    assert [(record["query"], record["title"], record["password"]) for record in records] == [
+        ("Entry 1", "Entry 1", "password1"), ("Entry 2", "Entry 2", "password2")]
+
+
+def test_declined_unlock_fails_only_its_query(client):
+    source = MemorySource(encrypted_store(client, 3))
+    store = asyncio.run(_load(client, source))
+    client.declined.add(entry_key_message(store.entries[1]))
+
+    succeeded, records = get(client, source, ["Entry 0", "Entry 1", "Entry 2", "missing"])
+
+    assert not succeeded
+    assert [record["query"] for record in records] == ["Entry 0", "Entry 1", "Entry 2", "missing"]
+    assert records[0]["password"] == "password0"
+    assert records[1]["error"] == "Unlock has been cancelled"
+    assert records[2]["password"] == "password2"
+    assert records[3]["error"] == "No matching entry"
+
+
+def test_unmatched_query_fails(client):
+    succeeded, records = get(client, MemorySource(encrypted_store(client, 3)), ["missing"])
+
+    assert not succeeded
+    assert records == [{"query": "missing", "error": "No matching entry"}]
+
+
+def test_tag_filters_queries(client):
+    succeeded, records = get(client, MemorySource(encrypted_store(client, 3)), ["Entry"], tags=["Work"])
+
+    assert succeeded
+    assert records[0]["title"] == "Entry 0"
+
+
+def test_store_failing_to_load_fails_session(client):
+    assert not run_session(client, MemorySource(b"not a store"), session.get(["Entry 0"], io.StringIO(), []))
+
+
+def test_write_secrets_counts_failures(client, keychain):
+    store = asyncio.run(_load(client, MemorySource(encrypted_store(client, 2))))
+    output = io.StringIO()
+
+    failed = write_secrets(resolve(store, ["Entry 0", "missing"]), EntryDecrypter(keychain), output)
+
+    assert failed == 1
+    assert len(output.getvalue().splitlines()) == 2
+
+
+async def _load(client, source: Source):
+    async with get_default_store_manager(Keychain(client), source) as store:
+        return store
@@ -0,0 +1,99 @@
+import asyncio
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+import pytest
+
+from trezorpass.store.sources import HttpSource
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url(tmp_path):
+    """URL of a local server serving the files of the temporary directory, which answers If-Modified-Since"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_load_from_directory_url(tmp_path, server_url):
+    (tmp_path / "store.pswd").write_bytes(b"store data")
+    source = HttpSource(server_url)
+
+    assert source.store_name_hint() is None
+    assert asyncio.run(source.load_store("store.pswd")) == b"store data"
+
+
+def test_load_from_store_url(tmp_path, server_url):
+    (tmp_path / "store.pswd").write_bytes(b"store data")
+    source = HttpSource.from_url(server_url + "store.pswd")
+
+    assert source.store_name_hint() == server_url + "store.pswd"
+    assert asyncio.run(source.load_store("ignored.pswd")) == b"store data"
+
+
+def test_open_store_reads_metadata_of_response(tmp_path, server_url):
+    (tmp_path / "store.pswd").write_bytes(b"0123456789")
+    source = HttpSource(server_url)
+
+    async def read():
+        metadata, chunks = await source.open_store("store.pswd", chunk_size=4)
+        return metadata, [chunk async for chunk in chunks]
+
+    metadata, chunks = asyncio.run(read())
+
+    assert chunks == [b"0123", b"4567", b"89"]
+    assert metadata == asyncio.run(source.stat("store.pswd"))
+    assert metadata.size == 10
+    assert metadata.version and metadata.mtime
+
+
+def test_iter_store(tmp_path, server_url):
+    (tmp_path / "store.pswd").write_bytes(b"0123456789")
+
+    async def read():
+        return [chunk async for chunk in HttpSource(server_url).iter_store("store.pswd", chunk_size=6)]
+
+    assert asyncio.run(read()) == [b"012345", b"6789"]
+
+
+def test_unchanged_store_is_not_downloaded(tmp_path, server_url):
+    (tmp_path / "store.pswd").write_bytes(b"store data")
+    source = HttpSource(server_url)
+    version = asyncio.run(source.stat("store.pswd")).version
+
+    data, metadata = asyncio.run(source.load_store_if_changed("store.pswd", version))
+
+    assert data is None
+    assert metadata.version == version
+
+
+def test_changed_store_is_downloaded(tmp_path, server_url):
+    path = tmp_path / "store.pswd"
+    path.write_bytes(b"old data")
+    source = HttpSource(server_url)
+    version = asyncio.run(source.stat("store.pswd")).version
+    path.write_bytes(b"new data")
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 10))
+
+    data, metadata = asyncio.run(source.load_store_if_changed("store.pswd", version))
+
+    assert data == b"new data"
+    assert metadata.version != version
+
+
+def test_missing_store_fails(server_url):
+    with pytest.raises(HTTPError):
+        asyncio.run(HttpSource(server_url).load_store("missing.pswd"))
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import trezorpass
+
+HEAVY_MODULES = ["trezorlib", "dropbox", "requests", "boto3", "InquirerPy", "prompt_toolkit", "cryptography", "pyperclip"]
+REPORT = "import json; print(json.dumps(sorted({module.split('.')[0] for module in sys.modules})))"
+
+
+def imported_modules(code: str, home: str) -> set[str]:
+    """Runs the code in a fresh interpreter
+
+    Returns:
+        Top-level names of the modules imported by the end of the run, including the ones imported on the start
+    """
+    # Application data is kept away from the real one, as --clear removes it
+    environment = {**os.environ, "HOME": home, "XDG_DATA_HOME": home, "LOCALAPPDATA": home, "APPDATA": home,
+                   "PYTHONPATH": os.pathsep.join([os.path.dirname(os.path.dirname(trezorpass.__file__)),
+                                                  os.environ.get("PYTHONPATH", "")])}
+    code = f"import sys\ntry:\n    {code}\nexcept SystemExit:\n    pass\n{REPORT}"
+    result = subprocess.run([sys.executable, "-c", code], env=environment, capture_output=True, text=True, check=True)
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+@pytest.mark.parametrize("argument", ["--help", "--clear"])
+def test_cli_start_imports_no_heavy_module(tmp_path, argument):
+    modules = imported_modules(f"from trezorpass.cli import run; sys.argv = ['trezor-pass', '{argument}']; run()",
+                               str(tmp_path))
+
+    assert "trezorpass" in modules
+    assert not modules.intersection(HEAVY_MODULES)
+
+
+def test_file_store_session_imports_no_remote_sdk(tmp_path):
+    modules = imported_modules("import trezorpass.session; from trezorpass.store.sources import open_source; "
+                               "open_source('store.pswd')", str(tmp_path))
+
+    assert "trezorpass" in modules
+    assert not modules.intersection(["dropbox", "requests", "boto3"])
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from trezorpass.store import AsyncKeychain
+
+from .fakes import FakeTrezorClient
+
+
+def test_cancelled_queued_call_never_runs_nor_cancels_device():
+    client = FakeTrezorClient()
+    keychain = AsyncKeychain(SimpleNamespace(client=client), ThreadPoolExecutor(max_workers=1))
+    released = threading.Event()
+    started = threading.Event()
+    queued_calls = []
+
+    def running_call():
+        started.set()
+        released.wait(5)
+        return "done"
+
+    async def run():
+        running = asyncio.create_task(keychain.run(running_call))
+        await asyncio.to_thread(started.wait, 5)
+        queued = asyncio.create_task(keychain.run(queued_calls.append, "called"))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert client.cancels == 0  # The running call isn't disturbed
+        released.set()
+        return await running
+    assert asyncio.run(run()) == "done"
+    keychain.executor.shutdown(wait=True)
+
+    assert queued_calls == []
+
+
+def test_timed_out_running_call_is_cancelled_on_device():
+    client = FakeTrezorClient()
+    released = threading.Event()
+    client.cancel = lambda: released.set()  # The device releases the blocked call
+    keychain = AsyncKeychain(SimpleNamespace(client=client), ThreadPoolExecutor(max_workers=1), timeout=0.05)
+
+    async def run():
+        try:
+            await keychain.run(released.wait, 5)
+        except asyncio.TimeoutError:
+            return True
+        return False
+    assert asyncio.run(run())
+    keychain.executor.shutdown(wait=True)
+
+    assert released.is_set()
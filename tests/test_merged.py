@@ -0,0 +1,23 @@
+import asyncio
+
+from trezorpass.store import get_merged_store_manager
+
+from .fakes import MemorySource, encrypted_store
+
+
+def test_stores_are_merged_with_labels(client, keychain):
+    sources = {"home": MemorySource(encrypted_store(client, 2)), "work": MemorySource(encrypted_store(client, 1, 1))}
+
+    async def load():
+        async with get_merged_store_manager(keychain, sources) as store:
+            return store
+
+    store = asyncio.run(load())
+
+    assert store.name == "home, work"
+    assert [(entry.title, store.label(entry)) for entry in store.entries] == [
+        ("Entry 0", "home"), ("Entry 1", "home"), ("Entry 0", "work")]
+    assert [entry.title for entry in store.search("Entry 1")] == ["Entry 1"]
+    assert store.metadata == {}
+    assert store.version is None
+    assert "home, work" in repr(store)
@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+from trezorpass.store.sources import S3Source, SourceError, s3_source
+
+
+class FakeBody(io.BytesIO):
+    def iter_chunks(self, chunk_size: int):
+        return iter(lambda: self.read(chunk_size), b"")
+
+
+class FakeS3:
+    """Stands in for the S3 client, keeping the objects of a single bucket. Conditional gets of an unchanged object
+    fail like they do in botocore.
+
+    Args:
+        bucket: Name of the bucket
+        objects: Contents of the objects by their keys
+    """
+    def __init__(self, bucket: str, objects: dict[str, bytes]):
+        self.bucket = bucket
+        self.objects = objects
+        self.calls = []  # Names of the requests and the keys
+
+    def head_object(self, Bucket, Key) -> dict:
+        self.calls.append(("head_object", Key))
+        return self._metadata(Bucket, Key)
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None) -> dict:
+        self.calls.append(("get_object", Key))
+        metadata = self._metadata(Bucket, Key)
+        if IfNoneMatch == metadata["ETag"]:
+            from botocore.exceptions import ClientError
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"}}, "GetObject")
+        return {**metadata, "Body": FakeBody(self.objects[Key])}
+
+    def _metadata(self, bucket: str, key: str) -> dict:
+        if bucket != self.bucket or key not in self.objects:
+            raise KeyError(key)
+        return {"ContentLength": len(self.objects[key]), "ETag": '"%s"' % hashlib.md5(self.objects[key]).hexdigest(),
+                "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+
+
+def test_from_url():
+    source = S3Source.from_url("s3://bucket/stores/")
+
+    assert (source.bucket, source.key) == ("bucket", "stores/")
+    assert source.store_name_hint() is None
+    assert source.resolve("store.pswd") == "stores/store.pswd"
+    assert S3Source.from_url("s3://bucket/stores/store.pswd").store_name_hint() == "stores/store.pswd"
+
+
+def test_load_and_stat():
+    client = FakeS3("bucket", {"stores/store.pswd": b"store data"})
+    source = S3Source("bucket", "stores/", client=client)
+
+    assert asyncio.run(source.load_store("store.pswd")) == b"store data"
+    metadata = asyncio.run(source.stat("store.pswd"))
+    assert metadata.size == 10
+    assert metadata.version == client.head_object(Bucket="bucket", Key="stores/store.pswd")["ETag"]
+
+
+def test_open_store_reads_metadata_of_response():
+    client = FakeS3("bucket", {"store.pswd": b"0123456789"})
+    source = S3Source("bucket", "store.pswd", client=client)
+
+    async def read():
+        metadata, chunks = await source.open_store(None, chunk_size=4)
+        return metadata, [chunk async for chunk in chunks]
+
+    metadata, chunks = asyncio.run(read())
+
+    assert chunks == [b"0123", b"4567", b"89"]
+    assert metadata == asyncio.run(source.stat(None))
+    assert client.calls[0] == ("get_object", "store.pswd")
+
+
+def test_changed_store_is_downloaded():
+    client = FakeS3("bucket", {"store.pswd": b"old data"})
+    source = S3Source("bucket", "store.pswd", client=client)
+    version = asyncio.run(source.stat(None)).version
+    client.objects["store.pswd"] = b"new data"
+
+    data, metadata = asyncio.run(source.load_store_if_changed(None, version))
+
+    assert data == b"new data"
+    assert metadata.version != version
+
+
+def test_unchanged_store_is_not_downloaded():
+    pytest.importorskip("botocore")
+    source = S3Source("bucket", "store.pswd", client=FakeS3("bucket", {"store.pswd": b"store data"}))
+    version = asyncio.run(source.stat(None)).version
+
+    data, metadata = asyncio.run(source.load_store_if_changed(None, version))
+
+    assert data is None
+    assert metadata.version == version
+
+
+def test_failures_of_given_client_propagate():
+    source = S3Source("bucket", "store.pswd", client=FakeS3("bucket", {}))
+
+    with pytest.raises(KeyError):
+        asyncio.run(source.load_store_if_changed(None, '"version"'))
+
+
+def test_default_client_requires_boto3(monkeypatch):
+    monkeypatch.setattr(s3_source, "boto3", None)
+
+    with pytest.raises(SourceError, match="boto3"):
+        asyncio.run(S3Source("bucket", "store.pswd").load_store(None))
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+
+import pytest
+
+from trezorpass.store import StoreWatcher, get_default_store_manager
+from trezorpass.store.sources import Source
+
+from .fakes import encrypted_store
+
+
+class LoadOnlySource(Source):
+    """Plug-in source implementing nothing but load_store"""
+    def __init__(self, data: bytes):
+        self.data = data
+        self.loads = 0
+
+    async def load_store(self, store_name) -> bytes:
+        self.loads += 1
+        return self.data
+
+
+def test_load_if_changed_loads_source_without_stat():
+    data, metadata = asyncio.run(LoadOnlySource(b"store").load_store_if_changed(None, "1"))
+
+    assert data == b"store"
+    assert metadata.version is None
+
+
+def test_wait_for_change_without_stat_is_unsupported():
+    with pytest.raises(NotImplementedError):
+        asyncio.run(LoadOnlySource(b"store").wait_for_change(None, None, 0.01))
+
+
+def test_watcher_stops_when_source_cant_tell_changes(client, keychain, caplog):
+    source = LoadOnlySource(encrypted_store(client, 2))
+
+    async def watch():
+        async with get_default_store_manager(keychain, source) as store:
+            await asyncio.wait_for(StoreWatcher(keychain, source, store, poll_interval=0.01).run(), 1)
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(watch())
+
+    assert len([record for record in caplog.records if record.levelno >= logging.WARNING]) == 1
+    assert source.loads == 1
@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+from trezorpass.store import StoreWatcher, StoreSnapshots, get_default_store_manager
+from trezorpass.store.sources import FileSource
+
+from .fakes import encrypted_store
+
+
+def replace_file(path, data: bytes) -> None:
+    new_path = path.with_name(path.name + ".new")
+    new_path.write_bytes(data)
+    os.replace(new_path, path)
+
+
+async def wait_for_revision(store, revision: int) -> None:
+    while store.revision == revision:
+        await asyncio.sleep(0.01)
+
+
+def test_changed_store_is_reloaded(client, keychain, tmp_path):
+    path = tmp_path / keychain.store_name
+    path.write_bytes(encrypted_store(client, 2, seed=1))
+    source = FileSource(str(path))
+
+    async def watch():
+        async with get_default_store_manager(keychain, source) as store:
+            watcher = asyncio.create_task(StoreWatcher(keychain, source, store, poll_interval=0.01).run())
+            try:
+                revision = store.revision
+                replace_file(path, encrypted_store(client, 3, seed=2))
+                await asyncio.wait_for(wait_for_revision(store, revision), 5)
+            finally:
+                watcher.cancel()
+            return store
+    store = asyncio.run(watch())
+
+    assert len(store.entries) == 3
+    assert store.version == asyncio.run(source.stat(None)).version
+
+
+def test_unchanged_store_isnt_reloaded(client, keychain, tmp_path):
+    path = tmp_path / keychain.store_name
+    path.write_bytes(encrypted_store(client, 2))
+    source = FileSource(str(path))
+
+    async def reload():
+        async with get_default_store_manager(keychain, source) as store:
+            return await StoreWatcher(keychain, source, store).reload(), store
+    reloaded, store = asyncio.run(reload())
+
+    assert not reloaded
+    assert store.revision == 0
+
+
+def test_reloaded_store_is_snapshotted(client, keychain, tmp_path):
+    path = tmp_path / keychain.store_name
+    path.write_bytes(encrypted_store(client, 2, seed=1))
+    source = FileSource(str(path))
+    snapshots = StoreSnapshots(tmp_path / "snapshots")
+
+    async def reload():
+        async with get_default_store_manager(keychain, source) as store:
+            replace_file(path, encrypted_store(client, 3, seed=2))
+            assert await StoreWatcher(keychain, source, store, snapshots=snapshots).reload()
+            return store
+    store = asyncio.run(reload())
+
+    snapshot = snapshots.load(keychain, store.version)
+    assert snapshot is not None
+    assert [entry.nonce for entry in snapshot.entries] == [entry.nonce for entry in store.entries]